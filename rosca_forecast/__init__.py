@@ -0,0 +1,21 @@
+from .breakeven import BREAKEVEN_TARGETS, breakeven_fees, solve_breakeven_fees
+from .cache import (ForecastCache, allocation_inputs, cached_allocation, cached_monte_carlo, cached_run_forecast,
+                    cached_summaries, config_hash, forecast_cache, forecast_inputs, pricing_inputs)
+from .config import (ForecastConfig, ScenarioConfig, default_config, dumps_config, load_config, loads_config,
+                     save_config)
+from .daycount import days_between_specific_dates, lifetime_held_days
+from .daily import DailyLedger, build_daily_ledger
+from .diagnostics import Diagnostics, diagnostics
+from .engine import ENGINE_VERSION, allocate_cohorts, cohort_costs, price_cohorts, run_forecast_vectorized
+from .disk_cache import DiskCache
+from .export import (cached_export, open_workbook, read_bundle, scenario_tables, write_bundle, write_excel, write_frame,
+                     write_scenario_sheets)
+from .ledger import LEDGER_COLUMNS, build_float_ledger
+from .members import MEMBER_DTYPE, compare_yearly, member_forecast, run_member_simulation, simulate_members
+from .montecarlo import quantile_table, run_monte_carlo, simulate_paths
+from .pools import POOL_COLUMNS, form_pools, pool_formation, pool_summary
+from .reference import run_forecast_reference
+from .runner import ScenarioResult, kpi_table, run_all, run_scenario
+from .sensitivity import evaluate_points, grid_pivot, run_grid, sensitivity_table, tornado_table
+from .summaries import MONTHLY_SUMMARY_COLUMNS, build_summaries
+from .sweep import apply_overrides, expand_grid, forecast_kpis, run_sweep
@@ -0,0 +1,218 @@
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .charts import CHARTS, chart_data, render_chart
+from .config import DURATION_OPTIONS, ForecastConfig, ScenarioConfig, default_config, even_shares, load_config
+from .daycount import days_between_specific_dates, lifetime_held_days
+from .engine import ENGINE_VERSION, run_forecast_vectorized
+from .export import write_excel
+from .ledger import build_float_ledger
+from .reference import run_forecast_reference
+from .runner import ScenarioResult
+from .summaries import build_summaries
+
+DEFAULT_HORIZON_YEARS = (5, 10, 15, 20)
+SUITE_SIZES = ("small", "medium", "large")
+SUITE_STAGES = ("run_forecast", "run_forecast_reference", "days_between_specific_dates", "lifetime_held_days",
+                "summaries", "charts", "excel")
+# A stage is reported as a regression when it is this much slower than the baseline.
+DEFAULT_TOLERANCE = 1.25
+
+
+def _timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+# === CANONICAL CONFIGS ===
+# small: the two-duration fixture of rosca_forecast_app_v14_1_full_test.py (its
+# three allocation rows become years 1-3, carried forward to year 5).
+# medium: the app's default inputs. large: all 6 durations x 8 slabs over 20 years.
+def benchmark_configs():
+    small = ForecastConfig(
+        scenarios=[ScenarioConfig(name="Small", total_market=2000000)],
+        yearly_duration_share={1: {3: 60, 4: 40}, 2: {3: 50, 4: 50}, 3: {3: 40, 4: 60}},
+        slab_map={3: {1000: 70, 2000: 30}, 4: {2000: 50, 5000: 50}},
+        slot_fees={d: {s: {"fee": 1.0, "blocked": False} for s in range(1, d + 1)} for d in (3, 4)},
+        slot_distribution={d: even_shares(range(1, d + 1)) for d in (3, 4)},
+    )
+    medium = replace(default_config(), scenarios=[ScenarioConfig(name="Medium")])
+    large = replace(default_config(DURATION_OPTIONS), scenarios=[ScenarioConfig(name="Large")], forecast_months=240)
+    return {"small": small, "medium": medium, "large": large}
+
+
+# The scalar helper over the same (month, slot, installment) grid the table covers.
+def _days_between_all(config, max_slot):
+    for m_idx in range(config.forecast_months):
+        for slot in range(1, max_slot + 1):
+            for j in range(max_slot):
+                days_between_specific_dates(m_idx + j, config.collection_day, m_idx + slot - 1, config.payout_day,
+                                            config.base_year)
+
+
+def _render_all_charts(result):
+    sources = {"monthly": result.monthly, "yearly": result.yearly, "profit_share": result.profit_share,
+               "float_ledger": result.float_ledger}
+    for chart in CHARTS:
+        data = chart_data(chart, sources[chart["source"]])
+        if data is not None:
+            render_chart(chart, data)
+
+
+# === BENCHMARK SUITE ===
+# Times each stage of the first scenario of every config on its own: the vectorized
+# and loop engines, the day-count helper over every (month, slot) pair and the
+# precomputed table, the summaries, rendering the six charts (uncached) and the
+# Excel export. Returns {size: {stage: {"seconds", "peak_mb"}}} with best-of-
+# `repeats` wall time and traced peak memory of one run.
+def run_suite(sizes=SUITE_SIZES, repeats=3, stages=SUITE_STAGES, progress=None):
+    configs = benchmark_configs()
+    results = {}
+    for size in sizes:
+        config = configs[size]
+        scenario = config.scenarios[0]
+        args = config.forecast_args(scenario)
+        frames = run_forecast_vectorized(*args)
+        summaries = build_summaries(frames[0], config.party_a_pct, config.forecast_months)
+        result = ScenarioResult(scenario.name, *frames, *summaries,
+                                float_ledger=build_float_ledger(frames[0], config.forecast_months))
+        max_slot = max((max(slots) for slots in config.slot_distribution.values() if slots), default=1)
+        stage_fns = {
+            "run_forecast": lambda: run_forecast_vectorized(*args),
+            "run_forecast_reference": lambda: run_forecast_reference(*args[:-1]),
+            "days_between_specific_dates": lambda: _days_between_all(config, max_slot),
+            "lifetime_held_days": lambda: lifetime_held_days(config.forecast_months, max_slot, config.collection_day,
+                                                             config.payout_day, config.base_year),
+            "summaries": lambda: build_summaries(frames[0], config.party_a_pct, config.forecast_months),
+            "charts": lambda: _render_all_charts(result),
+            "excel": lambda: write_excel([result], io.BytesIO()),
+        }
+        results[size] = {"cohorts": len(frames[0]), "months": config.forecast_months, "stages": {}}
+        for stage in stages:
+            _, seconds, peak = _timed(stage_fns[stage], repeats)
+            results[size]["stages"][stage] = {"seconds": seconds, "peak_mb": peak / 1024 / 1024}
+            if progress: progress(size, stage, seconds)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "engine_version": ENGINE_VERSION, "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": platform.machine(), "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+# One row per (size, stage) present in both runs, with time and memory ratios
+# (current / baseline) and a flag when the time ratio exceeds `tolerance`.
+def compare_to_baseline(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    rows = []
+    for size, entry in current["results"].items():
+        base_stages = baseline.get("results", {}).get(size, {}).get("stages", {})
+        for stage, now in entry["stages"].items():
+            if stage not in base_stages:
+                continue
+            base = base_stages[stage]
+            time_ratio = now["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+            rows.append({"Size": size, "Stage": stage, "Baseline s": base["seconds"], "Current s": now["seconds"],
+                         "Time x": time_ratio,
+                         "Memory x": now["peak_mb"] / base["peak_mb"] if base["peak_mb"] else float("nan"),
+                         "Regression": time_ratio > tolerance})
+    return pd.DataFrame(rows)
+
+
+def suite_table(report):
+    return pd.DataFrame([{"Size": size, "Stage": stage, "Cohorts": entry["cohorts"], "Months": entry["months"],
+                          "Seconds": values["seconds"], "Peak MB": values["peak_mb"]}
+                         for size, entry in report["results"].items() for stage, values in entry["stages"].items()])
+
+
+# === HORIZON BENCHMARK ===
+# Best-of-`repeats` wall time and traced peak memory of the forecast plus summaries
+# for the first scenario at each horizon. Flat per-month columns mean runtime and
+# memory grow linearly with the horizon.
+def horizon_benchmark(config=None, years=DEFAULT_HORIZON_YEARS, repeats=3):
+    config = default_config() if config is None else config
+    rows = []
+    for y in years:
+        horizon_config = replace(config, forecast_months=int(y) * 12)
+        args = horizon_config.forecast_args(horizon_config.scenarios[0])
+
+        def run():
+            frames = run_forecast_vectorized(*args)
+            build_summaries(frames[0], horizon_config.party_a_pct, horizon_config.forecast_months)
+            return frames
+        frames, seconds, peak = _timed(run, repeats)
+        months = horizon_config.forecast_months
+        rows.append({"Years": y, "Months": months, "Cohorts": len(frames[0]), "Seconds": seconds,
+                     "Peak MB": peak / 1024 / 1024, "ms / Month": seconds * 1000 / months,
+                     "KB / Month": peak / 1024 / months})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rosca_forecast.benchmark",
+                                     description="Benchmark the forecast engine, summaries, charts and export.")
+    parser.add_argument("command", nargs="?", choices=["suite", "horizon"], default="suite",
+                        help="suite (default): per-stage timings of the small/medium/large configs; "
+                             "horizon: forecast time and memory across horizons.")
+    parser.add_argument("--sizes", nargs="+", choices=SUITE_SIZES, default=list(SUITE_SIZES))
+    parser.add_argument("--stages", nargs="+", choices=SUITE_STAGES, default=list(SUITE_STAGES))
+    parser.add_argument("--output", metavar="RESULTS.json", help="Write the suite results to this JSON file.")
+    parser.add_argument("--baseline", metavar="BASELINE.json",
+                        help="Compare against a saved suite result; exits 1 on a regression.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Slowdown factor counted as a regression (default {DEFAULT_TOLERANCE}).")
+    parser.add_argument("--config", help="JSON config for horizon (default: the app's default inputs).")
+    parser.add_argument("--years", type=int, nargs="+", default=list(DEFAULT_HORIZON_YEARS))
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    float_format = lambda v: f"{v:,.3f}"  # noqa: E731
+
+    if args.command == "horizon":
+        config = load_config(args.config) if args.config else None
+        df = horizon_benchmark(config, args.years, args.repeats)
+        print(df.to_string(index=False, float_format=float_format))
+        return 0
+
+    def report_progress(size, stage, seconds):
+        print(f"{size:>6} {stage:<28} {seconds:9.4f}s", file=sys.stderr, flush=True)
+    report = run_suite(args.sizes, args.repeats, args.stages, progress=report_progress)
+    print(suite_table(report).to_string(index=False, float_format=float_format))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote {args.output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        df_compare = compare_to_baseline(report, baseline, args.tolerance)
+        print(df_compare.to_string(index=False, float_format=float_format))
+        if df_compare["Regression"].any():
+            print(f"Regression: {int(df_compare['Regression'].sum())} stage(s) slower than "
+                  f"{args.tolerance:g}x the baseline", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from .cache import cached_allocation
+from .diagnostics import diagnostics
+from .engine import cohort_costs
+
+# "profit": lowest fee at which the slot's expected lifetime profit reaches the
+# target. "external_capital": lowest fee at which the slot's lifetime external
+# capital for losses falls to the target (0 = fully self-funded).
+BREAKEVEN_TARGETS = ("profit", "external_capital")
+BREAKEVEN_COLUMNS = ["Duration", "Slot", "Blocked", "Cohorts", "Users", "Current Fee %", "Break-even Fee %",
+                     "Profit at Current Fee", "External Capital at Current Fee"]
+
+
+def _group_sums(group, values, n_groups):
+    return np.bincount(group, weights=values, minlength=n_groups)
+
+
+# === BREAK-EVEN FEE SOLVER ===
+# The fee never changes who joins which cohort, so one allocation serves every fee
+# guess, and each (duration, slot) only depends on its own fee. Per cohort, at fee f
+# (in %): profit = a*f - c and external capital = max(0, c - a*f), with a = users *
+# commitment / 100 and c = default loss - NII.
+#
+# Summed over a slot's cohorts, profit is linear in f and solved directly. External
+# capital is piecewise linear with a kink at each cohort's own break-even c/a: all
+# those candidates are evaluated in one pass (sorted per slot, suffix sums give the
+# value at every kink), and the exact fee is solved on the segment where the target
+# is first met. Fees are never negative; a slot whose break-even is above
+# `max_fee` (or that has no users, e.g. a blocked slot) gets NaN.
+@diagnostics.timed("breakeven")
+def breakeven_fees(allocation, config, slot_fees, default_pre_pct, collection_day=1, payout_day=20, base_year=2024,
+                   target="profit", target_value=0.0, max_fee=100.0):
+    if target not in BREAKEVEN_TARGETS:
+        raise ValueError(f"Unknown break-even target {target!r}; expected one of {', '.join(BREAKEVEN_TARGETS)}")
+    if target == "external_capital" and target_value < 0:
+        raise ValueError("External capital target must be >= 0")
+
+    rows = []
+    for d in allocation["durations"][:-1].tolist():
+        for s in sorted(slot_fees.get(d, {})):
+            meta = slot_fees[d][s]
+            rows.append((d, s, bool(meta.get('blocked', False)), float(meta.get('fee', 0))))
+    if not rows:
+        return pd.DataFrame(columns=BREAKEVEN_COLUMNS)
+    row_duration, row_slot, row_blocked, row_fee = (np.array(col) for col in zip(*rows))
+    slot_width = int(max(row_slot.max(), allocation["slot"].max(initial=0))) + 1
+    row_index = {key: i for i, key in enumerate(zip(row_duration.tolist(), row_slot.tolist()))}
+    n_groups = len(rows)
+
+    users = allocation["users"]
+    if len(users):
+        costs = cohort_costs(allocation, config, default_pre_pct, collection_day, payout_day, base_year)
+        a = users * costs["commitment"] / 100.0
+        c = costs["total_loss"] - costs["total_nii"]
+        cohort_key = allocation["duration"].astype(np.int64) * slot_width + allocation["slot"]
+        lookup = {d * slot_width + s: i for (d, s), i in row_index.items()}
+        group = np.array([lookup[k] for k in cohort_key.tolist()], dtype=np.int64)
+    else:
+        a = c = np.zeros(0)
+        group = np.zeros(0, dtype=np.int64)
+
+    a_sum = _group_sums(group, a, n_groups)
+    c_sum = _group_sums(group, c, n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if target == "profit":
+            fee = (target_value + c_sum) / a_sum
+        else:
+            kink = c / a
+            order = np.lexsort((kink, group))
+            g, b, a_o, c_o = group[order], kink[order], a[order], c[order]
+            # Suffix sums within each slot (cohorts at or after position j), from the
+            # running totals: the slot's end total minus what came before j.
+            a_suffix = np.cumsum(a_sum)[g] - np.cumsum(a_o) + a_o
+            c_suffix = np.cumsum(c_sum)[g] - np.cumsum(c_o) + c_o
+            # External capital at each kink: only cohorts after j are still short.
+            at_kink = (c_suffix - c_o) - (a_suffix - a_o) * b
+            # Non-increasing within a slot and 0 at its last kink, so the first kink
+            # meeting the target sits after the ones that miss it.
+            tolerance = 1e-9 * _group_sums(g, np.abs(c_o), n_groups)[g]
+            missed = np.bincount(g[at_kink > target_value + tolerance], minlength=n_groups)
+            counts = np.bincount(g, minlength=n_groups)
+            first = (np.cumsum(counts) - counts + missed)[counts > 0]
+            fee = np.full(n_groups, np.nan)
+            fee[counts > 0] = (c_suffix[first] - target_value) / a_suffix[first]
+        fee = np.maximum(fee, 0.0)
+    fee[(a_sum <= 0) | ~np.isfinite(fee) | (fee > max_fee)] = np.nan
+
+    current = row_fee[group] if len(group) else np.zeros(0)
+    return pd.DataFrame({
+        "Duration": row_duration,
+        "Slot": row_slot,
+        "Blocked": row_blocked,
+        "Cohorts": np.bincount(group, minlength=n_groups),
+        "Users": _group_sums(group, users, n_groups).astype(np.int64),
+        "Current Fee %": row_fee,
+        "Break-even Fee %": fee,
+        "Profit at Current Fee": _group_sums(group, a * current - c, n_groups),
+        "External Capital at Current Fee": _group_sums(group, np.maximum(0.0, c - a * current), n_groups),
+    })
+
+
+# Same inputs as run_forecast_vectorized; the allocation comes from the stage cache.
+def solve_breakeven_fees(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                         collection_day=1, payout_day=20, base_year=2024, target="profit", target_value=0.0,
+                         max_fee=100.0, cache=None):
+    allocation = cached_allocation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, cache)
+    return breakeven_fees(allocation, config, slot_fees, default_pre_pct, collection_day, payout_day, base_year,
+                          target, target_value, max_fee)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .disk_cache import DEFAULT_DISK_CACHE_MB, DiskCache
+from .engine import ENGINE_VERSION, allocate_cohorts, forecast_horizon, price_cohorts
+from .montecarlo import quantile_table, run_monte_carlo
+from .summaries import build_summaries
+
+# Scenario config keys each stage reads. Anything else in the config (e.g. the
+# scenario name) never changes the output and is left out of the keys.
+ALLOCATION_CONFIG_KEYS = ("total_market", "tam_pct", "start_pct", "monthly_growth", "annual_growth",
+                          "cap_tam", "rest_period", "default_rate")
+PRICING_CONFIG_KEYS = ("kibor", "spread", "penalty_pct")
+
+DEFAULT_CACHE_MB = float(os.environ.get("ROSCA_FORECAST_CACHE_MB", 256))
+# Directory of the persistent second tier (see DiskCache); unset keeps the cache in memory only.
+DISK_CACHE_DIR = os.environ.get("ROSCA_FORECAST_DISK_CACHE")
+
+
+# === CANONICAL INPUTS ===
+# Dicts keep their insertion order (the engine breaks share ties by dict order), and
+# numbers are normalised so 10 and 10.0 coming from different widgets hash alike.
+def _canonical(value):
+    if isinstance(value, dict):
+        return [[_canonical(k), _canonical(v)] for k, v in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return value
+
+
+# Inputs of the allocation stage. Only the blocked flags of slot_fees matter here,
+# so a fee change keeps the same allocation key.
+def allocation_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution):
+    blocked = {d: {k: bool(meta.get('blocked', False)) for k, meta in slots.items()} for d, slots in slot_fees.items()}
+    return {
+        "engine_version": ENGINE_VERSION,
+        "config": {k: _canonical(config.get(k)) for k in ALLOCATION_CONFIG_KEYS},
+        "forecast_months": forecast_horizon(config),
+        "yearly_duration_share": _canonical(yearly_duration_share),
+        "slab_map": _canonical(slab_map),
+        "blocked_slots": _canonical(blocked),
+        "slot_distribution": _canonical(slot_distribution),
+    }
+
+
+def pricing_inputs(config, slot_fees, default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    fees = {d: {k: meta.get('fee', 0) for k, meta in slots.items()} for d, slots in slot_fees.items()}
+    return {
+        "config": {k: _canonical(config.get(k)) for k in PRICING_CONFIG_KEYS},
+        "slot_fees": _canonical(fees),
+        "default_pre_pct": _canonical(default_pre_pct),
+        "collection_day": _canonical(collection_day),
+        "payout_day": _canonical(payout_day),
+        "base_year": _canonical(base_year),
+    }
+
+
+def forecast_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                    default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    return {
+        "allocation": allocation_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution),
+        "pricing": pricing_inputs(config, slot_fees, default_pre_pct, collection_day, payout_day, base_year),
+    }
+
+
+def _hash(inputs):
+    payload = json.dumps(inputs, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def config_hash(*args, **kwargs):
+    return _hash(forecast_inputs(*args, **kwargs))
+
+
+# === PROCESS-WIDE LRU CACHE ===
+# Entries are stage results: allocation dicts of arrays, tuples of forecast or
+# summary frames, rendered chart PNGs. Keys are "<stage>:<hash>" and hits/misses are counted per stage.
+# With a DiskCache attached, memory misses are looked up on disk and new results are
+# written through, so they survive a restart.
+def entry_nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(entry_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(entry_nbytes(v) for v in value)
+    return 0
+
+
+class ForecastCache:
+    def __init__(self, max_bytes, disk=None):
+        self.max_bytes = int(max_bytes)
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stage_counts = {}
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def _count(self, key, outcome):
+        counts = self.stage_counts.setdefault(key.split(":", 1)[0], {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self._count(key, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._count(key, "hits")
+            return entry[0]
+
+    def put(self, key, value):
+        size = entry_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._nbytes += size
+            self._evict()
+
+    # In memory or on the attached disk cache; not counted as a hit or miss.
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.disk is not None and key in self.disk
+
+    # (key, value) pairs of the given stages, e.g. to hand a worker's results back.
+    def entries(self, stages):
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items() if key.split(":", 1)[0] in stages]
+
+    # Stores entries computed elsewhere, writing through to the disk cache.
+    def merge(self, entries):
+        for key, value in entries:
+            self.put(key, value)
+            if self.disk is not None:
+                self.disk.put(key, value)
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._nbytes -= size
+            self.evictions += 1
+
+    def attach_disk(self, directory, max_bytes=DEFAULT_DISK_CACHE_MB * 1024 * 1024):
+        self.disk = DiskCache(directory, max_bytes)
+        return self.disk
+
+    def stats(self):
+        with self._lock:
+            stats = {"entries": len(self._entries), "bytes": self._nbytes, "max_bytes": self.max_bytes,
+                     "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                     "stages": {stage: dict(counts) for stage, counts in self.stage_counts.items()}}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+forecast_cache = ForecastCache(DEFAULT_CACHE_MB * 1024 * 1024,
+                               DiskCache(DISK_CACHE_DIR) if DISK_CACHE_DIR else None)
+
+
+def _cached(cache, key, compute):
+    value = cache.get(key)
+    if value is None and cache.disk is not None:
+        value = cache.disk.get(key)
+        if value is not None:
+            cache.put(key, value)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+        if cache.disk is not None:
+            cache.disk.put(key, value)
+    return value
+
+
+# === STAGED, CACHED FORECAST ===
+# allocation -> pricing -> summaries, each keyed only on the inputs it reads. A fee,
+# KIBOR, spread or penalty change reuses the cached allocation and only reprices;
+# a profit split change reuses the forecast and only rebuilds the summaries.
+def cached_allocation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, cache=None):
+    cache = forecast_cache if cache is None else cache
+    key = "allocation:" + _hash(allocation_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution))
+    return _cached(cache, key, lambda: allocate_cohorts(config, yearly_duration_share, slab_map, slot_fees, slot_distribution))
+
+
+def _cached_frames(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                   default_pre_pct, collection_day, payout_day, base_year, cache):
+    key = "forecast:" + config_hash(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                                    default_pre_pct, collection_day, payout_day, base_year)
+
+    def compute():
+        allocation = cached_allocation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, cache)
+        return price_cohorts(allocation, config, slot_fees, default_pre_pct, collection_day, payout_day, base_year)
+    return key, _cached(cache, key, compute)
+
+
+# Same inputs as run_forecast_vectorized. Cached frames are shared between callers,
+# so each call hands out shallow copies; do not modify their values in place.
+def cached_run_forecast(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                        default_pre_pct, collection_day=1, payout_day=20, base_year=2024, cache=None):
+    cache = forecast_cache if cache is None else cache
+    _, frames = _cached_frames(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                               default_pre_pct, collection_day, payout_day, base_year, cache)
+    return tuple(df.copy(deep=False) for df in frames)
+
+
+# Monthly, yearly and profit-share summaries for a forecast, see build_summaries.
+def cached_summaries(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                     default_pre_pct, party_a_pct, collection_day=1, payout_day=20, base_year=2024, cache=None):
+    cache = forecast_cache if cache is None else cache
+    forecast_key, frames = _cached_frames(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                                          default_pre_pct, collection_day, payout_day, base_year, cache)
+    key = "summaries:" + _hash([forecast_key, _canonical(party_a_pct)])
+    summaries = _cached(cache, key, lambda: build_summaries(frames[0], party_a_pct, forecast_horizon(config)))
+    return tuple(df.copy(deep=False) for df in summaries)
+
+
+# Monte Carlo quantile table for a forecast, see run_monte_carlo / quantile_table.
+# Runs without a seed are not reproducible and are never cached.
+def cached_monte_carlo(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                       collection_day=1, payout_day=20, base_year=2024, n_paths=1000, seed=None, rejoin_pct=100,
+                       workers=1, cache=None):
+    cache = forecast_cache if cache is None else cache
+    args = (config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+            collection_day, payout_day, base_year)
+
+    def compute():
+        paths = run_monte_carlo(*args, n_paths=n_paths, seed=seed, rejoin_pct=rejoin_pct, workers=workers)
+        return quantile_table(paths)
+    if seed is None:
+        return compute()
+    return _cached(cache, monte_carlo_key(*args, n_paths, seed, rejoin_pct), compute).copy(deep=False)
+
+
+def monte_carlo_key(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                    collection_day=1, payout_day=20, base_year=2024, n_paths=1000, seed=None, rejoin_pct=100):
+    inputs = forecast_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                             collection_day, payout_day, base_year)
+    return "montecarlo:" + _hash([inputs, _canonical([n_paths, seed, rejoin_pct])])
@@ -0,0 +1,211 @@
+import hashlib
+import io
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from .cache import _cached, _hash, forecast_cache
+from .diagnostics import diagnostics
+
+# --- Modern Chart Styling Setup ---
+TEXT_COLOR = '#333333'
+GRID_COLOR = '#D8D8D8'
+PLOT_BG_COLOR = '#FFFFFF'
+FIG_BG_COLOR = '#F8F9FA'
+COLOR_PRIMARY_BAR = '#3B75AF'
+COLOR_SECONDARY_LINE = '#4CAF50'
+COLOR_ACCENT_BAR = '#FFC107'
+COLOR_ACCENT_LINE = '#9C27B0'
+COLOR_HIGHLIGHT_BAR = '#E91E63'
+
+CHART_STYLE = {
+    'font.family': 'sans-serif',
+    'font.sans-serif': ['Arial', 'Helvetica Neue', 'DejaVu Sans', 'Liberation Sans', 'sans-serif'],
+    'axes.labelcolor': TEXT_COLOR, 'xtick.color': TEXT_COLOR, 'ytick.color': TEXT_COLOR,
+    'axes.titlecolor': TEXT_COLOR, 'figure.facecolor': FIG_BG_COLOR, 'axes.facecolor': PLOT_BG_COLOR,
+    'axes.edgecolor': GRID_COLOR, 'axes.grid': True, 'grid.color': GRID_COLOR,
+    'grid.linestyle': '--', 'grid.linewidth': 0.7, 'legend.frameon': False,
+    'legend.fontsize': 9, 'legend.title_fontsize': 10, 'figure.dpi': 100,
+    'axes.spines.top': False, 'axes.spines.right': False, 'axes.spines.left': True,
+    'axes.spines.bottom': True, 'axes.titlesize': 13, 'axes.labelsize': 11,
+    'xtick.labelsize': 9, 'ytick.labelsize': 9, 'lines.linewidth': 2,
+    'lines.markersize': 5, 'patch.edgecolor': 'none'
+}
+# --- END: Modern Chart Styling Setup ---
+
+FIG_SIZE = (10, 4.5)
+# Resolution st.pyplot has always rendered at.
+CHART_DPI = 200
+
+# The six dual-axis charts: bars on the left axis, lines on the right. "source" is
+# the summary frame each one reads (yearly ones plot Year as a category).
+CHARTS = [
+    {"key": "monthly_pools_cash", "source": "monthly", "x": "Month",
+     "title": "Chart 1: Monthly Pools Formed vs. Cash In (Installments)",
+     "bar": ("Pools Formed", "Pools Formed This Month", COLOR_PRIMARY_BAR, 0.7),
+     "lines": [("Cash In (Installments This Month)", "Cash In (Installments)", COLOR_SECONDARY_LINE, 'o', '-')],
+     "ylabels": (("Pools Formed", COLOR_PRIMARY_BAR), ("Cash In (Installments)", COLOR_SECONDARY_LINE))},
+    {"key": "monthly_users_profit", "source": "monthly", "x": "Month",
+     "title": "Chart 2: Monthly Users Joining vs. Accrued Gross Profit (from New Cohorts)",
+     "bar": ("Users Joining This Month", "Users Joining This Month", COLOR_ACCENT_BAR, 0.7),
+     "lines": [("Gross Profit This Month (Accrued from New Cohorts)", "Accrued Gross Profit (New Cohorts)",
+                COLOR_ACCENT_LINE, 'o', '-')],
+     "ylabels": (("Users Joining", COLOR_ACCENT_BAR), ("Accrued Gross Profit", COLOR_ACCENT_LINE))},
+    {"key": "yearly_pools_cash", "source": "yearly", "x": "Year",
+     "title": "Chart 3: Annual Pools Formed vs. Annual Cash In (Installments)",
+     "bar": ("Pools Formed", "Annual Pools Formed", COLOR_PRIMARY_BAR, 0.6),
+     "lines": [("Cash In (Installments This Month)", "Annual Cash In (Installments)", COLOR_SECONDARY_LINE, 'o', '-')],
+     "ylabels": (("Annual Pools Formed", COLOR_PRIMARY_BAR), ("Annual Cash In", COLOR_SECONDARY_LINE))},
+    {"key": "yearly_users_profit", "source": "yearly", "x": "Year",
+     "title": "Chart 4: Annual Users Joining vs. Annual Accrued Gross Profit (from New Cohorts)",
+     "bar": ("Users Joining This Month", "Annual Users Joining", COLOR_ACCENT_BAR, 0.6),
+     "lines": [("Annual Gross Profit (Accrued from New Cohorts)", "Annual Accrued Gross Profit (New Cohorts)",
+                COLOR_ACCENT_LINE, 'o', '-')],
+     "ylabels": (("Annual Users Joining", COLOR_ACCENT_BAR), ("Annual Accrued Profit", COLOR_ACCENT_LINE))},
+    {"key": "external_capital", "source": "profit_share", "x": "Year",
+     "title": "Chart 5: Annual External Capital vs. Fee & Accrued Profit",
+     "bar": ("External Capital Needed (Annual Accrual)", "External Capital (Accrual)", COLOR_HIGHLIGHT_BAR, 0.6),
+     "lines": [("Annual Fee Collected (Accrued)", "Annual Fee (Accrual)", COLOR_PRIMARY_BAR, 'o', '-'),
+               ("Annual Gross Profit (Accrued)", "Annual Gross Profit (Accrual)", COLOR_SECONDARY_LINE, 's', '--')],
+     "ylabels": (("External Capital", COLOR_HIGHLIGHT_BAR), ("Fee & Profit (Accrued)", TEXT_COLOR))},
+    {"key": "float_ledger", "source": "float_ledger", "x": "Month",
+     "title": "Chart 6: Monthly Outstanding Float vs. Installments Collected and Payouts",
+     "bar": ("Outstanding Balance (End of Month)", "Outstanding Balance", COLOR_PRIMARY_BAR, 0.7),
+     "lines": [("Installments Collected", "Installments Collected", COLOR_SECONDARY_LINE, 'o', '-'),
+               ("Payouts Disbursed", "Payouts Disbursed", COLOR_ACCENT_LINE, 's', '--')],
+     "ylabels": (("Outstanding Balance", COLOR_PRIMARY_BAR), ("Monthly Flows", TEXT_COLOR))},
+]
+
+
+def _value_columns(chart):
+    return [chart["bar"][0]] + [line[0] for line in chart["lines"]]
+
+
+# The columns a chart plots, or None when the frame is missing or empty, lacks a
+# column or has only zeros to show.
+def chart_data(chart, df):
+    columns = [chart["x"]] + _value_columns(chart)
+    if df is None or df.empty or not all(col in df.columns for col in columns):
+        return None
+    data = df[columns]
+    if data[_value_columns(chart)].fillna(0).eq(0).all().all():
+        return None
+    if chart["x"] == "Year":
+        data = data.assign(Year=data["Year"].astype(str))
+    return data
+
+
+def frame_digest(df):
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _int_axis(axis):
+    axis.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
+
+
+# Draws one chart and returns it as PNG bytes. The figure is closed before
+# returning, so nothing accumulates in pyplot's figure registry.
+@diagnostics.timed("chart_render")
+def render_chart(chart, data):
+    with plt.rc_context(CHART_STYLE):
+        fig, ax_bar = plt.subplots(figsize=FIG_SIZE)
+        try:
+            ax_line = ax_bar.twinx()
+            x = data[chart["x"]]
+            column, label, color, width = chart["bar"]
+            handles = [ax_bar.bar(x, data[column], color=color, label=label, width=width)]
+            for column, label, color, marker, linestyle in chart["lines"]:
+                line, = ax_line.plot(x, data[column], color=color, marker=marker, label=label, linestyle=linestyle,
+                                     linewidth=2, markersize=4)
+                handles.append(line)
+            (bar_label, bar_color), (line_label, line_color) = chart["ylabels"]
+            ax_bar.set_xlabel(chart["x"]); ax_bar.set_ylabel(bar_label, color=bar_color); ax_line.set_ylabel(line_label, color=line_color)
+            ax_bar.tick_params(axis='y', labelcolor=bar_color); ax_line.tick_params(axis='y', labelcolor=line_color)
+            _int_axis(ax_bar); _int_axis(ax_line)
+            fig.legend(handles, [h.get_label() for h in handles], loc="lower center", bbox_to_anchor=(0.5, -0.15),
+                       ncol=len(handles))
+            fig.tight_layout(rect=[0, 0.05, 1, 1])
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+# === CACHED CHARTS ===
+# PNG bytes keyed by the chart and a digest of just the columns it plots, so a
+# rerun with unchanged summaries (or a change that leaves these columns alone, like
+# the profit split for charts 1-4) reuses the image. None when there is nothing to plot.
+def cached_chart_png(chart, df, cache=None):
+    cache = forecast_cache if cache is None else cache
+    data = chart_data(chart, df)
+    if data is None:
+        return None
+    key = "chart:" + _hash([chart["key"], frame_digest(data)])
+    return _cached(cache, key, lambda: render_chart(chart, data))
+
+
+# === SENSITIVITY CHARTS ===
+# Tornado: one horizontal bar per input from the KPI at its low value to the KPI at
+# its high value, centred on the base KPI, largest swing on top.
+@diagnostics.timed("chart_render")
+def render_tornado(df_tornado, kpi):
+    df = df_tornado.iloc[::-1]
+    with plt.rc_context(CHART_STYLE):
+        fig, ax = plt.subplots(figsize=(FIG_SIZE[0], max(2.5, 0.5 * len(df) + 1)))
+        try:
+            base = df["Base KPI"].iloc[0] if len(df) else 0
+            labels = [f"{p} ({lo:g} → {hi:g})" for p, lo, hi in zip(df["Parameter"], df["Low Value"], df["High Value"])]
+            ax.barh(labels, df["KPI at Low"] - base, left=base, color=COLOR_PRIMARY_BAR, label="Low value")
+            ax.barh(labels, df["KPI at High"] - base, left=base, color=COLOR_ACCENT_BAR, label="High value")
+            ax.axvline(base, color=TEXT_COLOR, linewidth=1)
+            ax.set_xlabel(kpi); ax.set_title(f"Sensitivity of {kpi}")
+            ax.get_xaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
+            ax.legend(loc="lower right")
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+# Heatmap of a grid_pivot table (rows: y values, columns: x values).
+@diagnostics.timed("chart_render")
+def render_heatmap(pivot, kpi):
+    with plt.rc_context(CHART_STYLE):
+        fig, ax = plt.subplots(figsize=FIG_SIZE)
+        try:
+            mesh = ax.pcolormesh(range(pivot.shape[1] + 1), range(pivot.shape[0] + 1), pivot.to_numpy(), cmap="viridis")
+            step_x, step_y = max(1, pivot.shape[1] // 10), max(1, pivot.shape[0] // 10)
+            ax.set_xticks([i + 0.5 for i in range(0, pivot.shape[1], step_x)])
+            ax.set_xticklabels([f"{v:.3g}" for v in pivot.columns[::step_x]])
+            ax.set_yticks([i + 0.5 for i in range(0, pivot.shape[0], step_y)])
+            ax.set_yticklabels([f"{v:.3g}" for v in pivot.index[::step_y]])
+            ax.set_xlabel(pivot.columns.name); ax.set_ylabel(pivot.index.name); ax.set_title(kpi)
+            ax.grid(False)
+            fig.colorbar(mesh, ax=ax, format=plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+def cached_tornado_png(df_tornado, kpi, cache=None):
+    cache = forecast_cache if cache is None else cache
+    if df_tornado.empty:
+        return None
+    key = "chart:" + _hash(["tornado", kpi, frame_digest(df_tornado)])
+    return _cached(cache, key, lambda: render_tornado(df_tornado, kpi))
+
+
+def cached_heatmap_png(pivot, kpi, cache=None):
+    cache = forecast_cache if cache is None else cache
+    if pivot.empty:
+        return None
+    key = "chart:" + _hash(["heatmap", kpi, frame_digest(pivot.reset_index())])
+    return _cached(cache, key, lambda: render_heatmap(pivot, kpi))
@@ -0,0 +1,136 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .breakeven import BREAKEVEN_TARGETS, solve_breakeven_fees
+from .config import load_config
+from .daily import build_daily_ledger
+from .diagnostics import diagnostics
+from .cache import forecast_cache
+from .export import cached_export, sheet_name_prefix
+from .members import compare_yearly, run_member_simulation
+from .runner import run_all
+from .sensitivity import run_grid, sensitivity_table, tornado_table
+from .sweep import run_sweep
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rosca_forecast",
+                                     description="Run the ROSCA forecast headless from a JSON or YAML config file.")
+    parser.add_argument("config", help="Path to a JSON or YAML config (see rosca_forecast.config.ForecastConfig).")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory for the outputs (default: current directory).")
+    parser.add_argument("--excel", default="all_scenarios_rosca_forecast.xlsx",
+                        help="Excel file name inside the output directory.")
+    parser.add_argument("--format", choices=["excel", "parquet", "csv"], default="excel",
+                        help="excel (default), or a zip of Parquet / CSV files with a manifest.json.")
+    parser.add_argument("--sweep", metavar="RANGES.json",
+                        help="Run a parameter sweep instead: a JSON object of {parameter: [values]}. "
+                             "Writes sweep_results.csv.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --sweep and for running the scenarios (default: all cores).")
+    parser.add_argument("--batched", action="store_true",
+                        help="Evaluate --sweep in-process, pricing all points that share an allocation in one pass.")
+    parser.add_argument("--sensitivity", action="store_true",
+                        help="Move each global input on its own around its base value instead. Writes "
+                             "sensitivity_results.csv and tornado.csv (swings of Total Profit).")
+    parser.add_argument("--breakeven", choices=BREAKEVEN_TARGETS,
+                        help="Solve the minimum fee %% per duration/slot instead: profit (lifetime profit reaches "
+                             "--breakeven-value) or external_capital (falls to it). Writes breakeven_fees.csv.")
+    parser.add_argument("--breakeven-value", type=float, default=0.0, help="Target per slot (default 0).")
+    parser.add_argument("--daily-ledger", action="store_true",
+                        help="Also write the daily cash ledger (memory-mapped .npy arrays) to <output-dir>/daily_ledger.")
+    parser.add_argument("--members", action="store_true",
+                        help="Also run the member-level simulation: writes members_<scenario>.npy (structured "
+                             "records) and member_yearly_comparison.csv.")
+    parser.add_argument("--member-seed", type=int, default=None,
+                        help="Random defaults and rejoins per member (default: the cohort engine's rounding).")
+    parser.add_argument("--disk-cache", metavar="DIR",
+                        help="Persistent result cache directory: reruns with unchanged inputs load the forecast, "
+                             "summaries and export from disk (default: $ROSCA_FORECAST_DISK_CACHE, else off).")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="Log per-stage timings, memory peaks and counters as JSON lines on stderr.")
+    args = parser.parse_args(argv)
+
+    if args.diagnostics:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+        diagnostics.enable(trace_memory=True)
+
+    if args.disk_cache:
+        forecast_cache.attach_disk(args.disk_cache)
+    config = load_config(args.config)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.sweep:
+        with open(args.sweep, "r", encoding="utf-8") as fh:
+            ranges = json.load(fh)
+
+        def report(done, total):
+            print(f"\r{done}/{total} points", end="", file=sys.stderr, flush=True)
+        if args.batched:
+            df_sweep = run_grid(config, ranges, progress=report)
+        else:
+            df_sweep = run_sweep(config, ranges, max_workers=args.workers, progress=report)
+        print(file=sys.stderr)
+        sweep_path = os.path.join(args.output_dir, "sweep_results.csv")
+        df_sweep.to_csv(sweep_path, index=False)
+        print(f"Wrote {sweep_path} ({len(df_sweep)} rows)")
+        if args.diagnostics: diagnostics.log_summary()
+        return 0
+
+    if args.sensitivity:
+        df_sensitivity = sensitivity_table(config)
+        sensitivity_path = os.path.join(args.output_dir, "sensitivity_results.csv")
+        df_sensitivity.to_csv(sensitivity_path, index=False)
+        df_tornado = tornado_table(df_sensitivity)
+        df_tornado.to_csv(os.path.join(args.output_dir, "tornado.csv"), index=False)
+        print(df_tornado.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+        print(f"Wrote {sensitivity_path} ({len(df_sensitivity)} rows)")
+        if args.diagnostics: diagnostics.log_summary()
+        return 0
+
+    if args.breakeven:
+        df_breakeven = pd.concat([
+            solve_breakeven_fees(*config.forecast_args(scenario), target=args.breakeven,
+                                 target_value=args.breakeven_value).assign(Scenario=scenario.name)
+            for scenario in config.scenarios], ignore_index=True)
+        breakeven_path = os.path.join(args.output_dir, "breakeven_fees.csv")
+        df_breakeven.to_csv(breakeven_path, index=False)
+        print(f"Wrote {breakeven_path} ({len(df_breakeven)} rows)")
+        if args.diagnostics: diagnostics.log_summary()
+        return 0
+
+    results = run_all(config, max_workers=args.workers)
+    if args.format == "excel":
+        output_path = os.path.join(args.output_dir, args.excel)
+    else:
+        output_path = os.path.join(args.output_dir, f"all_scenarios_rosca_forecast_{args.format}.zip")
+    with open(output_path, "wb") as fh:
+        fh.write(cached_export(config, results, None if args.format == "excel" else args.format))
+
+    if args.daily_ledger:
+        daily_ledger = build_daily_ledger(config, results, os.path.join(args.output_dir, "daily_ledger"))
+        print(f"Wrote {daily_ledger.directory} ({daily_ledger.n_days} days x {len(results)} scenarios)")
+
+    if args.members:
+        comparisons = []
+        for scenario, result in zip(config.scenarios, results):
+            members, _, _, yearly, _ = run_member_simulation(
+                *config.forecast_args(scenario), party_a_pct=config.party_a_pct, seed=args.member_seed,
+                rejoin_pct=config.monte_carlo_rejoin_pct)
+            np.save(os.path.join(args.output_dir, f"members_{sheet_name_prefix(scenario.name)}.npy"), members)
+            comparisons.append(compare_yearly(result.yearly, yearly).assign(Scenario=scenario.name))
+            print(f"{scenario.name}: {len(members):,} member enrolments ({members.nbytes / 1024 / 1024:.0f} MB)")
+        pd.concat(comparisons, ignore_index=True).to_csv(
+            os.path.join(args.output_dir, "member_yearly_comparison.csv"), index=False)
+
+    for result in results:
+        profit = result.profit_share["Annual Gross Profit (Accrued)"].sum() if not result.profit_share.empty else 0
+        print(f"{result.name}: {len(result.forecast)} cohorts, gross profit {profit:,.0f}")
+    print(f"Wrote {output_path}")
+    if args.diagnostics: diagnostics.log_summary()
+    return 0
@@ -0,0 +1,244 @@
+import json
+import math
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, List
+
+# Config files are JSON, or YAML (needs PyYAML) for .yaml / .yml paths.
+CONFIG_FORMATS = ("json", "yaml")
+DURATION_OPTIONS = [3, 4, 5, 6, 8, 10]
+SLAB_OPTIONS = [1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000]
+
+
+@dataclass
+class ScenarioConfig:
+    name: str = "Scenario 1"
+    total_market: float = 20000000
+    tam_pct: float = 10.0
+    start_pct: float = 10.0
+    monthly_growth: float = 2.0
+    annual_growth: float = 5.0
+    cap_tam: bool = False
+
+
+# Everything a forecast run needs: the scenarios plus the global inputs and the
+# duration/slab/slot configuration shared by all of them. Defaults match the app's
+# sidebar defaults; the nested maps mirror the app's dicts (slot_fees[d][slot] is
+# {"fee": ..., "blocked": ...}).
+@dataclass
+class ForecastConfig:
+    scenarios: List[ScenarioConfig] = field(default_factory=lambda: [ScenarioConfig()])
+    collection_day: int = 1
+    payout_day: int = 20
+    profit_split: float = 50
+    kibor: float = 11.0
+    spread: float = 5.0
+    rest_period: int = 1
+    default_rate: float = 1.0
+    default_pre_pct: float = 50
+    penalty_pct: float = 10.0
+    base_year: int = 2024
+    # Horizon in months (up to 240). Years after the last one in yearly_duration_share
+    # reuse its shares.
+    forecast_months: int = 60
+    # Monte Carlo mode (off when paths is 0): stochastic defaults and rejoins.
+    monte_carlo_paths: int = 0
+    monte_carlo_seed: int = 42
+    monte_carlo_rejoin_pct: float = 100
+    # Pool formation: users left over when pools are packed wait for next month's.
+    pool_carry_over: bool = True
+    yearly_duration_share: Dict[int, Dict[int, float]] = field(default_factory=dict)
+    slab_map: Dict[int, Dict[int, float]] = field(default_factory=dict)
+    slot_fees: Dict[int, Dict[int, dict]] = field(default_factory=dict)
+    slot_distribution: Dict[int, Dict[int, float]] = field(default_factory=dict)
+
+    @property
+    def party_a_pct(self):
+        return self.profit_split / 100
+
+    # The per-scenario dict run_forecast has always taken: scenario settings plus
+    # the global rates.
+    def scenario_config(self, scenario):
+        scenario_dict = asdict(scenario)
+        scenario_dict.update({
+            "kibor": self.kibor, "spread": self.spread, "rest_period": self.rest_period,
+            "default_rate": self.default_rate, "penalty_pct": self.penalty_pct,
+            "forecast_months": self.forecast_months
+        })
+        return scenario_dict
+
+    # Positional arguments for run_forecast_vectorized / cached_run_forecast.
+    def forecast_args(self, scenario):
+        return (self.scenario_config(scenario), self.yearly_duration_share, self.slab_map, self.slot_fees,
+                self.slot_distribution, self.default_pre_pct, self.collection_day, self.payout_day, self.base_year)
+
+    def to_dict(self):
+        return asdict(self)
+
+    # JSON object keys are strings, so duration/slab/slot keys are turned back into ints.
+    # Every value is type-checked (see _check_value); a wrong shape raises ValueError.
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(_mapping(data, "config"))
+        _check_keys(data, cls, "config")
+        scenarios = data.get("scenarios", [asdict(ScenarioConfig())])
+        if not isinstance(scenarios, list):
+            raise ValueError(f"scenarios: expected a list, got {type(scenarios).__name__}")
+        data["scenarios"] = [ScenarioConfig(**_check_fields(_mapping(s, f"scenarios[{i}]"), ScenarioConfig,
+                                                            f"scenarios[{i}]", f"scenarios[{i}]."))
+                             for i, s in enumerate(scenarios)]
+        for key in ("yearly_duration_share", "slab_map", "slot_distribution"):
+            data[key] = _int_map(data.get(key, {}), key, lambda inner, path: _int_map(inner, path, _number))
+        data["slot_fees"] = _int_map(data.get("slot_fees", {}), "slot_fees",
+                                     lambda inner, path: _int_map(inner, path, _slot_meta))
+        scalars = {k: v for k, v in data.items() if k not in _NESTED_FIELDS}
+        data.update(_check_fields(scalars, cls, "config"))
+        return cls(**data)
+
+
+def _check_keys(data, cls, what):
+    unknown = set(data) - {f.name for f in fields(cls)}
+    if unknown:
+        raise ValueError(f"Unknown {what} key(s): {', '.join(sorted(map(str, unknown)))}")
+
+
+# === CONFIG VALIDATION ===
+# Config files come from users, so values are checked against the field types
+# before use; errors name the key path, e.g. "slab_map.3.1000: expected a number".
+_NESTED_FIELDS = ("scenarios", "yearly_duration_share", "slab_map", "slot_fees", "slot_distribution")
+
+
+def _mapping(value, path):
+    if not isinstance(value, dict):
+        raise ValueError(f"{path}: expected a mapping, got {type(value).__name__}")
+    return value
+
+
+def _number(value, path):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{path}: expected a number, got {value!r}")
+    return value
+
+
+def _integer(value, path):
+    if _number(value, path) != int(value):
+        raise ValueError(f"{path}: expected a whole number, got {value!r}")
+    return int(value)
+
+
+def _boolean(value, path):
+    if not isinstance(value, bool):
+        raise ValueError(f"{path}: expected true or false, got {value!r}")
+    return value
+
+
+def _string(value, path):
+    if not isinstance(value, str):
+        raise ValueError(f"{path}: expected a string, got {value!r}")
+    return value
+
+
+_CHECKS = {int: _integer, float: _number, bool: _boolean, str: _string}
+
+
+# Scalar fields of a dataclass; `prefix` leads the key paths in errors.
+def _check_fields(data, cls, what, prefix=""):
+    _check_keys(data, cls, what)
+    types = {f.name: f.type for f in fields(cls)}
+    return {k: _CHECKS[types[k]](v, prefix + k) for k, v in data.items()}
+
+
+# {duration: ...} style maps: integer keys (strings in JSON) and checked values.
+def _int_map(value, path, check):
+    result = {}
+    for key, inner in _mapping(value, path).items():
+        try:
+            int_key = int(key) if not isinstance(key, (bool, float)) else None
+        except ValueError:
+            int_key = None
+        if int_key is None:
+            raise ValueError(f"{path}: expected whole-number keys, got {key!r}")
+        result[int_key] = check(inner, f"{path}.{key}")
+    return result
+
+
+def _slot_meta(value, path):
+    meta = dict(_mapping(value, path))
+    unknown = set(meta) - {"fee", "blocked"}
+    if unknown:
+        raise ValueError(f"{path}: unknown key(s) {', '.join(sorted(map(str, unknown)))}")
+    if "fee" in meta:
+        meta["fee"] = _number(meta["fee"], f"{path}.fee")
+    if "blocked" in meta:
+        meta["blocked"] = _boolean(meta["blocked"], f"{path}.blocked")
+    return meta
+
+
+# Even split that sums to exactly 100, with the last entry taking the rounding
+# remainder (the app's widget defaults).
+def even_shares(keys):
+    keys = list(keys)
+    if not keys:
+        return {}
+    base = 100 // len(keys)
+    shares = {k: base for k in keys}
+    shares[keys[-1]] = 100 - base * (len(keys) - 1)
+    return shares
+
+
+# A complete config using the app's default widget values for the given durations.
+def default_config(durations=(3, 4, 6)):
+    durations = sorted(int(d) for d in durations)
+    return ForecastConfig(
+        yearly_duration_share={y: even_shares(durations) for y in range(1, 6)},
+        slab_map={d: even_shares(SLAB_OPTIONS) for d in durations},
+        slot_fees={d: {s: {"fee": 1.0, "blocked": False} for s in range(1, d + 1)} for d in durations},
+        slot_distribution={d: even_shares(range(1, d + 1)) for d in durations},
+    )
+
+
+# === CONFIG FILES ===
+def _yaml():
+    try:
+        import yaml
+    except ImportError as e:
+        raise ImportError("YAML configs need PyYAML (pip install pyyaml)") from e
+    return yaml
+
+
+def config_format(path):
+    return "yaml" if str(path).lower().endswith((".yaml", ".yml")) else "json"
+
+
+def dumps_config(config, fmt="json"):
+    if fmt not in CONFIG_FORMATS:
+        raise ValueError(f"Unknown config format {fmt!r}; expected one of {', '.join(CONFIG_FORMATS)}")
+    if fmt == "yaml":
+        return _yaml().safe_dump(config.to_dict(), sort_keys=False)
+    return json.dumps(config.to_dict(), indent=2)
+
+
+# Parse errors and unknown keys raise ValueError.
+def loads_config(text, fmt="json"):
+    if fmt not in CONFIG_FORMATS:
+        raise ValueError(f"Unknown config format {fmt!r}; expected one of {', '.join(CONFIG_FORMATS)}")
+    if fmt == "yaml":
+        yaml = _yaml()
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML config: {e}") from e
+    else:
+        data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("A config file must hold a mapping of config keys")
+    return ForecastConfig.from_dict(data)
+
+
+def load_config(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return loads_config(fh.read(), config_format(path))
+
+
+def save_config(config, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(dumps_config(config, config_format(path)))
@@ -0,0 +1,105 @@
+import calendar
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .diagnostics import diagnostics
+from .ledger import build_float_ledger
+
+DAILY_COLUMNS = ("Inflow", "Outflow", "Balance", "Interest Accrued")
+DAILY_META = "daily_ledger.json"
+
+
+def _array_file(column):
+    return column.lower().replace(" ", "_") + ".npy"
+
+
+# Day offset (from 1 January of base_year) of `day_of_month` in each month index,
+# clamped to the month's last day.
+def month_day_offsets(day_of_month, num_months, base_year=2024):
+    start = date(base_year, 1, 1).toordinal()
+    offsets = np.empty(num_months, dtype=np.int64)
+    for m_idx in range(num_months):
+        year, month = base_year + m_idx // 12, m_idx % 12 + 1
+        day = min(day_of_month, calendar.monthrange(year, month)[1])
+        offsets[m_idx] = date(year, month, day).toordinal() - start
+    return offsets
+
+
+# === DAILY CASH LEDGER ===
+# Per scenario and calendar day over the horizon: installments collected on the
+# collection day, payouts on the payout day (the float ledger's scheduled flows),
+# the running cash balance and the KIBOR + spread interest on that day's closing
+# balance (negative while the platform is fronting payouts). Each column is a
+# (scenarios x days) float64 .npy file opened as a memory map, written one
+# scenario row at a time and sliced by date without loading the rest.
+class DailyLedger:
+    def __init__(self, directory, mode="r"):
+        self.directory = directory
+        with open(os.path.join(directory, DAILY_META), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        self.scenarios = meta["scenarios"]
+        self.start = date.fromisoformat(meta["start"])
+        self.n_days = meta["days"]
+        self.arrays = {column: np.load(os.path.join(directory, _array_file(column)), mmap_mode=mode)
+                       for column in DAILY_COLUMNS}
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=self.n_days - 1)
+
+    def _offset(self, value):
+        return (pd.Timestamp(value).date() - self.start).days
+
+    # Rows for one scenario between two dates (inclusive), read from the memory maps.
+    # Dates outside the horizon are clipped to it; a range entirely outside it
+    # gives an empty frame.
+    def frame(self, scenario, start=None, end=None):
+        row = self.scenarios.index(scenario)
+        first = 0 if start is None else max(self._offset(start), 0)
+        stop = self.n_days if end is None else min(self._offset(end), self.n_days - 1) + 1
+        first = min(first, self.n_days)
+        stop = max(stop, first)
+        df = pd.DataFrame({column: np.asarray(self.arrays[column][row, first:stop]) for column in DAILY_COLUMNS})
+        df.insert(0, "Date", pd.date_range(self.start + timedelta(days=first), periods=len(df), freq="D"))
+        return df
+
+    def flush(self):
+        for array in self.arrays.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+@diagnostics.timed("daily_ledger")
+def build_daily_ledger(config, results, directory):
+    os.makedirs(directory, exist_ok=True)
+    months = config.forecast_months
+    start = date(config.base_year, 1, 1)
+    n_days = month_day_offsets(1, months + 1, config.base_year)[-1]
+    with open(os.path.join(directory, DAILY_META), "w", encoding="utf-8") as fh:
+        json.dump({"scenarios": [r.name for r in results], "start": start.isoformat(), "days": int(n_days),
+                   "columns": list(DAILY_COLUMNS), "kibor": config.kibor, "spread": config.spread}, fh, indent=2)
+    for column in DAILY_COLUMNS:
+        np.lib.format.open_memmap(os.path.join(directory, _array_file(column)), mode="w+", dtype=np.float64,
+                                  shape=(len(results), int(n_days))).flush()
+
+    ledger = DailyLedger(directory, mode="r+")
+    collection_day = month_day_offsets(config.collection_day, months, config.base_year)
+    payout_day = month_day_offsets(config.payout_day, months, config.base_year)
+    daily_rate = (config.kibor / 100 + config.spread / 100) / 365
+    for row, result in enumerate(results):
+        monthly = result.float_ledger if result.float_ledger is not None else build_float_ledger(result.forecast, months)
+        if monthly.empty:
+            continue
+        inflow, outflow = ledger.arrays["Inflow"][row], ledger.arrays["Outflow"][row]
+        inflow[collection_day] = monthly["Installments Collected"].to_numpy()
+        outflow[payout_day] = monthly["Payouts Disbursed"].to_numpy()
+        balance = ledger.arrays["Balance"][row]
+        np.cumsum(inflow - outflow, out=balance)
+        np.multiply(balance, daily_rate, out=ledger.arrays["Interest Accrued"][row])
+    ledger.flush()
+    diagnostics.count("daily_ledger_days", len(results) * int(n_days))
+    return DailyLedger(directory)
@@ -0,0 +1,58 @@
+from datetime import date
+
+import numpy as np
+
+from .diagnostics import diagnostics
+
+
+# Helper function to calculate days between two dates specified by month index and day of month
+def days_between_specific_dates(start_month_idx, start_day_of_month, end_month_idx, end_day_of_month, base_year=2024):
+    diagnostics.count("days_between_calls")
+    if start_month_idx > end_month_idx or (start_month_idx == end_month_idx and start_day_of_month >= end_day_of_month):
+        return 0
+    start_actual_month = (start_month_idx % 12) + 1
+    start_actual_year = base_year + (start_month_idx // 12)
+    end_actual_month = (end_month_idx % 12) + 1
+    end_actual_year = base_year + (end_month_idx // 12)
+    try:
+        date_start = date(start_actual_year, start_actual_month, start_day_of_month)
+        date_end = date(end_actual_year, end_actual_month, end_day_of_month)
+        return (date_end - date_start).days
+    except ValueError:
+        return max(0, (end_month_idx - start_month_idx) * 30 + (end_day_of_month - start_day_of_month))
+
+
+# Date ordinal of `day_of_month` in each month index, plus whether that date exists
+# (e.g. day 30 in February does not, and days_between_specific_dates falls back to
+# its 30-day-month approximation for it).
+def month_day_ordinals(day_of_month, num_months, base_year=2024):
+    ordinals = np.zeros(num_months, dtype=np.int64)
+    valid = np.zeros(num_months, dtype=bool)
+    for m_idx in range(num_months):
+        try:
+            ordinals[m_idx] = date(base_year + m_idx // 12, m_idx % 12 + 1, day_of_month).toordinal()
+            valid[m_idx] = True
+        except ValueError:
+            pass
+    return ordinals, valid
+
+
+# Day-offset table for lifetime NII: entry [m, k - 1] is the total number of days the
+# installments of a cohort joining in month index m with payout slot k are held, i.e.
+# sum(days_between_specific_dates(m + j, collection_day, m + k - 1, payout_day) for j in
+# range(duration)). Installments collected after the payout month count 0 days, so the
+# sum does not depend on duration beyond k <= duration, and each cohort's day count is
+# a single lookup.
+def lifetime_held_days(num_months, max_slot, collection_day, payout_day, base_year=2024):
+    max_slot = max(int(max_slot), 1)
+    span = num_months + max_slot
+    coll_ord, coll_valid = month_day_ordinals(collection_day, span, base_year)
+    pay_ord, pay_valid = month_day_ordinals(payout_day, span, base_year)
+
+    start = np.arange(num_months)[:, None, None] + np.arange(max_slot)[None, None, :]
+    end = np.arange(num_months)[:, None, None] + np.arange(max_slot)[None, :, None]
+    exact = pay_ord[end] - coll_ord[start]
+    approx = np.maximum(0, (end - start) * 30 + (payout_day - collection_day))
+    days = np.where(coll_valid[start] & pay_valid[end], exact, approx)
+    held = (start < end) | ((start == end) & (collection_day < payout_day))
+    return np.where(held, days, 0).sum(axis=2)
@@ -0,0 +1,187 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("rosca_forecast")
+
+# Collector that stages and counts go to in the current context (thread / task),
+# set by Diagnostics.activate(); None means each collector records for itself.
+_active = contextvars.ContextVar("rosca_forecast_diagnostics", default=None)
+
+# tracemalloc is process-wide, so collectors tracing memory share one session of it:
+# it is started by the first and stopped when the last one stops tracing.
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+# === STAGE INSTRUMENTATION ===
+# Stage timers and counters for the hot paths (allocation, day counts, pricing,
+# frame construction, summaries, charts, export). Off by default: when disabled,
+# stage() and count() return immediately. With trace_memory, each stage also
+# records its tracemalloc peak above the memory in use when it started (nested
+# stages are handled; tracing slows the whole process down noticeably). Every
+# finished stage is logged to the "rosca_forecast" logger as a JSON line.
+#
+# The engine records through the module-level `diagnostics`, which the CLI
+# switches on for the whole process. A server with several users (the Streamlit
+# app) gives each session its own collector instead and activate()s it at the top
+# of each run: from then on the stages and counts recorded in that thread go to
+# the session's collector, and other sessions' runs are not affected.
+class Diagnostics:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing = False
+
+    def activate(self):
+        return _active.set(self)
+
+    # The collector stages and counts go to in this context: the activated one, else self.
+    def collector(self):
+        active = _active.get()
+        return self if active is None else active
+
+    def enable(self, trace_memory=False):
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not self._tracing:
+            _start_tracing()
+            self._tracing = True
+        elif not trace_memory:
+            self._stop_tracing()
+
+    def disable(self):
+        self.enabled = False
+        self.trace_memory = False
+        self._stop_tracing()
+
+    def _stop_tracing(self):
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def count(self, name, n=1):
+        active = _active.get()
+        if active is not None and active is not self:
+            active.count(name, n)
+            return
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    @contextmanager
+    def stage(self, name):
+        active = _active.get()
+        if active is not None and active is not self:
+            with active.stage(name):
+                yield
+            return
+        if not self.enabled:
+            yield
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        frame = {"start_mem": 0, "peak": 0}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"start_mem": current, "peak": current}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            peak_bytes = None
+            if tracing and tracemalloc.is_tracing():
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak_bytes = peak - frame["start_mem"]
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            self._record(name, seconds, peak_bytes)
+
+    # Decorator form of stage() for whole functions.
+    def timed(self, name):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _record(self, name, seconds, peak_bytes):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_mb": None})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if peak_bytes is not None:
+                entry["peak_mb"] = max(entry["peak_mb"] or 0.0, peak_bytes / 1024 / 1024)
+        event = {"event": "stage", "stage": name, "seconds": round(seconds, 6)}
+        if peak_bytes is not None:
+            event["peak_mb"] = round(peak_bytes / 1024 / 1024, 3)
+        logger.info(json.dumps(event))
+
+    # Adds a snapshot() taken elsewhere (e.g. in a worker process) to this collector's totals.
+    def merge(self, snapshot):
+        active = _active.get()
+        if active is not None and active is not self:
+            active.merge(snapshot)
+            return
+        with self._lock:
+            for name, other in snapshot["stages"].items():
+                entry = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_mb": None})
+                entry["calls"] += other["calls"]
+                entry["seconds"] += other["seconds"]
+                if other["peak_mb"] is not None:
+                    entry["peak_mb"] = max(entry["peak_mb"] or 0.0, other["peak_mb"])
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {"stages": {name: dict(entry) for name, entry in self.stages.items()},
+                    "counters": dict(self.counters)}
+
+    def log_summary(self):
+        logger.info(json.dumps({"event": "summary", **self.snapshot()}))
+
+
+diagnostics = Diagnostics()
@@ -0,0 +1,206 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .engine import ENGINE_VERSION
+
+INDEX_NAME = "index.sqlite"
+BLOB_DIR = "blobs"
+DEFAULT_DISK_CACHE_MB = float(os.environ.get("ROSCA_FORECAST_DISK_CACHE_MB", 2048))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    files TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    engine_version TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+# === BLOB FORMATS ===
+# Stage results as files: frames as Parquet (dtypes and index kept), a tuple of
+# frames as one Parquet file each, dicts of arrays (allocations) as .npz and bytes
+# (PNGs, exports) as is. Anything else is not persisted.
+def _kind(value):
+    if isinstance(value, pd.DataFrame):
+        return "frame"
+    if isinstance(value, tuple) and value and all(isinstance(v, pd.DataFrame) for v in value):
+        return "frames"
+    if isinstance(value, dict) and all(isinstance(v, (np.ndarray, int, float, np.integer, np.floating))
+                                       for v in value.values()):
+        return "arrays"
+    if isinstance(value, bytes):
+        return "bytes"
+    return None
+
+
+def _frame_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    return buffer.getvalue()
+
+
+def _encode(kind, value):
+    if kind == "frame":
+        return [_frame_bytes(value)]
+    if kind == "frames":
+        return [_frame_bytes(df) for df in value]
+    if kind == "arrays":
+        buffer = io.BytesIO()
+        np.savez(buffer, **{name: np.asarray(v) for name, v in value.items()})
+        return [buffer.getvalue()]
+    return [value]
+
+
+def _decode(kind, blobs):
+    if kind == "frame":
+        return pd.read_parquet(io.BytesIO(blobs[0]))
+    if kind == "frames":
+        return tuple(pd.read_parquet(io.BytesIO(blob)) for blob in blobs)
+    if kind == "arrays":
+        with np.load(io.BytesIO(blobs[0]), allow_pickle=False) as npz:
+            # 0-d arrays were Python scalars (e.g. the allocation's month count).
+            return {name: npz[name].item() if npz[name].ndim == 0 else npz[name] for name in npz.files}
+    return blobs[0]
+
+
+_SUFFIX = {"frame": ".parquet", "frames": ".parquet", "arrays": ".npz", "bytes": ".bin"}
+
+
+# === PERSISTENT CACHE ===
+# Stage results on disk, so they outlive the process (e.g. a server restart): a
+# SQLite index of key, blob files, size, engine version and last access, with the
+# blobs next to it. Keys are the in-memory cache's "<stage>:<hash>" keys. Entries
+# from another engine version are dropped on open; past `max_bytes` the least
+# recently read entries are deleted. Blobs are written under a temp name and
+# renamed, and the index row only points at complete files, so a crash mid-write
+# leaves at worst an orphaned blob. Blobs that are missing, of the wrong size or
+# unreadable are dropped on read, which counts as a miss.
+class DiskCache:
+    def __init__(self, directory, max_bytes=DEFAULT_DISK_CACHE_MB * 1024 * 1024, engine_version=ENGINE_VERSION):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.engine_version = engine_version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, BLOB_DIR), exist_ok=True)
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+            stale = db.execute("SELECT key, files FROM entries WHERE engine_version != ?",
+                               (engine_version,)).fetchall()
+            self._delete(db, stale)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(os.path.join(self.directory, INDEX_NAME), timeout=30)
+        try:
+            with db:  # commits on success
+                yield db
+        finally:
+            db.close()
+
+    def _path(self, file_name):
+        return os.path.join(self.directory, BLOB_DIR, file_name)
+
+    def _delete(self, db, rows):
+        for key, files in rows:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            for file_name in files.split(","):
+                try:
+                    os.remove(self._path(file_name))
+                except FileNotFoundError:
+                    pass
+
+    def __contains__(self, key):
+        with self._lock, self._connect() as db:
+            return db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT kind, files, bytes FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            kind, files, size = row
+            try:
+                blobs = []
+                for file_name in files.split(","):
+                    with open(self._path(file_name), "rb") as fh:
+                        blobs.append(fh.read())
+            except FileNotFoundError:  # removed behind our back: treat as a miss
+                self._delete(db, [(key, files)])
+                self.misses += 1
+                return None
+            db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        try:
+            if sum(len(blob) for blob in blobs) != size:
+                raise ValueError("blob size does not match the index")
+            value = _decode(kind, blobs)
+        except (ValueError, EOFError, OSError, zipfile.BadZipFile):  # truncated or corrupt: drop it, a miss
+            with self._lock, self._connect() as db:
+                # The entry may have been replaced meanwhile; only drop these files.
+                if db.execute("SELECT 1 FROM entries WHERE key = ? AND files = ?", (key, files)).fetchone():
+                    self._delete(db, [(key, files)])
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        kind = _kind(value)
+        if kind is None:
+            return
+        blobs = _encode(kind, value)
+        size = sum(len(blob) for blob in blobs)
+        if size > self.max_bytes:
+            return
+        stem = uuid.uuid4().hex
+        files = [f"{stem}_{i}{_SUFFIX[kind]}" for i in range(len(blobs))]
+        for file_name, blob in zip(files, blobs):
+            temp = self._path(file_name + ".tmp")
+            with open(temp, "wb") as fh:
+                fh.write(blob)
+            os.replace(temp, self._path(file_name))
+        now = time.time()
+        with self._lock, self._connect() as db:
+            old = db.execute("SELECT key, files FROM entries WHERE key = ?", (key,)).fetchall()
+            self._delete(db, old)
+            db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (key, kind, ",".join(files), size, self.engine_version, now, now))
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, files, size in db.execute("SELECT key, files, bytes FROM entries ORDER BY accessed").fetchall():
+            self._delete(db, [(key, files)])
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            self._delete(db, db.execute("SELECT key, files FROM entries").fetchall())
+
+    def stats(self):
+        with self._lock, self._connect() as db:
+            entries, nbytes = db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        return {"directory": self.directory, "entries": entries, "bytes": nbytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
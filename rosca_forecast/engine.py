@@ -0,0 +1,407 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .daycount import lifetime_held_days
+from .diagnostics import diagnostics
+
+# Bump whenever a change alters engine output, so cached results are not reused.
+ENGINE_VERSION = "2"
+
+FORECAST_MONTHS = 60
+MAX_FORECAST_MONTHS = 240
+
+# Column dtypes of the result frames: int32 for counts and months, small ints for
+# the duration/slot labels and float64 for money.
+FORECAST_DTYPES = {
+    "Month Joined": np.int32, "Year Joined": np.int32, "Duration": np.int16, "Slab Installment": np.int32,
+    "Assigned Slot": np.int16, "Users": np.int32, "Pools Formed": np.float64,
+    "Total Commitment/User": np.float64, "Fee % (on Total Commitment)": np.float64,
+    "Total Fee Collected (Lifetime)": np.float64, "NII Earned This Month (Avg)": np.float64,
+    "Total NII (Lifetime)": np.float64, "Expected Lifetime Profit": np.float64,
+    "Cash In (Installments This Month)": np.float64, "Payout Due Month": np.int32,
+    "Payout Amount Scheduled": np.float64, "Total Default Loss (Lifetime)": np.float64,
+    "External Capital For Loss (Lifetime)": np.float64,
+}
+FORECAST_COLUMNS = list(FORECAST_DTYPES)
+DEPOSIT_LOG_DTYPES = {
+    "Month": np.int32, "Users Joining": np.int32, "Installments Collected": np.float64,
+    "NII This Month (Avg)": np.float64,
+}
+DEFAULT_LOG_DTYPES = {
+    "Month": np.int32, "Year": np.int32, "Pre-Payout Defaulters (Cohort)": np.int32,
+    "Post-Payout Defaulters (Cohort)": np.int32, "Default Loss (Cohort Lifetime)": np.float64,
+}
+LIFECYCLE_DTYPES = {
+    "Month": np.int32, "New Users Acquired for Cohort": np.int32, "Rejoining Users for Cohort": np.int32,
+    "Total Onboarding to Cohort": np.int32,
+}
+
+
+# Forecast horizon in months from the scenario config dict (5 years unless the
+# config carries "forecast_months").
+def forecast_horizon(config):
+    months = int(config.get('forecast_months', FORECAST_MONTHS))
+    if not 1 <= months <= MAX_FORECAST_MONTHS:
+        raise ValueError(f"forecast_months must be between 1 and {MAX_FORECAST_MONTHS}, got {months}")
+    return months
+
+
+# === ACQUISITION ===
+# New users acquired each month. This does not depend on cohorts or rejoins, so the
+# whole schedule is computed up front with the same ceil/cap rules as the loop engine.
+def acquisition_schedule(config, months=FORECAST_MONTHS):
+    initial_tam = math.ceil(config['total_market'] * (config['tam_pct'] / 100))
+    if initial_tam < 0: initial_tam = 0
+    acquisition_rate = config['monthly_growth'] / 100
+    initial_new_users = math.ceil(initial_tam * (config['start_pct'] / 100))
+    if initial_new_users < 0: initial_new_users = 0
+    enforce_cap = config.get("cap_tam", False)
+
+    new_users = np.zeros(months, dtype=np.int64)
+    cumulative_base = 0
+    tam_current_year = initial_tam
+    tam_used = 0
+    for m_idx in range(months):
+        if m_idx > 0 and m_idx % 12 == 0:
+            tam_current_year = math.ceil(tam_current_year * (1 + config['annual_growth'] / 100))
+
+        potential = 0
+        if m_idx == 0:
+            potential = initial_new_users
+        elif cumulative_base > 0 and acquisition_rate > 0:
+            potential = math.ceil(cumulative_base * acquisition_rate)
+        if potential < 0: potential = 0
+
+        actual = potential
+        if enforce_cap:
+            tam_for_cap = max(0, tam_current_year)
+            if tam_used + actual > tam_for_cap:
+                actual = max(0, tam_for_cap - tam_used)
+            actual = int(actual)
+
+        cumulative_base += actual
+        tam_used += actual
+        new_users[m_idx] = actual
+    return new_users
+
+
+# === ALLOCATION LAYOUT ===
+# Each level of the cascade (duration -> slab -> slot) is laid out in the order the
+# loop engine visits it: shares sorted descending, ties kept in dict order. Entries
+# the loop skips without consuming users (a duration without slabs, a slab whose
+# duration has no unblocked slots) get an effective share of 0 but keep their
+# position, because "last position takes the remainder" counts them.
+def _ordered_level(share_items, keeps_users=True):
+    ordered = sorted(share_items, key=lambda item: item[1], reverse=True)
+    keys = [key for key, _ in ordered]
+    shares = [share if keeps_users else 0 for _, share in ordered]
+    last = [idx == len(ordered) - 1 for idx in range(len(ordered))]
+    return keys, shares, last
+
+
+def _pad(rows, width, fill, dtype):
+    out = np.full((len(rows), max(width, 1)), fill, dtype=dtype)
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row
+    return out
+
+
+def build_allocation_layout(yearly_duration_share, slab_map, slot_fees, slot_distribution, months=FORECAST_MONTHS):
+    num_years = (months - 1) // 12 + 1
+    # Years after the last configured one carry its shares forward; gaps before it
+    # stay unconfigured (no onboarding), as in the loop engine.
+    last_year = max(yearly_duration_share, default=0)
+    durations = []
+    for y in range(1, min(num_years, last_year) + 1):
+        for d in yearly_duration_share.get(y, {}):
+            if d not in durations:
+                durations.append(d)
+    dur_index = {d: i for i, d in enumerate(durations)}
+
+    slab_keys, slab_shares, slab_last = [], [], []
+    slot_keys, slot_shares, slot_last = [], [], []
+    has_slabs = []
+    for d in durations:
+        slabs = slab_map.get(d, {})
+        slots = slot_distribution.get(d, {})
+        fees = slot_fees.get(d, {})
+        unblocked = [(k, v) for k, v in slots.items() if not fees.get(k, {}).get('blocked', False)]
+        keys, shares, last = _ordered_level(slabs.items(), keeps_users=bool(unblocked))
+        slab_keys.append(keys); slab_shares.append(shares); slab_last.append(last)
+        keys, shares, last = _ordered_level(unblocked)
+        slot_keys.append(keys); slot_shares.append(shares); slot_last.append(last)
+        has_slabs.append(bool(slabs))
+
+    year_dur, year_shares, year_last, year_active = [], [], [], []
+    for y in range(1, num_years + 1):
+        shares_y = yearly_duration_share.get(min(y, last_year), {})
+        keys, shares, last = _ordered_level(shares_y.items())
+        shares = [share if has_slabs[dur_index[d]] else 0 for d, share in zip(keys, shares)]
+        year_dur.append([dur_index[d] for d in keys]); year_shares.append(shares); year_last.append(last)
+        year_active.append(bool(shares_y))
+
+    width_d = max((len(r) for r in year_dur), default=0)
+    width_s = max((len(r) for r in slab_keys), default=0)
+    width_k = max((len(r) for r in slot_keys), default=0)
+    return {
+        "durations": np.array(durations + [0], dtype=np.int64),  # trailing 0 backs padded positions
+        "year_dur": _pad(year_dur, width_d, len(durations), np.int64),
+        "year_shares": _pad(year_shares, width_d, 0, np.float64),
+        "year_last": _pad(year_last, width_d, False, bool),
+        "year_active": np.array(year_active, dtype=bool),
+        "slab_values": _pad(slab_keys + [[]], width_s, 0, np.int64),
+        "slab_shares": _pad(slab_shares + [[]], width_s, 0, np.float64),
+        "slab_last": _pad(slab_last + [[]], width_s, False, bool),
+        "slot_numbers": _pad(slot_keys + [[]], width_k, 0, np.int64),
+        "slot_shares": _pad(slot_shares + [[]], width_k, 0, np.float64),
+        "slot_last": _pad(slot_last + [[]], width_k, False, bool),
+    }
+
+
+# Split `total` over the last axis of `shares` exactly like one level of the loop
+# engine: ceil(total * share) per position, capped by what is left, with the last
+# position taking the remainder. Works on any leading shape at once; `total` and
+# `shares[..., p]` only need to broadcast (e.g. an extra leading path axis).
+def _cascade(total, shares, last):
+    remaining = total.copy()
+    total_f = total.astype(np.float64)
+    alloc = np.zeros(np.broadcast_shapes(total.shape, shares.shape[:-1]) + shares.shape[-1:], dtype=np.int64)
+    for p in range(shares.shape[-1]):
+        share = shares[..., p]
+        wanted = np.ceil(total_f * (share / 100.0)).astype(np.int64)
+        take = np.where(last[..., p], remaining, np.minimum(wanted, remaining))
+        take = np.where(share != 0, take, 0)
+        alloc[..., p] = take
+        remaining = remaining - take
+    return alloc
+
+
+# === REJOIN RING BUFFER ===
+# Users leaving a cohort that joined in month m rejoin in month m + duration + rest,
+# so pending rejoins never span more than max duration + rest months. The tracker
+# is a ring of that size indexed by month % size (with any leading axes, e.g. paths)
+# instead of one slot per forecast month. ring_take reads a block of months and
+# frees their slots for months one ring length later.
+def rejoin_ring(durations, rest_months, leading_shape=()):
+    size = max(1, int(durations.max(initial=0)) + int(rest_months))
+    return np.zeros(tuple(leading_shape) + (size,), dtype=np.int64)
+
+
+def ring_take(ring, block):
+    slots = np.arange(block.start, block.stop) % ring.shape[-1]
+    taken = ring[..., slots]
+    ring[..., slots] = 0
+    return taken
+
+
+# === STAGE 1: ALLOCATION ===
+# Builds the month x duration x slab x slot allocation tensor with NumPy. Months are
+# processed in blocks no longer than the shortest rejoin lag (duration + rest period),
+# since users rejoining in a block were all released by earlier blocks. Only
+# acquisition, shares, blocked slots, rest period and default rate matter here; fees
+# and rates are applied in the pricing stage.
+@diagnostics.timed("allocation")
+def allocate_cohorts(config, yearly_duration_share, slab_map, slot_fees, slot_distribution):
+    months = forecast_horizon(config)
+    layout = build_allocation_layout(yearly_duration_share, slab_map, slot_fees, slot_distribution, months)
+    new_users = acquisition_schedule(config, months)
+
+    rest_months = int(config['rest_period'])
+    default_frac = config['default_rate'] / 100
+    month_year = np.arange(months) // 12
+
+    d_width = layout["year_dur"].shape[1]
+    s_width = layout["slab_values"].shape[1]
+    k_width = layout["slot_numbers"].shape[1]
+    shape = (months, d_width, s_width, k_width)
+    users = np.zeros(shape, dtype=np.int64)
+    from_rejoin = np.zeros(shape, dtype=np.int64)
+    onboarding = np.zeros(months, dtype=np.int64)
+
+    real_durations = layout["durations"][:-1]
+    lag = max(1, int(real_durations.min()) + rest_months) if real_durations.size else months
+    ring = rejoin_ring(real_durations, rest_months)
+    for start in range(0, months, lag):
+        block = slice(start, min(start + lag, months))
+        year_idx = month_year[block]
+        rejoining = ring_take(ring, block)
+        total = new_users[block] + rejoining
+        onboarding[block] = total
+
+        dur_alloc = _cascade(total, layout["year_shares"][year_idx], layout["year_last"][year_idx])
+        dur_idx = layout["year_dur"][year_idx]
+        slab_alloc = _cascade(dur_alloc, layout["slab_shares"][dur_idx], layout["slab_last"][dur_idx])
+        slot_shares = np.broadcast_to(layout["slot_shares"][dur_idx][:, :, None, :], slab_alloc.shape + (k_width,))
+        slot_last = np.broadcast_to(layout["slot_last"][dur_idx][:, :, None, :], slab_alloc.shape + (k_width,))
+        block_users = _cascade(slab_alloc, slot_shares, slot_last)
+        users[block] = block_users
+
+        # Rejoining users fill cohorts first, in cascade order.
+        flat = block_users.reshape(len(total), -1)
+        taken_before = np.cumsum(flat, axis=1) - flat
+        pool_left = np.maximum(rejoining[:, None] - taken_before, 0)
+        from_rejoin[block] = np.minimum(flat, pool_left).reshape(block_users.shape)
+
+        defaulters = np.ceil(block_users * default_frac).astype(np.int64)
+        staying = block_users - defaulters
+        month_idx = np.arange(block.start, block.stop)[:, None, None, None]
+        rejoin_at = month_idx + layout["durations"][dur_idx][:, :, None, None] + rest_months
+        rejoin_at = np.broadcast_to(rejoin_at, block_users.shape)
+        mask = (block_users != 0) & (staying > 0) & (rejoin_at < months) & (rejoin_at > month_idx)
+        np.add.at(ring, rejoin_at[mask] % ring.shape[-1], staying[mask])
+
+    # Keep only the non-zero cohorts, in the order the loop engine emits them.
+    m_idx, d_pos, s_pos, k_pos = np.nonzero(users)
+    cohort_users = users[m_idx, d_pos, s_pos, k_pos]
+    diagnostics.count("cohorts_generated", len(cohort_users))
+    dur_idx = layout["year_dur"][month_year[m_idx], d_pos]
+    return {
+        "months": months,
+        "month_year": month_year,
+        "durations": layout["durations"],
+        "slot_numbers": layout["slot_numbers"],
+        "m_idx": m_idx,
+        "dur_idx": dur_idx,
+        "duration": layout["durations"][dur_idx],
+        "installment": layout["slab_values"][dur_idx, s_pos],
+        "k_pos": k_pos,
+        "slot": layout["slot_numbers"][dur_idx, k_pos],
+        "users": cohort_users,
+        "from_rejoin": from_rejoin[m_idx, d_pos, s_pos, k_pos],
+        "defaulters": np.ceil(cohort_users * default_frac).astype(np.int64),
+        # Months without onboarding (or without a duration config) log a single zero row.
+        "empty_months": np.flatnonzero((onboarding == 0) | ~layout["year_active"][month_year]),
+    }
+
+
+# === RESULT STORE ===
+# One zero-filled, preallocated array per column. Stage results are written straight
+# into these and the frames wrap them without copying.
+def _result_store(dtypes, n_rows):
+    return {name: np.zeros(n_rows, dtype=dtype) for name, dtype in dtypes.items()}
+
+
+# Fee % for every (duration, slot position) of the layout.
+def slot_fee_table(durations, slot_numbers, slot_fees):
+    return np.array([[slot_fees.get(d, {}).get(k, {}).get('fee', 0) for k in row]
+                     for d, row in zip(durations.tolist(), slot_numbers.tolist())], dtype=np.float64)
+
+
+# Everything about a cohort's lifetime economics except the fee: commitment per
+# user, KIBOR + spread NII on the held installments and the default loss after the
+# pre/post split and refund penalty. Fees are linear on top of these.
+def cohort_costs(allocation, config, default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    m_idx = allocation["m_idx"]
+    cohort_users = allocation["users"]
+    installment = allocation["installment"]
+    defaulters = allocation["defaulters"]
+
+    daily_rate = (config['kibor'] / 100 + config['spread'] / 100) / 365
+    penalty_frac = config['penalty_pct'] / 100
+    with diagnostics.stage("day_counts"):
+        held_days_table = lifetime_held_days(allocation["months"], allocation["slot_numbers"].max(), collection_day,
+                                             payout_day, base_year)
+        held_days = held_days_table[m_idx, allocation["slot"] - 1]
+    diagnostics.count("held_day_lookups", len(m_idx))
+
+    commitment = installment * allocation["duration"]
+    pre_defaulters = np.ceil(defaulters * (default_pre_pct / 100)).astype(np.int64)
+    post_defaulters = np.maximum(defaulters - pre_defaulters, 0)
+    return {
+        "commitment": commitment,
+        "held_days": held_days,
+        "total_nii": installment * daily_rate * held_days * cohort_users,
+        "pre_defaulters": pre_defaulters,
+        "post_defaulters": post_defaulters,
+        "total_loss": pre_defaulters * (commitment * (1 - penalty_frac)) + post_defaulters * commitment,
+    }
+
+
+# === STAGE 2: PRICING ===
+# Per-cohort economics on top of an allocation: slot fees on top of cohort_costs.
+# Returns the four forecast frames.
+@diagnostics.timed("pricing")
+def price_cohorts(allocation, config, slot_fees, default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    m_idx = allocation["m_idx"]
+    month_year = allocation["month_year"]
+    cohort_users = allocation["users"]
+    cohort_rejoin = allocation["from_rejoin"]
+    duration = allocation["duration"]
+    installment = allocation["installment"]
+    slot = allocation["slot"]
+
+    fee_table = slot_fee_table(allocation["durations"], allocation["slot_numbers"], slot_fees)
+    fee_frac = fee_table[allocation["dur_idx"], allocation["k_pos"]] / 100.0
+
+    costs = cohort_costs(allocation, config, default_pre_pct, collection_day, payout_day, base_year)
+    commitment = costs["commitment"]
+    total_nii = costs["total_nii"]
+    pre_defaulters = costs["pre_defaulters"]
+    post_defaulters = costs["post_defaulters"]
+    total_loss = costs["total_loss"]
+    total_fees = commitment * fee_frac * cohort_users
+    avg_monthly_nii = total_nii / duration
+    earned = total_fees + total_nii
+    cash_in = cohort_users * installment
+    month_num = m_idx + 1
+    year_num = month_year[m_idx] + 1
+
+    with diagnostics.stage("frames"):
+        if len(cohort_users):
+            forecast = _result_store(FORECAST_DTYPES, len(cohort_users))
+            for name, values in zip(FORECAST_COLUMNS, [
+                month_num, year_num, duration, installment, slot,
+                cohort_users, cohort_users / duration, commitment, fee_frac * 100,
+                total_fees, avg_monthly_nii, total_nii,
+                earned - total_loss, cash_in, m_idx + slot,
+                cohort_users * commitment, total_loss, np.maximum(0, total_loss - earned),
+            ]):
+                forecast[name][:] = values
+            df_forecast = pd.DataFrame(forecast, copy=False)
+        else:
+            df_forecast = pd.DataFrame()
+
+        # Log rows: one per cohort plus a zero row per empty month, ordered by month.
+        empty_months = allocation["empty_months"]
+        n_rows = len(m_idx) + len(empty_months)
+        if not n_rows:
+            return df_forecast, pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        order = np.argsort(np.concatenate([m_idx, empty_months]), kind="stable")
+        row_of = np.empty(n_rows, dtype=np.int64)
+        row_of[order] = np.arange(n_rows)
+        cohort_rows, empty_rows = row_of[:len(m_idx)], row_of[len(m_idx):]
+
+        def log_store(dtypes):
+            store = _result_store(dtypes, n_rows)
+            store["Month"][cohort_rows] = month_num
+            store["Month"][empty_rows] = empty_months + 1
+            if "Year" in store:
+                store["Year"][cohort_rows] = year_num
+                store["Year"][empty_rows] = month_year[empty_months] + 1
+            return store
+
+        deposit = log_store(DEPOSIT_LOG_DTYPES)
+        deposit["Users Joining"][cohort_rows] = cohort_users
+        deposit["Installments Collected"][cohort_rows] = cash_in
+        deposit["NII This Month (Avg)"][cohort_rows] = avg_monthly_nii
+        default = log_store(DEFAULT_LOG_DTYPES)
+        default["Pre-Payout Defaulters (Cohort)"][cohort_rows] = pre_defaulters
+        default["Post-Payout Defaulters (Cohort)"][cohort_rows] = post_defaulters
+        default["Default Loss (Cohort Lifetime)"][cohort_rows] = total_loss
+        lifecycle = log_store(LIFECYCLE_DTYPES)
+        lifecycle["New Users Acquired for Cohort"][cohort_rows] = cohort_users - cohort_rejoin
+        lifecycle["Rejoining Users for Cohort"][cohort_rows] = cohort_rejoin
+        lifecycle["Total Onboarding to Cohort"][cohort_rows] = cohort_users
+        frames = (df_forecast, pd.DataFrame(deposit, copy=False), pd.DataFrame(default, copy=False),
+                  pd.DataFrame(lifecycle, copy=False))
+    diagnostics.count("rows_emitted", sum(len(df) for df in frames))
+    return frames
+
+
+# === VECTORIZED FORECAST ENGINE ===
+def run_forecast_vectorized(config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                            default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    allocation = allocate_cohorts(config, yearly_duration_share, slab_map, slot_fees, slot_distribution)
+    return price_cohorts(allocation, config, slot_fees, default_pre_pct, collection_day, payout_day, base_year)
@@ -0,0 +1,147 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .config import DURATION_OPTIONS, SLAB_OPTIONS
+from .engine import run_forecast_vectorized
+from .reference import run_forecast_reference
+
+FRAME_NAMES = ("forecast", "deposit_log", "default_log", "lifecycle")
+DEFAULT_RTOL = 1e-9
+DEFAULT_ATOL = 1e-6
+HORIZON_CHOICES = (12, 24, 60, 60, 60, 120)
+
+
+# Integer shares summing to exactly 100 over n keys, with some keys at 0 (at least
+# one stays positive), like a validated sidebar.
+def _random_shares(rng, n, zero_p=0.3):
+    weights = [0 if rng.random() < zero_p else rng.randint(1, 10) for _ in range(n)]
+    if not any(weights):
+        weights[rng.randrange(n)] = 1
+    total = sum(weights)
+    shares = [int(100 * w / total) for w in weights]
+    shares[shares.index(max(shares))] += 100 - sum(shares)
+    return shares
+
+
+# === RANDOM CONFIGS ===
+# One valid set of run_forecast arguments: 1-4 durations, per-year share vectors
+# (sometimes fewer years than the horizon, exercising the carry-forward), slab and
+# slot shares with zeros, blocked slots, occasionally a duration with no slabs,
+# rest periods 0-3, cap_tam on or off and random day-of-month settings.
+def random_forecast_args(rng):
+    durations = sorted(rng.sample(DURATION_OPTIONS, rng.randint(1, 4)))
+    months = rng.choice(HORIZON_CHOICES)
+    share_years = rng.randint(1, (months - 1) // 12 + 1)
+    yearly_duration_share = {y: dict(zip(durations, _random_shares(rng, len(durations))))
+                             for y in range(1, share_years + 1)}
+    slab_map = {d: dict(zip(SLAB_OPTIONS, _random_shares(rng, len(SLAB_OPTIONS), 0.5))) for d in durations}
+    if rng.random() < 0.1:
+        slab_map[durations[0]] = {}
+    slot_fees = {d: {s: {"fee": round(rng.uniform(0, 5), 1), "blocked": rng.random() < 0.2} for s in range(1, d + 1)}
+                 for d in durations}
+    slot_distribution = {d: dict(zip(range(1, d + 1), _random_shares(rng, d, 0.2))) for d in durations}
+    config = {
+        "name": "random", "total_market": rng.choice([0, 1000, 5e6, 20000000]), "tam_pct": rng.uniform(0, 20),
+        "start_pct": rng.uniform(0, 20), "monthly_growth": rng.uniform(0, 5), "annual_growth": rng.uniform(0, 10),
+        "cap_tam": rng.random() < 0.3, "kibor": rng.uniform(5, 20), "spread": rng.uniform(0, 8),
+        "rest_period": rng.randint(0, 3), "default_rate": rng.uniform(0, 10), "penalty_pct": rng.uniform(0, 50),
+        "forecast_months": months,
+    }
+    return (config, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+            rng.randint(0, 100), rng.randint(1, 28), rng.randint(1, 28))
+
+
+# Mismatches between two (forecast, deposit, default, lifecycle) tuples as short
+# descriptions; empty when every column agrees within tolerance. Values are
+# compared, not dtypes (fast engines use compact dtypes).
+def compare_frames(reference, candidate, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    problems = []
+    for name, expected, actual in zip(FRAME_NAMES, reference, candidate):
+        if list(expected.columns) != list(actual.columns):
+            problems.append(f"{name}: columns {list(actual.columns)} != {list(expected.columns)}")
+            continue
+        if len(expected) != len(actual):
+            problems.append(f"{name}: {len(actual)} rows != {len(expected)}")
+            continue
+        for column in expected.columns:
+            want, got = expected[column].to_numpy(), actual[column].to_numpy()
+            if pd.api.types.is_numeric_dtype(expected[column]) and pd.api.types.is_numeric_dtype(actual[column]):
+                want, got = want.astype(np.float64), got.astype(np.float64)
+                bad = ~np.isclose(got, want, rtol=rtol, atol=atol, equal_nan=True)
+            else:
+                bad = want != got
+            if bad.any():
+                row = int(np.flatnonzero(bad)[0])
+                problems.append(f"{name}[{column!r}]: {int(bad.sum())} rows differ, first at row {row} "
+                                f"({got[row]!r} != {want[row]!r})")
+    return problems
+
+
+# === DIFFERENTIAL HARNESS ===
+# Runs `n_configs` random configs through the reference loop engine and each of
+# `engines` ({name: fn taking the reference's arguments}), comparing every frame
+# column by column. Returns one row per (config, engine) with the timings, speedup
+# and any mismatches; a config's arguments can be rebuilt from (seed, Config).
+# `configs` (reference argument tuples) checks those instead of random ones.
+def run_equivalence(n_configs=1000, seed=0, engines=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL, progress=None,
+                    configs=None):
+    engines = {"vectorized": run_forecast_vectorized} if engines is None else engines
+    if configs is None:
+        configs = (random_forecast_args(random.Random(f"{seed}:{config_idx}")) for config_idx in range(n_configs))
+    else:
+        configs = list(configs)
+        n_configs = len(configs)
+    rows = []
+    for config_idx, args in enumerate(configs):
+        start = time.perf_counter()
+        reference = run_forecast_reference(*args)
+        reference_seconds = time.perf_counter() - start
+        for engine_name, engine in engines.items():
+            start = time.perf_counter()
+            candidate = engine(*args)
+            engine_seconds = time.perf_counter() - start
+            problems = compare_frames(reference, candidate, rtol, atol)
+            rows.append({"Config": config_idx, "Engine": engine_name, "Months": args[0]["forecast_months"],
+                         "Cohorts": len(reference[0]), "Reference s": reference_seconds, "Engine s": engine_seconds,
+                         "Speedup": reference_seconds / engine_seconds if engine_seconds else float("inf"),
+                         "Mismatches": "; ".join(problems)})
+        if progress: progress(config_idx + 1, n_configs)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rosca_forecast.equivalence",
+                                     description="Check fast engines against the reference loop engine.")
+    parser.add_argument("--configs", type=int, default=1000, help="Number of random configs (default 1000).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rtol", type=float, default=DEFAULT_RTOL)
+    parser.add_argument("--atol", type=float, default=DEFAULT_ATOL)
+    parser.add_argument("--report", metavar="REPORT.csv", help="Write the per-config results to CSV.")
+    args = parser.parse_args(argv)
+
+    def report(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"\r{done}/{total} configs", end="", file=sys.stderr, flush=True)
+    df = run_equivalence(args.configs, args.seed, rtol=args.rtol, atol=args.atol, progress=report)
+    print(file=sys.stderr)
+    if args.report:
+        df.to_csv(args.report, index=False)
+
+    for engine_name, df_engine in df.groupby("Engine", sort=False):
+        failures = df_engine[df_engine["Mismatches"] != ""]
+        speedup = df_engine["Reference s"].sum() / df_engine["Engine s"].sum()
+        print(f"{engine_name}: {len(df_engine) - len(failures)}/{len(df_engine)} configs match; "
+              f"speedup median {df_engine['Speedup'].median():.1f}x, min {df_engine['Speedup'].min():.1f}x, "
+              f"overall {speedup:.1f}x")
+        for _, row in failures.head(10).iterrows():
+            print(f"  config {row['Config']} (seed {args.seed}): {row['Mismatches']}")
+    return 1 if (df["Mismatches"] != "").any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
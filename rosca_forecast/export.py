@@ -0,0 +1,149 @@
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from .cache import _cached, _canonical, _hash, forecast_cache
+from .diagnostics import diagnostics
+from .engine import ENGINE_VERSION
+from .summaries import MONTHLY_SUMMARY_COLUMNS
+
+# Rows converted to Python values per chunk while streaming a frame to a sheet.
+EXCEL_CHUNK_ROWS = 10000
+# Bundle formats: file extension and zip compression of each table file. Parquet is
+# already compressed inside the file, so it is stored as is.
+BUNDLE_FORMATS = {"parquet": (".parquet", zipfile.ZIP_STORED), "csv": (".csv", zipfile.ZIP_DEFLATED)}
+MANIFEST_NAME = "manifest.json"
+# Same look as the header row DataFrame.to_excel writes.
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def sheet_name_prefix(scenario_name):
+    return scenario_name[:25].replace(" ", "_").replace("/", "_")
+
+
+# === EXCEL EXPORT ===
+# Workbooks are written in xlsxwriter's constant_memory mode: each row is flushed to
+# a temp file as soon as the next one starts, so memory stays flat however many
+# cohort rows a sheet has. Rows must therefore be written in order, one sheet at a
+# time. `output` is a path or a binary file object (e.g. io.BytesIO for a download).
+def open_workbook(output):
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "nan_inf_to_errors": True})
+    workbook.header_format = workbook.add_format(HEADER_FORMAT)
+    return workbook
+
+
+# Header plus rows, chunk by chunk: each chunk's columns are converted to Python
+# values in bulk and zipped into rows.
+def write_frame(workbook, sheet_name, df, chunk_rows=EXCEL_CHUNK_ROWS):
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(c) for c in df.columns], workbook.header_format)
+    columns = [df[c].to_numpy() for c in df.columns]
+    for start in range(0, len(df), chunk_rows):
+        chunk = [np.asarray(col[start:start + chunk_rows]).tolist() for col in columns]
+        for offset, row in enumerate(zip(*chunk)):
+            worksheet.write_row(start + offset + 1, 0, row)
+    return worksheet
+
+
+# The seven frames the app has always exported per scenario (plus the float ledger,
+# pool formation and Monte Carlo quantiles when present) as (table name, frame); empty frames are skipped.
+def scenario_tables(result):
+    tables = [
+        ("ForecastCohorts", result.forecast),
+        ("MonthlySummary", result.monthly if result.monthly.empty else result.monthly[MONTHLY_SUMMARY_COLUMNS]),
+        ("YearlySummary", result.yearly),
+        ("ProfitShare", result.profit_share),
+        ("FloatLedger", result.float_ledger),
+        ("PoolFormation", result.pools),
+        ("MonteCarlo", result.monte_carlo),
+        ("DepositLog", result.deposit_log),
+        ("DefaultLog", result.default_log),
+        ("LifecycleLog", result.lifecycle),
+    ]
+    return [(name, df) for name, df in tables if df is not None and not df.empty]
+
+
+@diagnostics.timed("excel")
+def write_scenario_sheets(workbook, result):
+    prefix = sheet_name_prefix(result.name)
+    for table, df in scenario_tables(result):
+        write_frame(workbook, f"{prefix}_{table}", df)
+
+
+def write_excel(results, output):
+    with open_workbook(output) as workbook:
+        for result in results:
+            write_scenario_sheets(workbook, result)
+
+
+# === PARQUET / CSV BUNDLE ===
+# A zip with one file per scenario table (named like the Excel sheets) and a
+# manifest.json holding the config, engine version and each table's file, row count
+# and column dtypes. Parquet keeps the engine's compact dtypes; it needs pyarrow.
+@diagnostics.timed("bundle")
+def write_bundle(results, output, config=None, fmt="parquet"):
+    if fmt not in BUNDLE_FORMATS:
+        raise ValueError(f"Unknown bundle format {fmt!r}; expected one of {', '.join(BUNDLE_FORMATS)}")
+    extension, compression = BUNDLE_FORMATS[fmt]
+    manifest = {
+        "format": fmt,
+        "engine_version": ENGINE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": config.to_dict() if config is not None else None,
+        "tables": [],
+    }
+    with zipfile.ZipFile(output, "w", compression=compression) as archive:
+        for result in results:
+            prefix = sheet_name_prefix(result.name)
+            for table, df in scenario_tables(result):
+                file_name = f"{prefix}_{table}{extension}"
+                buffer = io.BytesIO()
+                if fmt == "parquet":
+                    df.to_parquet(buffer, index=False)
+                else:
+                    df.to_csv(buffer, index=False)
+                archive.writestr(file_name, buffer.getvalue())
+                manifest["tables"].append({
+                    "scenario": result.name, "table": table, "file": file_name, "rows": len(df),
+                    "columns": {str(c): str(dtype) for c, dtype in df.dtypes.items()},
+                })
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+
+# Export file bytes for `results`, which must be run_all(config) (or the same results
+# built scenario by scenario): Excel when fmt is None, else a bundle. Keyed on the
+# whole config and the engine version, so an unchanged run (also after a restart,
+# with a disk cache) reuses the file instead of writing it again.
+def cached_export(config, results, fmt=None, cache=None):
+    cache = forecast_cache if cache is None else cache
+    key = "export:" + _hash([ENGINE_VERSION, _canonical(config.to_dict()), fmt])
+
+    def compute():
+        buffer = io.BytesIO()
+        if fmt is None:
+            write_excel(results, buffer)
+        else:
+            write_bundle(results, buffer, config, fmt=fmt)
+        return buffer.getvalue()
+    return _cached(cache, key, compute)
+
+
+# Reads a bundle back as (manifest, {scenario: {table: frame}}). CSV columns get the
+# dtypes recorded in the manifest.
+def read_bundle(path):
+    frames = {}
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        for entry in manifest["tables"]:
+            with archive.open(entry["file"]) as fh:
+                if manifest["format"] == "parquet":
+                    df = pd.read_parquet(io.BytesIO(fh.read()))
+                else:
+                    df = pd.read_csv(fh, dtype={c: d for c, d in entry["columns"].items() if d != "object"})
+            frames.setdefault(entry["scenario"], {})[entry["table"]] = df
+    return manifest, frames
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from .diagnostics import diagnostics
+from .engine import FORECAST_MONTHS
+
+LEDGER_COLUMNS = ["Month", "Live Cohorts", "Live Members", "Installments Collected", "Payouts Disbursed",
+                  "Payout Recipient Users", "Net Cash Flow", "Outstanding Balance (End of Month)"]
+
+
+# Sum of `values` over every month in [start, end) for each cohort, as a difference
+# array: +value at the first month, -value one past the last, then a running sum.
+def _spans(start, end, values, n):
+    diff = np.bincount(start, weights=values, minlength=n + 1)[:n + 1]
+    diff -= np.bincount(np.minimum(end, n), weights=values, minlength=n + 1)[:n + 1]
+    return np.cumsum(diff[:n])
+
+
+# === FLOAT LEDGER ===
+# Scheduled month-by-month flows across all live cohorts: every member of a cohort
+# pays the installment in each month from joining until the duration ends, and the
+# cohort's payout (users x commitment) goes out in its Payout Due Month. The
+# outstanding balance is the running total of collections minus payouts: the member
+# money the platform holds at the end of each month (negative while it is fronting
+# early payouts). Defaults are not applied here; losses are accrued on the cohorts.
+# Covers the horizon, or with run_off every month until the last scheduled flow.
+@diagnostics.timed("ledger")
+def build_float_ledger(df_forecast, months=FORECAST_MONTHS, run_off=False):
+    if df_forecast.empty:
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
+    start = df_forecast["Month Joined"].to_numpy(dtype=np.int64) - 1
+    end = start + df_forecast["Duration"].to_numpy(dtype=np.int64)
+    payout = df_forecast["Payout Due Month"].to_numpy(dtype=np.int64) - 1
+    users = df_forecast["Users"].to_numpy(dtype=np.float64)
+    n = max(months, int(end.max()), int(payout.max()) + 1) if run_off else months
+
+    in_ledger = payout < n
+    collected = _spans(start, end, df_forecast["Cash In (Installments This Month)"].to_numpy(), n)
+    disbursed = np.bincount(payout[in_ledger], weights=df_forecast["Payout Amount Scheduled"].to_numpy()[in_ledger],
+                            minlength=n)[:n]
+    net = collected - disbursed
+    return pd.DataFrame({
+        "Month": np.arange(1, n + 1),
+        "Live Cohorts": np.rint(_spans(start, end, np.ones(len(start)), n)).astype(np.int64),
+        "Live Members": np.rint(_spans(start, end, users, n)).astype(np.int64),
+        "Installments Collected": collected,
+        "Payouts Disbursed": disbursed,
+        "Payout Recipient Users": np.rint(np.bincount(payout[in_ledger], weights=users[in_ledger],
+                                                      minlength=n)[:n]).astype(np.int64),
+        "Net Cash Flow": net,
+        "Outstanding Balance (End of Month)": np.cumsum(net),
+    })
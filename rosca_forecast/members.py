@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from .diagnostics import diagnostics
+from .engine import (FORECAST_COLUMNS, FORECAST_DTYPES, _cascade, _result_store, acquisition_schedule,
+                     build_allocation_layout, cohort_costs, forecast_horizon)
+from .summaries import build_summaries
+
+# One record per enrolment (a member who rejoins gets a new record with the same
+# member id): 18 bytes, so 10 million enrolments take about 180 MB.
+# default: 0 = none, 1 = before payout, 2 = after payout.
+MEMBER_DTYPE = np.dtype([
+    ("member", np.int32), ("join_month", np.int16), ("duration", np.int8), ("installment", np.int32),
+    ("slot", np.int8), ("pool", np.int32), ("default", np.int8), ("rejoined", np.bool_),
+])
+NO_DEFAULT, PRE_PAYOUT_DEFAULT, POST_PAYOUT_DEFAULT = 0, 1, 2
+# Enrolments beyond this raise instead of exhausting memory.
+MAX_MEMBERS = 20_000_000
+
+
+# Grows the member table by doubling, so appending a month is amortised O(rows).
+def _reserve(members, needed):
+    if needed <= len(members):
+        return members
+    grown = np.empty(max(needed, 2 * len(members)), dtype=MEMBER_DTYPE)
+    grown[:len(members)] = members
+    return grown
+
+
+# === MEMBER-LEVEL SIMULATION ===
+# Every member is simulated month by month. Each month's joiners are the new users
+# plus the members due back from an earlier committee. They are split over
+# duration, slab and slot with the allocation cascade, rejoiners first as in
+# allocate_cohorts.
+#
+# Within each (month, duration, slab), the r-th member of every slot sits in pool
+# r. A pool is therefore a whole committee, and pools missing some slots still
+# count as pools.
+#
+# Without a seed, defaults follow the cohort engine's rounding:
+# - ceil(users x default rate) members of each cohort default (the last ones in
+#   it), and ceil(of those x pre-payout %) default before payout;
+# - every non-defaulter rejoins after duration + rest period.
+# With a seed, each member defaults with probability default rate, before payout
+# with probability pre-payout %, and rejoins with probability rejoin_pct.
+#
+# Returns the enrolment records in join order; more than max_members raises ValueError.
+@diagnostics.timed("member_simulation")
+def simulate_members(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                     seed=None, rejoin_pct=100, max_members=MAX_MEMBERS):
+    months = forecast_horizon(config)
+    layout = build_allocation_layout(yearly_duration_share, slab_map, slot_fees, slot_distribution, months)
+    new_users = acquisition_schedule(config, months)
+    rng = np.random.default_rng(seed) if seed is not None else None
+    rest_months = int(config['rest_period'])
+    default_frac = config['default_rate'] / 100
+    pre_frac = default_pre_pct / 100
+    rejoin_frac = rejoin_pct / 100
+
+    members = np.empty(int(new_users.sum()), dtype=MEMBER_DTYPE)
+    n_rows = 0
+    next_member = 0
+    next_pool = 0
+    due_back = {}
+    for m_idx in range(months):
+        y = m_idx // 12
+        returning = np.concatenate(due_back.pop(m_idx, [np.zeros(0, dtype=np.int32)]))
+        fresh = np.arange(next_member, next_member + new_users[m_idx], dtype=np.int32)
+        next_member += int(new_users[m_idx])
+        joining = np.concatenate([returning, fresh])
+        if not len(joining) or not layout["year_active"][y]:
+            continue
+
+        year = np.array([y])
+        dur_idx = layout["year_dur"][year]
+        dur_alloc = _cascade(np.array([len(joining)]), layout["year_shares"][year], layout["year_last"][year])
+        slab_alloc = _cascade(dur_alloc, layout["slab_shares"][dur_idx], layout["slab_last"][dur_idx])
+        counts = _cascade(slab_alloc, layout["slot_shares"][dur_idx][:, :, None, :],
+                          layout["slot_last"][dur_idx][:, :, None, :])[0]
+        flat = counts.reshape(-1)
+        n = int(flat.sum())
+        if not n:
+            continue
+        d_pos, s_pos, k_pos = np.unravel_index(np.repeat(np.arange(flat.size), flat), counts.shape)
+        cell_start = np.repeat(np.cumsum(flat) - flat, flat)
+        pos = np.arange(n) - cell_start
+        cell_users = np.repeat(flat, flat)
+
+        # Pool r of a (duration, slab) takes the r-th member of each slot.
+        group_pools = counts.max(axis=2).reshape(-1)
+        group_start = next_pool + np.cumsum(group_pools) - group_pools
+        next_pool += int(group_pools.sum())
+        pool = group_start[d_pos * counts.shape[1] + s_pos] + pos
+
+        if rng is None:
+            cell_defaulters = np.ceil(cell_users * default_frac).astype(np.int64)
+            first_default = cell_users - cell_defaulters
+            is_default = pos >= first_default
+            is_pre = is_default & (pos - first_default < np.ceil(cell_defaulters * pre_frac))
+            rejoins = ~is_default
+        else:
+            is_default = rng.random(n) < default_frac
+            is_pre = is_default & (rng.random(n) < pre_frac)
+            rejoins = ~is_default if rejoin_frac >= 1 else ~is_default & (rng.random(n) < rejoin_frac)
+
+        duration = layout["durations"][dur_idx[0, d_pos]]
+        records = np.empty(n, dtype=MEMBER_DTYPE)
+        records["member"] = joining[:n]
+        records["join_month"] = m_idx
+        records["duration"] = duration
+        records["installment"] = layout["slab_values"][dur_idx[0, d_pos], s_pos]
+        records["slot"] = layout["slot_numbers"][dur_idx[0, d_pos], k_pos]
+        records["pool"] = pool
+        records["default"] = np.where(is_pre, PRE_PAYOUT_DEFAULT, np.where(is_default, POST_PAYOUT_DEFAULT, NO_DEFAULT))
+        records["rejoined"] = np.arange(n) < len(returning)
+        if n_rows + n > max_members:
+            raise ValueError(f"Member simulation exceeds {max_members:,} enrolments by month {m_idx + 1}")
+        members = _reserve(members, n_rows + n)
+        members[n_rows:n_rows + n] = records
+        n_rows += n
+
+        rejoin_at = m_idx + duration + rest_months
+        for month in np.unique(rejoin_at[rejoins & (rejoin_at < months)]).tolist():
+            due_back.setdefault(month, []).append(joining[:n][rejoins & (rejoin_at == month)])
+    diagnostics.count("members_simulated", n_rows)
+    return members[:n_rows].copy()
+
+
+# === MEMBER AGGREGATION ===
+# The member records as a cohort forecast frame (same columns and dtypes as the
+# cohort engine's), so build_summaries and the exports apply unchanged. Cohorts
+# are the runs of members sharing (month, duration, slab, slot). Default losses use
+# each member's own default event. Pools Formed counts whole pools: a pool is
+# credited to the first slot of its (month, duration, slab) that reaches it.
+@diagnostics.timed("member_aggregation")
+def member_forecast(members, config, slot_fees, default_pre_pct, collection_day=1, payout_day=20, base_year=2024):
+    if not len(members):
+        return pd.DataFrame()
+    months = forecast_horizon(config)
+    month_group_change = np.zeros(len(members) - 1, dtype=bool)
+    for field in ("join_month", "duration", "installment"):
+        month_group_change |= members[field][1:] != members[field][:-1]
+    cohort_change = month_group_change | (members["slot"][1:] != members["slot"][:-1])
+    starts = np.flatnonzero(np.r_[True, cohort_change])
+    first = members[starts]
+    n_cohorts = len(starts)
+
+    users = np.diff(np.r_[starts, len(members)])
+    pre_defaulters = np.add.reduceat((members["default"] == PRE_PAYOUT_DEFAULT).astype(np.int64), starts)
+    post_defaulters = np.add.reduceat((members["default"] == POST_PAYOUT_DEFAULT).astype(np.int64), starts)
+    m_idx = first["join_month"].astype(np.int64)
+    duration = first["duration"].astype(np.int64)
+    installment = first["installment"].astype(np.int64)
+    slot = first["slot"].astype(np.int64)
+
+    # Pools each cohort opens beyond the lower slots of its (month, duration, slab).
+    group_start = np.r_[True, month_group_change[starts[1:] - 1]]
+    offset = (np.cumsum(group_start) - 1) * (int(users.max()) + 1)
+    prior = np.r_[0, (np.maximum.accumulate(users + offset) - offset)[:-1]]
+    prior[group_start] = 0
+    pools = np.maximum(users - prior, 0)
+
+    allocation = {"m_idx": m_idx, "users": users, "installment": installment, "duration": duration, "slot": slot,
+                  "defaulters": (pre_defaulters + post_defaulters).astype(np.int64), "months": months,
+                  "slot_numbers": np.array([[int(slot.max())]])}
+    costs = cohort_costs(allocation, config, default_pre_pct, collection_day, payout_day, base_year)
+    commitment = costs["commitment"]
+    penalty_frac = config['penalty_pct'] / 100
+    total_loss = pre_defaulters * (commitment * (1 - penalty_frac)) + post_defaulters * commitment
+    fee_lookup = np.zeros((duration.max() + 1, slot.max() + 1))
+    for d, slots in slot_fees.items():
+        for s, meta in slots.items():
+            if d < fee_lookup.shape[0] and s < fee_lookup.shape[1]:
+                fee_lookup[d, s] = meta.get('fee', 0)
+    fee_frac = fee_lookup[duration, slot] / 100.0
+    total_fees = commitment * fee_frac * users
+    total_nii = costs["total_nii"]
+    earned = total_fees + total_nii
+
+    forecast = _result_store(FORECAST_DTYPES, n_cohorts)
+    for name, values in zip(FORECAST_COLUMNS, [
+        m_idx + 1, m_idx // 12 + 1, duration, installment, slot,
+        users, pools, commitment, fee_frac * 100,
+        total_fees, total_nii / duration, total_nii,
+        earned - total_loss, users * installment, m_idx + slot,
+        users * commitment, total_loss, np.maximum(0, total_loss - earned),
+    ]):
+        forecast[name][:] = values
+    return pd.DataFrame(forecast, copy=False)
+
+
+# Member simulation plus its cohort frame and summaries, for one scenario's
+# run_forecast arguments. Returns (members, forecast, monthly, yearly, profit_share).
+def run_member_simulation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                          collection_day=1, payout_day=20, base_year=2024, party_a_pct=0.5, seed=None, rejoin_pct=100):
+    members = simulate_members(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                               seed, rejoin_pct)
+    forecast = member_forecast(members, config, slot_fees, default_pre_pct, collection_day, payout_day, base_year)
+    return (members, forecast, *build_summaries(forecast, party_a_pct, forecast_horizon(config)))
+
+
+# Side-by-side yearly totals of the cohort engine and the member simulation.
+def compare_yearly(yearly_cohorts, yearly_members, columns=("Users Joining This Month", "Pools Formed",
+                                                             "Total Default Loss (Lifetime)",
+                                                             "External Capital For Loss (Lifetime)")):
+    df = pd.DataFrame({"Year": yearly_cohorts["Year"]})
+    for column in columns:
+        df[f"{column} (Cohorts)"] = yearly_cohorts[column].to_numpy()
+        df[f"{column} (Members)"] = yearly_members[column].to_numpy() if len(yearly_members) else 0
+    return df
@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .daycount import lifetime_held_days
+from .diagnostics import diagnostics
+from .engine import (_cascade, acquisition_schedule, build_allocation_layout, forecast_horizon, rejoin_ring, ring_take,
+                     slot_fee_table)
+
+MC_MEASURES = {
+    "default_loss": "Default Loss",
+    "external_capital": "External Capital Needed",
+    "gross_profit": "Gross Profit",
+}
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+DEFAULT_BATCH_PATHS = 256
+
+
+# === MONTE CARLO PATHS ===
+# Same cascade as allocate_cohorts, with a leading path axis. Defaulters are
+# Binomial(users, default rate) per cohort, pre-payout defaulters
+# Binomial(defaulters, pre-payout %), and each non-defaulter rejoins with
+# probability rejoin_pct. Returns per-path monthly totals (by joining month) of
+# lifetime default loss, external capital and gross profit, each shaped
+# (n_paths, months).
+def simulate_paths(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                   collection_day=1, payout_day=20, base_year=2024, n_paths=1000, seed=None, rejoin_pct=100):
+    months = forecast_horizon(config)
+    rng = np.random.default_rng(seed)
+    layout = build_allocation_layout(yearly_duration_share, slab_map, slot_fees, slot_distribution, months)
+    new_users = acquisition_schedule(config, months)
+    fee_frac_table = slot_fee_table(layout["durations"], layout["slot_numbers"], slot_fees) / 100.0
+    held_days_table = lifetime_held_days(months, layout["slot_numbers"].max(), collection_day, payout_day, base_year)
+
+    rest_months = int(config['rest_period'])
+    default_frac = config['default_rate'] / 100
+    default_pre_frac = default_pre_pct / 100
+    rejoin_frac = rejoin_pct / 100
+    daily_rate = (config['kibor'] / 100 + config['spread'] / 100) / 365
+    penalty_frac = config['penalty_pct'] / 100
+    month_year = np.arange(months) // 12
+
+    totals = {key: np.zeros((n_paths, months)) for key in MC_MEASURES}
+
+    real_durations = layout["durations"][:-1]
+    lag = max(1, int(real_durations.min()) + rest_months) if real_durations.size else months
+    ring = rejoin_ring(real_durations, rest_months, (n_paths,))
+    path_offset = (np.arange(n_paths) * ring.shape[-1])[:, None, None, None, None]
+    for start in range(0, months, lag):
+        block = slice(start, min(start + lag, months))
+        year_idx = month_year[block]
+        total = new_users[block][None, :] + ring_take(ring, block)
+
+        dur_idx = layout["year_dur"][year_idx]
+        dur_alloc = _cascade(total, layout["year_shares"][year_idx], layout["year_last"][year_idx])
+        slab_alloc = _cascade(dur_alloc, layout["slab_shares"][dur_idx], layout["slab_last"][dur_idx])
+        users = _cascade(slab_alloc, layout["slot_shares"][dur_idx][:, :, None, :],
+                         layout["slot_last"][dur_idx][:, :, None, :])
+
+        defaulters = rng.binomial(users, default_frac)
+        pre_defaulters = rng.binomial(defaulters, default_pre_frac)
+        post_defaulters = defaulters - pre_defaulters
+        staying = users - defaulters
+        rejoiners = staying if rejoin_frac >= 1 else rng.binomial(staying, rejoin_frac)
+
+        month_idx = np.arange(block.start, block.stop)[:, None, None, None]
+        rejoin_at = month_idx + layout["durations"][dur_idx][:, :, None, None] + rest_months
+        rejoin_at = np.broadcast_to(rejoin_at, users.shape)
+        mask = (rejoiners > 0) & (rejoin_at < months) & (rejoin_at > month_idx)
+        ring_pos = np.broadcast_to(path_offset, users.shape) + rejoin_at % ring.shape[-1]
+        np.add.at(ring.reshape(-1), ring_pos[mask], rejoiners[mask])
+
+        # Economics of every (month, duration, slab, slot) cell; empty cells add 0.
+        duration = layout["durations"][dur_idx][:, :, None, None]
+        installment = layout["slab_values"][dur_idx][:, :, :, None]
+        commitment = installment * duration
+        slot_idx = np.maximum(layout["slot_numbers"][dur_idx] - 1, 0)
+        held_days = held_days_table[np.arange(block.start, block.stop)[:, None, None], slot_idx][:, :, None, :]
+        fee_frac = fee_frac_table[dur_idx][:, :, None, :]
+        earned = commitment * fee_frac * users + installment * daily_rate * held_days * users
+        loss = pre_defaulters * (commitment * (1 - penalty_frac)) + post_defaulters * commitment
+        cells = (2, 3, 4)
+        totals["default_loss"][:, block] = loss.sum(axis=cells)
+        totals["external_capital"][:, block] = np.maximum(0, loss - earned).sum(axis=cells)
+        totals["gross_profit"][:, block] = (earned - loss).sum(axis=cells)
+    return totals
+
+
+def _simulate_batch(args, kwargs, n_paths, seed):
+    return simulate_paths(*args, **kwargs, n_paths=n_paths, seed=seed)
+
+
+# Runs n_paths in batches of batch_paths, each with its own child of `seed`, so the
+# result does not depend on how batches are spread over worker processes.
+# workers > 1 shards the batches over a ProcessPoolExecutor.
+@diagnostics.timed("monte_carlo")
+def run_monte_carlo(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+                    collection_day=1, payout_day=20, base_year=2024, n_paths=1000, seed=None, rejoin_pct=100,
+                    batch_paths=DEFAULT_BATCH_PATHS, workers=1):
+    args = (config, yearly_duration_share, slab_map, slot_fees, slot_distribution, default_pre_pct,
+            collection_day, payout_day, base_year)
+    kwargs = {"rejoin_pct": rejoin_pct}
+    sizes = [min(batch_paths, n_paths - i) for i in range(0, n_paths, batch_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(_simulate_batch, [args] * len(sizes), [kwargs] * len(sizes), sizes, seeds))
+    else:
+        batches = [_simulate_batch(args, kwargs, size, child) for size, child in zip(sizes, seeds)]
+    return {key: np.concatenate([b[key] for b in batches]) for key in MC_MEASURES}
+
+
+# P5/P50/P95 (by default) of each measure per year of joining, plus a Lifetime row,
+# laid out like the Profit Share Summary.
+def quantile_table(paths, quantiles=DEFAULT_QUANTILES):
+    months = next(iter(paths.values())).shape[1]
+    month_year = np.arange(months) // 12
+    num_years = month_year[-1] + 1
+    table = {"Year": [str(y) for y in range(1, num_years + 1)] + ["Lifetime"]}
+    for key, label in MC_MEASURES.items():
+        monthly = paths[key]
+        annual = np.stack([monthly[:, month_year == y].sum(axis=1) for y in range(num_years)], axis=1)
+        per_row = np.concatenate([annual, monthly.sum(axis=1)[:, None]], axis=1)
+        for q, values in zip(quantiles, np.quantile(per_row, quantiles, axis=0)):
+            table[f"{label} P{q * 100:g}"] = values
+    return pd.DataFrame(table)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from .cache import _cached, _hash, allocation_inputs, cached_allocation, forecast_cache
+from .diagnostics import diagnostics
+from .engine import _result_store
+
+POOL_DTYPES = {
+    "Month": np.int32, "Year": np.int32, "Duration": np.int16, "Slab Installment": np.int32,
+    "Users Arrived": np.int64, "Users Carried In": np.int64, "Pools Formed": np.int64, "Members Seated": np.int64,
+    "Blocked Slots Held": np.int64, "Unfilled Slots": np.int64, "Waiting Users": np.int64,
+}
+POOL_COLUMNS = list(POOL_DTYPES)
+POOL_SUMMARY_COLUMNS = ["Month", "Users Arrived", "Users Carried In", "Pools Formed", "Members Seated",
+                        "Blocked Slots Held", "Unfilled Slots", "Waiting Users"]
+
+
+# Seats a pool of `duration` needs filled by members: slots 1..duration that are
+# not blocked (a blocked slot is held by the platform, not sold).
+def required_slots(durations, slot_fees, width):
+    slots = np.arange(1, width + 1)
+    required = slots[None, :] <= np.asarray(durations)[:, None]
+    for row, d in enumerate(np.asarray(durations).tolist()):
+        for s, meta in slot_fees.get(d, {}).items():
+            if meta.get('blocked', False) and 1 <= s <= width:
+                required[row, s - 1] = False
+    return required
+
+
+# === POOL FORMATION ===
+# Packs each month's cohorts into real committees. Within a (duration, slab), a pool
+# needs exactly one member in every unblocked slot 1..duration, so the pools formed
+# in a month are the fewest members available in any required slot; the rest wait.
+# Available = this month's arrivals plus, with carry_over, the users still waiting
+# from earlier months (without it they drop out at month end).
+#
+# Per (month, duration, slab) row:
+# - Blocked Slots Held: platform-held seats in the pools formed.
+# - Unfilled Slots: members still missing to seat everyone waiting, i.e. to fill the
+#   pools the fullest waiting slot would open.
+# - Waiting Users: left unseated at month end (carried into the next month).
+# One pass over the months on (slab x slot) arrays, so cost is months x slabs x slots.
+@diagnostics.timed("pool_formation")
+def form_pools(allocation, slot_fees, carry_over=True):
+    users = allocation["users"]
+    if not len(users):
+        return pd.DataFrame(columns=POOL_COLUMNS)
+    months = allocation["months"]
+    duration = allocation["duration"]
+    groups, group = np.unique(np.stack([duration, allocation["installment"]]), axis=1, return_inverse=True)
+    group = group.reshape(-1)
+    group_duration, group_installment = groups
+    n_groups = groups.shape[1]
+    width = int(max(group_duration.max(), allocation["slot"].max()))
+
+    arrivals = np.zeros((months, n_groups, width), dtype=np.int64)
+    np.add.at(arrivals, (allocation["m_idx"], group, allocation["slot"] - 1), users)
+    required = required_slots(group_duration, slot_fees, width)
+    has_required = required.any(axis=1)
+    blocked_per_pool = group_duration - required.sum(axis=1)
+
+    stats = {name: np.zeros((months, n_groups), dtype=np.int64) for name in
+             ("Users Arrived", "Users Carried In", "Pools Formed", "Blocked Slots Held", "Unfilled Slots",
+              "Waiting Users")}
+    waiting = np.zeros((n_groups, width), dtype=np.int64)
+    for m_idx in range(months):
+        carried = waiting if carry_over else np.zeros_like(waiting)
+        available = carried + arrivals[m_idx]
+        pools = np.where(has_required, np.where(required, available, np.iinfo(np.int64).max).min(axis=1), 0)
+        waiting = available - pools[:, None] * required
+        open_pools = np.where(required, waiting, 0).max(axis=1)
+        stats["Users Arrived"][m_idx] = arrivals[m_idx].sum(axis=1)
+        stats["Users Carried In"][m_idx] = carried.sum(axis=1)
+        stats["Pools Formed"][m_idx] = pools
+        stats["Blocked Slots Held"][m_idx] = pools * blocked_per_pool
+        stats["Unfilled Slots"][m_idx] = (required * (open_pools[:, None] - waiting)).sum(axis=1)
+        stats["Waiting Users"][m_idx] = waiting.sum(axis=1)
+
+    # One row per (month, duration, slab) with anyone arriving or waiting.
+    m_idx, g_idx = np.nonzero(stats["Users Arrived"] + stats["Users Carried In"])
+    pools = stats["Pools Formed"][m_idx, g_idx]
+    seated = pools * (group_duration[g_idx] - blocked_per_pool[g_idx])
+    diagnostics.count("pools_formed", int(pools.sum()))
+    df = _result_store(POOL_DTYPES, len(m_idx))
+    for name, values in zip(POOL_COLUMNS, [
+        m_idx + 1, m_idx // 12 + 1, group_duration[g_idx], group_installment[g_idx],
+        stats["Users Arrived"][m_idx, g_idx], stats["Users Carried In"][m_idx, g_idx], pools, seated,
+        stats["Blocked Slots Held"][m_idx, g_idx], stats["Unfilled Slots"][m_idx, g_idx],
+        stats["Waiting Users"][m_idx, g_idx],
+    ]):
+        df[name][:] = values
+    return pd.DataFrame(df, copy=False)
+
+
+# Same inputs as allocate_cohorts, cached on the allocation inputs (which hold the
+# blocked slots) and carry_over.
+def pool_formation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, carry_over=True,
+                   cache=None):
+    cache = forecast_cache if cache is None else cache
+    inputs = allocation_inputs(config, yearly_duration_share, slab_map, slot_fees, slot_distribution)
+    key = "pools:" + _hash([inputs, bool(carry_over)])
+
+    def compute():
+        allocation = cached_allocation(config, yearly_duration_share, slab_map, slot_fees, slot_distribution, cache)
+        return form_pools(allocation, slot_fees, carry_over)
+    return _cached(cache, key, compute).copy(deep=False)
+
+
+# Totals per month over all durations and slabs.
+def pool_summary(df_pools):
+    if df_pools.empty:
+        return pd.DataFrame(columns=POOL_SUMMARY_COLUMNS)
+    return df_pools.groupby("Month", as_index=False)[POOL_SUMMARY_COLUMNS[1:]].sum()
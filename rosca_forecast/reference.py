@@ -0,0 +1,227 @@
+import math
+
+import pandas as pd
+
+from .daycount import days_between_specific_dates
+from .diagnostics import diagnostics
+
+
+# === REFERENCE (LOOP) FORECAST ENGINE ===
+# The original cohort-by-cohort implementation of the forecast. It is kept
+# verbatim (sidebar globals turned into parameters, plus the configurable horizon
+# and year-share carry-forward) so faster engines can be checked against it; the
+# app itself uses the vectorized engine.
+@diagnostics.timed("reference_forecast")
+def run_forecast_reference(config_param_fc, yearly_duration_share, slab_map, slot_fees, slot_distribution,
+                           default_pre_pct, global_collection_day, global_payout_day):
+    months_fc = int(config_param_fc.get('forecast_months', 60))
+    last_share_year_fc = max(yearly_duration_share, default=0)
+    
+    potential_initial_tam_float = config_param_fc['total_market'] * (config_param_fc['tam_pct'] / 100)
+    initial_tam_fc = math.ceil(potential_initial_tam_float)
+    if initial_tam_fc < 0: initial_tam_fc = 0 
+    
+    acquisition_rate_fc = config_param_fc['monthly_growth'] / 100
+    
+    potential_float_m1_users = initial_tam_fc * (config_param_fc['start_pct'] / 100) 
+    initial_new_users_m1_fc = math.ceil(potential_float_m1_users)
+    if initial_new_users_m1_fc < 0: initial_new_users_m1_fc = 0
+    
+    cumulative_acquired_base_fc = 0 
+    rejoin_tracker_fc = {}
+    forecast_data_fc, deposit_log_data_fc, default_log_data_fc, lifecycle_data_fc = [], [], [], []
+    
+    TAM_current_year_fc = initial_tam_fc 
+    TAM_used_cumulative_vs_cap_fc = 0 
+    enforce_cap_growth_fc = config_param_fc.get("cap_tam", False)
+
+    current_kibor_rate_fc = config_param_fc['kibor'] / 100
+    current_spread_rate_fc = config_param_fc['spread'] / 100
+    daily_interest_rate_fc = (current_kibor_rate_fc + current_spread_rate_fc) / 365
+    current_rest_period_months_fc = config_param_fc['rest_period']
+    current_default_frac_fc = config_param_fc['default_rate'] / 100
+    current_penalty_frac_fc = config_param_fc['penalty_pct'] / 100
+    global_default_pre_frac_fc = default_pre_pct / 100
+    global_default_post_frac_fc = (100 - default_pre_pct) / 100
+
+    for m_idx_fc in range(months_fc): 
+        current_month_num_fc = m_idx_fc + 1 
+        current_year_num_fc = m_idx_fc // 12 + 1
+        
+        if m_idx_fc > 0 and m_idx_fc % 12 == 0: 
+            TAM_current_year_fc_float = TAM_current_year_fc * (1 + config_param_fc['annual_growth'] / 100)
+            TAM_current_year_fc = math.ceil(TAM_current_year_fc_float) 
+
+        potential_new_acquisitions_this_month_fc = 0 
+        if m_idx_fc == 0: 
+            potential_new_acquisitions_this_month_fc = initial_new_users_m1_fc 
+        else: 
+            if cumulative_acquired_base_fc > 0 and acquisition_rate_fc > 0:
+                potential_float_users = cumulative_acquired_base_fc * acquisition_rate_fc
+                potential_new_acquisitions_this_month_fc = math.ceil(potential_float_users)
+        if potential_new_acquisitions_this_month_fc < 0 : potential_new_acquisitions_this_month_fc = 0
+
+        actual_new_acquisitions_this_month_fc = potential_new_acquisitions_this_month_fc
+        if enforce_cap_growth_fc:
+            current_tam_for_cap = max(0, TAM_current_year_fc)
+            if (TAM_used_cumulative_vs_cap_fc + actual_new_acquisitions_this_month_fc) > current_tam_for_cap:
+                actual_new_acquisitions_this_month_fc = max(0, current_tam_for_cap - TAM_used_cumulative_vs_cap_fc)
+            actual_new_acquisitions_this_month_fc = int(actual_new_acquisitions_this_month_fc) 
+        
+        cumulative_acquired_base_fc += actual_new_acquisitions_this_month_fc
+        TAM_used_cumulative_vs_cap_fc += actual_new_acquisitions_this_month_fc
+        newly_acquired_this_month_fc_val = actual_new_acquisitions_this_month_fc
+
+        rejoining_users_this_month_fc_val = rejoin_tracker_fc.get(m_idx_fc, 0) 
+        total_onboarding_this_month_fc = newly_acquired_this_month_fc_val + rejoining_users_this_month_fc_val
+        temp_rejoining_users_for_allocation = rejoining_users_this_month_fc_val
+        
+        # Get the duration shares for the current year, default to empty dict if not found
+        durations_for_this_year_fc = yearly_duration_share.get(min(current_year_num_fc, last_share_year_fc), {})
+
+        if total_onboarding_this_month_fc == 0 or not durations_for_this_year_fc:
+            lifecycle_data_fc.append({"Month": current_month_num_fc, "New Users Acquired for Cohort": 0, "Rejoining Users for Cohort": 0, "Total Onboarding to Cohort": 0})
+            deposit_log_data_fc.append({"Month": current_month_num_fc, "Users Joining": 0, "Installments Collected": 0, "NII This Month (Avg)": 0})
+            default_log_data_fc.append({"Month": current_month_num_fc, "Year": current_year_num_fc, "Pre-Payout Defaulters (Cohort)": 0, "Post-Payout Defaulters (Cohort)": 0, "Default Loss (Cohort Lifetime)": 0})
+            continue
+
+        # --- User distribution logic with rounding error management ---
+        # This ensures that the sum of users distributed across cohorts equals total_onboarding_this_month_fc
+        remaining_users_to_distribute = total_onboarding_this_month_fc
+        num_dur_configs = len(durations_for_this_year_fc)
+        
+        # Create a list of (duration, share_pct) to sort/process if needed, or iterate directly
+        sorted_dur_shares = sorted(durations_for_this_year_fc.items(), key=lambda item: item[1], reverse=True) # Example: process larger shares first
+
+        for idx_dur, (dur_val_fc, dur_share_pct_fc) in enumerate(sorted_dur_shares):
+            if dur_share_pct_fc == 0 or remaining_users_to_distribute == 0: continue
+            
+            # Allocate users for this duration
+            if idx_dur == num_dur_configs - 1: # Last duration config
+                users_for_this_duration_fc = remaining_users_to_distribute
+            else:
+                users_for_this_duration_fc = math.ceil(total_onboarding_this_month_fc * (dur_share_pct_fc / 100.0))
+                users_for_this_duration_fc = min(users_for_this_duration_fc, remaining_users_to_distribute)
+            
+            if users_for_this_duration_fc == 0: continue
+            current_duration_distributed_users = users_for_this_duration_fc # Keep track for this duration's slabs
+            
+            # Slabs for this duration
+            slabs_for_this_duration = slab_map.get(dur_val_fc, {})
+            if not slabs_for_this_duration: continue
+            
+            num_slab_configs = len(slabs_for_this_duration)
+            sorted_slab_shares = sorted(slabs_for_this_duration.items(), key=lambda item: item[1], reverse=True)
+
+            for idx_slab, (installment_val_fc, slab_share_pct_fc) in enumerate(sorted_slab_shares):
+                if slab_share_pct_fc == 0 or current_duration_distributed_users == 0: continue
+
+                if idx_slab == num_slab_configs -1:
+                    users_for_this_slab_fc = current_duration_distributed_users
+                else:
+                    users_for_this_slab_fc = math.ceil(users_for_this_duration_fc * (slab_share_pct_fc / 100.0))
+                    users_for_this_slab_fc = min(users_for_this_slab_fc, current_duration_distributed_users)
+
+                if users_for_this_slab_fc == 0: continue
+                current_slab_distributed_users = users_for_this_slab_fc
+
+                # Slots for this slab/duration
+                slots_for_this_config = slot_distribution.get(dur_val_fc, {})
+                if not slots_for_this_config : continue
+                
+                num_slot_configs = sum(1 for s_cfg in slot_fees.get(dur_val_fc, {}).values() if not s_cfg.get('blocked', False)) # Count unblocked
+                
+                # Filter and sort unblocked slots
+                unblocked_slot_items = {k: v for k, v in slots_for_this_config.items() if not slot_fees.get(dur_val_fc, {}).get(k, {}).get('blocked', False)}
+                if not unblocked_slot_items: continue
+                
+                sorted_slot_shares = sorted(unblocked_slot_items.items(), key=lambda item: item[1], reverse=True)
+                num_unblocked_slot_configs = len(sorted_slot_shares)
+
+
+                for idx_slot, (slot_num_fc, slot_user_share_pct) in enumerate(sorted_slot_shares):
+                    slot_config_meta_fc = slot_fees.get(dur_val_fc, {}).get(slot_num_fc, {})
+                    if slot_user_share_pct == 0 or current_slab_distributed_users == 0: continue
+                    
+                    if idx_slot == num_unblocked_slot_configs - 1:
+                        users_in_this_specific_cohort_fc = current_slab_distributed_users
+                    else:
+                        users_in_this_specific_cohort_fc = math.ceil(users_for_this_slab_fc * (slot_user_share_pct / 100.0))
+                        users_in_this_specific_cohort_fc = min(users_in_this_specific_cohort_fc, current_slab_distributed_users)
+                    
+                    if users_in_this_specific_cohort_fc == 0: continue
+                    
+                    from_rejoin_pool_fc = min(users_in_this_specific_cohort_fc, temp_rejoining_users_for_allocation)
+                    from_newly_acquired_fc = users_in_this_specific_cohort_fc - from_rejoin_pool_fc
+                    temp_rejoining_users_for_allocation -= from_rejoin_pool_fc 
+                    if temp_rejoining_users_for_allocation < 0: temp_rejoining_users_for_allocation = 0
+
+                    fee_on_commitment_frac_fc = slot_config_meta_fc.get('fee', 0) / 100.0 # Safer get
+                    total_commitment_per_user_fc = installment_val_fc * dur_val_fc
+                    fee_amount_per_user_fc = total_commitment_per_user_fc * fee_on_commitment_frac_fc
+                    total_nii_for_cohort_lifetime_per_user = 0
+                    payout_due_month_idx_for_cohort_fc = m_idx_fc + slot_num_fc - 1
+
+                    for j_installment_num in range(dur_val_fc): 
+                        collection_month_of_this_installment_idx = m_idx_fc + j_installment_num
+                        days_this_installment_held = days_between_specific_dates(collection_month_of_this_installment_idx, global_collection_day, payout_due_month_idx_for_cohort_fc, global_payout_day)
+                        nii_from_this_installment = installment_val_fc * daily_interest_rate_fc * days_this_installment_held
+                        total_nii_for_cohort_lifetime_per_user += nii_from_this_installment
+                    
+                    total_nii_for_cohort_duration_fc = total_nii_for_cohort_lifetime_per_user * users_in_this_specific_cohort_fc
+                    avg_monthly_nii_for_cohort = total_nii_for_cohort_duration_fc / dur_val_fc if dur_val_fc > 0 else 0
+                    nii_to_log_for_joining_month = avg_monthly_nii_for_cohort 
+
+                    num_defaulters_total_fc = math.ceil(users_in_this_specific_cohort_fc * current_default_frac_fc) 
+                    num_pre_payout_defaulters_fc = math.ceil(num_defaulters_total_fc * global_default_pre_frac_fc) 
+                    num_post_payout_defaulters_fc = num_defaulters_total_fc - num_pre_payout_defaulters_fc
+                    if num_post_payout_defaulters_fc < 0: num_post_payout_defaulters_fc = 0
+
+                    loss_per_pre_defaulter_fc = total_commitment_per_user_fc * (1 - current_penalty_frac_fc)
+                    total_pre_payout_loss_fc = num_pre_payout_defaulters_fc * loss_per_pre_defaulter_fc
+                    loss_per_post_defaulter_fc = total_commitment_per_user_fc
+                    total_post_payout_loss_fc = num_post_payout_defaulters_fc * loss_per_post_defaulter_fc
+                    total_loss_for_cohort_fc = total_pre_payout_loss_fc + total_post_payout_loss_fc
+                    total_fees_for_cohort_fc = fee_amount_per_user_fc * users_in_this_specific_cohort_fc
+                    expected_lifetime_profit_for_cohort_fc = (total_fees_for_cohort_fc + total_nii_for_cohort_duration_fc) - total_loss_for_cohort_fc
+                    cash_in_installments_this_month_cohort_fc = users_in_this_specific_cohort_fc * installment_val_fc
+                    payout_due_calendar_month_for_cohort_fc = payout_due_month_idx_for_cohort_fc + 1 
+                    payout_amount_scheduled_for_cohort_fc = users_in_this_specific_cohort_fc * total_commitment_per_user_fc
+                    pools_formed_by_this_cohort_fc = users_in_this_specific_cohort_fc / dur_val_fc if dur_val_fc > 0 else 0
+                    external_capital_needed_for_cohort_lifetime_fc = max(0, total_loss_for_cohort_fc - (total_fees_for_cohort_fc + total_nii_for_cohort_duration_fc))
+
+                    forecast_data_fc.append({
+                        "Month Joined": current_month_num_fc, "Year Joined": current_year_num_fc,
+                        "Duration": dur_val_fc, "Slab Installment": installment_val_fc, "Assigned Slot": slot_num_fc,
+                        "Users": users_in_this_specific_cohort_fc, "Pools Formed": pools_formed_by_this_cohort_fc,
+                        "Total Commitment/User": total_commitment_per_user_fc,
+                        "Fee % (on Total Commitment)": fee_on_commitment_frac_fc * 100,
+                        "Total Fee Collected (Lifetime)": total_fees_for_cohort_fc,
+                        "NII Earned This Month (Avg)": nii_to_log_for_joining_month,
+                        "Total NII (Lifetime)": total_nii_for_cohort_duration_fc,
+                        "Expected Lifetime Profit": expected_lifetime_profit_for_cohort_fc,
+                        "Cash In (Installments This Month)": cash_in_installments_this_month_cohort_fc,
+                        "Payout Due Month": payout_due_calendar_month_for_cohort_fc,
+                        "Payout Amount Scheduled": payout_amount_scheduled_for_cohort_fc,
+                        "Total Default Loss (Lifetime)": total_loss_for_cohort_fc,
+                        "External Capital For Loss (Lifetime)": external_capital_needed_for_cohort_lifetime_fc
+                    })
+                    deposit_log_data_fc.append({"Month": current_month_num_fc, "Users Joining": users_in_this_specific_cohort_fc, "Installments Collected": cash_in_installments_this_month_cohort_fc, "NII This Month (Avg)": nii_to_log_for_joining_month})
+                    default_log_data_fc.append({"Month": current_month_num_fc, "Year": current_year_num_fc, "Pre-Payout Defaulters (Cohort)": num_pre_payout_defaulters_fc,"Post-Payout Defaulters (Cohort)": num_post_payout_defaulters_fc,"Default Loss (Cohort Lifetime)": total_loss_for_cohort_fc})
+                    lifecycle_data_fc.append({"Month": current_month_num_fc, "New Users Acquired for Cohort": from_newly_acquired_fc, "Rejoining Users for Cohort": from_rejoin_pool_fc, "Total Onboarding to Cohort": users_in_this_specific_cohort_fc}) 
+                    
+                    rejoin_at_month_idx_fc = m_idx_fc + dur_val_fc + int(current_rest_period_months_fc)
+                    non_defaulters_in_cohort = users_in_this_specific_cohort_fc - num_defaulters_total_fc
+                    if non_defaulters_in_cohort < 0: non_defaulters_in_cohort = 0 
+                    if rejoin_at_month_idx_fc < months_fc and non_defaulters_in_cohort > 0 :
+                        rejoin_tracker_fc[rejoin_at_month_idx_fc] = rejoin_tracker_fc.get(rejoin_at_month_idx_fc, 0) + non_defaulters_in_cohort
+                    
+                    current_slab_distributed_users -= users_in_this_specific_cohort_fc # Decrement for next slot
+                current_duration_distributed_users -= users_for_this_slab_fc # Decrement for next slab
+            remaining_users_to_distribute -= users_for_this_duration_fc # Decrement for next duration
+        
+    df_forecast_fc = pd.DataFrame(forecast_data_fc).fillna(0)
+    df_deposit_log_fc = pd.DataFrame(deposit_log_data_fc).fillna(0)
+    df_default_log_fc = pd.DataFrame(default_log_data_fc).fillna(0)
+    df_lifecycle_fc = pd.DataFrame(lifecycle_data_fc).fillna(0)
+    return df_forecast_fc, df_deposit_log_fc, df_default_log_fc, df_lifecycle_fc
@@ -0,0 +1,137 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from .cache import (ForecastCache, cached_monte_carlo, cached_run_forecast, cached_summaries, config_hash, forecast_cache,
+                    monte_carlo_key)
+from .diagnostics import Diagnostics, diagnostics
+from .ledger import build_float_ledger
+from .pools import pool_formation
+from .sweep import KPI_COLUMNS, forecast_kpis
+
+# Stage results a worker computes and hands back through the parent's cache, so the
+# parent builds the ScenarioResult from cache hits (and the next run of the same
+# scenario is served from the cache too).
+SHARED_STAGES = ("forecast", "summaries", "montecarlo", "pools")
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    forecast: pd.DataFrame
+    deposit_log: pd.DataFrame
+    default_log: pd.DataFrame
+    lifecycle: pd.DataFrame
+    monthly: pd.DataFrame
+    yearly: pd.DataFrame
+    profit_share: pd.DataFrame
+    monte_carlo: Optional[pd.DataFrame] = None
+    float_ledger: Optional[pd.DataFrame] = None
+    pools: Optional[pd.DataFrame] = None
+
+
+# === HEADLESS RUNS ===
+def _monte_carlo(config, args, cache):
+    return cached_monte_carlo(*args, n_paths=config.monte_carlo_paths, seed=config.monte_carlo_seed,
+                              rejoin_pct=config.monte_carlo_rejoin_pct, cache=cache)
+
+
+# Forecast and summaries for one scenario of a ForecastConfig, through the stage cache,
+# plus the float ledger, the pool formation and the Monte Carlo quantile table when
+# the config asks for paths.
+def run_scenario(config, scenario, cache=None):
+    args = config.forecast_args(scenario)
+    forecast, deposit_log, default_log, lifecycle = cached_run_forecast(*args, cache=cache)
+    monthly, yearly, profit_share = cached_summaries(*args[:6], config.party_a_pct, *args[6:], cache=cache)
+    monte_carlo = _monte_carlo(config, args, cache) if config.monte_carlo_paths > 0 else None
+    float_ledger = build_float_ledger(forecast, config.forecast_months)
+    pools = pool_formation(*args[:5], carry_over=config.pool_carry_over, cache=cache)
+    return ScenarioResult(scenario.name, forecast, deposit_log, default_log, lifecycle, monthly, yearly, profit_share,
+                          monte_carlo, float_ledger, pools)
+
+
+# The shared stages a scenario still has to compute: all of them while its forecast
+# is not cached, else the Monte Carlo table if asked for and not cached (the
+# summaries and pools of a cached forecast are cheap and built in-process). Unseeded
+# Monte Carlo runs are never cached, so they always run in-process.
+def _pending_stages(config, scenario, cache):
+    args = config.forecast_args(scenario)
+    if "forecast:" + config_hash(*args) not in cache:
+        return SHARED_STAGES
+    if _cached_monte_carlo(config) and monte_carlo_key(*args, config.monte_carlo_paths, config.monte_carlo_seed,
+                                                       config.monte_carlo_rejoin_pct) not in cache:
+        return ("montecarlo",)
+    return ()
+
+
+def _cached_monte_carlo(config):
+    return config.monte_carlo_paths > 0 and config.monte_carlo_seed is not None
+
+
+# Worker entry point: the pending stages of one scenario on a private cache. Only
+# their cache entries go back (the parent rebuilds the ScenarioResult from them),
+# with the worker's stage timings and counters when the parent is collecting them.
+def _run_worker(config, scenario, stages, collect=False, trace_memory=False):
+    cache = ForecastCache(sys.maxsize)
+    collector = Diagnostics()
+    collector.activate()
+    if collect:
+        collector.enable(trace_memory=trace_memory)
+    try:
+        args = config.forecast_args(scenario)
+        if "forecast" in stages:
+            cached_summaries(*args[:6], config.party_a_pct, *args[6:], cache=cache)
+            pool_formation(*args[:5], carry_over=config.pool_carry_over, cache=cache)
+        if "montecarlo" in stages and _cached_monte_carlo(config):
+            _monte_carlo(config, args, cache)
+        return cache.entries(stages), collector.snapshot() if collect else None
+    finally:
+        collector.disable()
+
+
+# === PARALLEL RUNS ===
+# Every scenario of the config, in order. With max_workers other than 1 (None = all
+# cores) and more than one scenario with uncached stages (see _pending_stages),
+# those stages are spread over a ProcessPoolExecutor and merged into `cache`, along
+# with the workers' diagnostics; the results are then built in-process, mostly
+# from cache hits. `progress(done, total)` is called as scenarios finish.
+def run_all(config, cache=None, max_workers=1, progress=None):
+    cache = forecast_cache if cache is None else cache
+    scenarios = config.scenarios
+    collector = diagnostics.collector()
+    pending = {}
+    if max_workers != 1:
+        for i, scenario in enumerate(scenarios):
+            stages = _pending_stages(config, scenario, cache)
+            if stages:
+                pending[i] = stages
+    done = 0
+    if len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_run_worker, config, scenarios[i], stages, collector.enabled,
+                                   collector.trace_memory): i for i, stages in pending.items()}
+            for future in as_completed(futures):
+                entries, snapshot = future.result()
+                cache.merge(entries)
+                if snapshot is not None:
+                    collector.merge(snapshot)
+                done += 1
+                if progress: progress(done, len(scenarios))
+    else:
+        pending = {}
+    results = []
+    for i, scenario in enumerate(scenarios):
+        results.append(run_scenario(config, scenario, cache))
+        if i not in pending:
+            done += 1
+            if progress: progress(done, len(scenarios))
+    return results
+
+
+# One row of headline KPIs per scenario, for comparing many scenarios at a glance.
+def kpi_table(results):
+    rows = [{"Scenario": r.name, "Cohorts": len(r.forecast), **forecast_kpis(r.forecast, r.lifecycle)} for r in results]
+    return pd.DataFrame(rows, columns=["Scenario", "Cohorts", *KPI_COLUMNS])
@@ -0,0 +1,177 @@
+import json
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from .cache import cached_allocation
+from .diagnostics import diagnostics
+from .engine import cohort_costs, slot_fee_table
+from .sweep import KPI_COLUMNS, SLOT_FEE_PARAM, apply_overrides, expand_grid
+
+# Inputs applied on top of an unchanged allocation: all points that differ only in
+# these are priced together in one batched computation.
+BATCHED_PARAMS = ("kibor", "spread", "penalty_pct", "default_pre_pct", SLOT_FEE_PARAM)
+# One-at-a-time sensitivity: each input is moved +/- its span around the base value.
+SENSITIVITY_SPANS = {"kibor": 2.0, "spread": 2.0, "default_rate": 1.0, "default_pre_pct": 25.0, "penalty_pct": 5.0,
+                     "rest_period": 1, "monthly_growth": 1.0}
+SENSITIVITY_STEPS = 5
+PERCENT_PARAMS = ("default_rate", "default_pre_pct", "penalty_pct")
+BASE_LABEL = "Base"
+# Upper bound on cohorts x points held in memory per batch.
+BATCH_CELLS = 2_000_000
+
+
+def _year_starts(year):
+    return np.flatnonzero(np.r_[True, year[1:] != year[:-1]])
+
+
+# === BATCHED PRICING ===
+# KPIs (as forecast_kpis computes them from the frames) of every point in `points`
+# on one allocation, without building frames. Per-cohort arrays are broadcast
+# against the points' KIBOR, spread, penalty, pre-payout default % and fee, in
+# chunks of at most BATCH_CELLS values; the arithmetic mirrors price_cohorts.
+def _price_points(allocation, config, slot_fees, default_pre_pct, collection_day, payout_day, base_year, points):
+    n_points = len(points)
+    users = allocation["users"]
+    if not len(users):
+        return {kpi: np.zeros(n_points) for kpi in KPI_COLUMNS}
+
+    def param(name, base):
+        return np.array([p.get(name, base) for p in points], dtype=np.float64)[:, None]
+    daily_rate = (param("kibor", config["kibor"]) / 100 + param("spread", config["spread"]) / 100) / 365
+    penalty_frac = param("penalty_pct", config["penalty_pct"]) / 100
+    pre_frac = param("default_pre_pct", default_pre_pct) / 100
+    fee_pct = param(SLOT_FEE_PARAM, np.nan)
+
+    costs = cohort_costs(allocation, config, default_pre_pct, collection_day, payout_day, base_year)
+    commitment = costs["commitment"]
+    held_days = costs["held_days"]
+    installment = allocation["installment"]
+    defaulters = allocation["defaulters"]
+    fee_table = slot_fee_table(allocation["durations"], allocation["slot_numbers"], slot_fees)
+    base_fee_frac = fee_table[allocation["dur_idx"], allocation["k_pos"]] / 100.0
+    year_starts = _year_starts(allocation["month_year"][allocation["m_idx"]])
+
+    totals = {kpi: np.zeros(n_points) for kpi in KPI_COLUMNS}
+    totals["Users"][:] = users.sum()
+    totals["New Users"][:] = (users - allocation["from_rejoin"]).sum()
+    chunk = max(1, BATCH_CELLS // len(users))
+    for start in range(0, n_points, chunk):
+        rows = slice(start, start + chunk)
+        fee_frac = np.where(np.isnan(fee_pct[rows]), base_fee_frac, fee_pct[rows] / 100.0)
+        total_fees = commitment * fee_frac * users
+        total_nii = installment * daily_rate[rows] * held_days * users
+        pre_defaulters = np.ceil(defaulters * pre_frac[rows])
+        post_defaulters = np.maximum(defaulters - pre_defaulters, 0)
+        total_loss = pre_defaulters * (commitment * (1 - penalty_frac[rows])) + post_defaulters * commitment
+        earned = total_fees + total_nii
+        external = np.maximum(0, total_loss - earned)
+        totals["Total Fee Collected"][rows] = total_fees.sum(axis=1)
+        totals["Total NII"][rows] = total_nii.sum(axis=1)
+        totals["Total Default Loss"][rows] = total_loss.sum(axis=1)
+        totals["Total Profit"][rows] = (earned - total_loss).sum(axis=1)
+        totals["Total External Capital"][rows] = external.sum(axis=1)
+        totals["Peak Annual External Capital"][rows] = np.add.reduceat(external, year_starts, axis=1).max(axis=1)
+    return totals
+
+
+# === BATCHED GRID ===
+# Same result as run_sweep (one KPI row per point and scenario), computed in-process:
+# points are grouped by their non-batched overrides (default rate, rest period,
+# growth, ...), each group gets one allocation from the stage cache, and all of the
+# group's points are priced in one pass. A fee x KIBOR grid needs one allocation; a
+# fee x default rate grid one per default rate.
+@diagnostics.timed("sensitivity")
+def evaluate_points(base_config, points, progress=None):
+    groups = {}
+    for point_idx, overrides in enumerate(points):
+        allocation_overrides = {k: v for k, v in overrides.items() if k not in BATCHED_PARAMS}
+        key = json.dumps(allocation_overrides, sort_keys=True, default=str)
+        groups.setdefault(key, (allocation_overrides, []))[1].append(point_idx)
+    for overrides in points[:1]:
+        apply_overrides(base_config, overrides)  # fail fast on bad parameter names
+
+    kpis = {}
+    done = 0
+    for allocation_overrides, point_ids in groups.values():
+        config = apply_overrides(base_config, allocation_overrides)
+        for scenario_idx, scenario in enumerate(config.scenarios):
+            args = config.forecast_args(scenario)
+            allocation = cached_allocation(*args[:5])
+            totals = _price_points(allocation, args[0], config.slot_fees, *args[5:], [points[i] for i in point_ids])
+            for row, point_idx in enumerate(point_ids):
+                kpis[point_idx, scenario_idx] = {kpi: values[row] for kpi, values in totals.items()}
+        done += len(point_ids)
+        if progress: progress(done, len(points))
+
+    names = list(dict.fromkeys(name for overrides in points for name in overrides))
+    rows = [{"Point": point_idx, **overrides, "Scenario": scenario.name, **kpis[point_idx, scenario_idx]}
+            for point_idx, overrides in enumerate(points) for scenario_idx, scenario in enumerate(base_config.scenarios)]
+    df = pd.DataFrame(rows, columns=["Point", *names, "Scenario", *KPI_COLUMNS])
+    for kpi in ("Users", "New Users"):
+        df[kpi] = df[kpi].astype(np.int64)
+    return df
+
+
+def run_grid(base_config, ranges, progress=None):
+    return evaluate_points(base_config, expand_grid(ranges), progress)
+
+
+# Rows x columns table of one KPI over a 2-D grid from run_grid.
+def grid_pivot(df_grid, x, y, kpi, scenario=None):
+    if scenario is not None:
+        df_grid = df_grid[df_grid["Scenario"] == scenario]
+    return df_grid.pivot_table(index=y, columns=x, values=kpi, aggfunc="first")
+
+
+# === ONE-AT-A-TIME SENSITIVITY ===
+def _base_value(config, scenario, name):
+    return getattr(scenario, name) if hasattr(scenario, name) else getattr(config, name)
+
+
+# `steps` values from base - span to base + span per input (whole months for the
+# rest period), kept within 0..100 for percentages and >= 0 otherwise.
+def sensitivity_ranges(config, scenario, spans=SENSITIVITY_SPANS, steps=SENSITIVITY_STEPS):
+    ranges = {}
+    for name, span in spans.items():
+        base = _base_value(config, scenario, name)
+        if name == "rest_period":
+            values = np.arange(max(0, int(base) - int(span)), int(base) + int(span) + 1)
+        else:
+            values = np.linspace(base - span, base + span, steps)
+        values = np.clip(values, 0, 100 if name in PERCENT_PARAMS else None)
+        ranges[name] = np.unique(values).tolist()
+    return ranges
+
+
+# Each input moved on its own, per scenario, plus the base point. Long format: one
+# row per (scenario, parameter, value) with the KPIs; the base rows have
+# Parameter == "Base".
+def sensitivity_table(base_config, spans=SENSITIVITY_SPANS, steps=SENSITIVITY_STEPS):
+    frames = []
+    for scenario in base_config.scenarios:
+        config = replace(base_config, scenarios=[scenario])
+        ranges = sensitivity_ranges(config, scenario, spans, steps)
+        labels = [(BASE_LABEL, np.nan)] + [(name, value) for name, values in ranges.items() for value in values]
+        points = [{} if name == BASE_LABEL else {name: value} for name, value in labels]
+        df = evaluate_points(config, points)
+        frames.append(pd.DataFrame({"Scenario": scenario.name, "Parameter": [name for name, _ in labels],
+                                    "Value": [value for _, value in labels], **{k: df[k] for k in KPI_COLUMNS}}))
+    return pd.concat(frames, ignore_index=True)
+
+
+# Tornado bars: for each scenario and input, the KPI at its lowest and highest value
+# and the swing between them, largest swing first.
+def tornado_table(df_sensitivity, kpi="Total Profit"):
+    rows = []
+    for scenario, df in df_sensitivity.groupby("Scenario", sort=False):
+        base = df.loc[df["Parameter"] == BASE_LABEL, kpi].iloc[0]
+        for name, df_param in df[df["Parameter"] != BASE_LABEL].groupby("Parameter", sort=False):
+            low, high = df_param.loc[df_param["Value"].idxmin()], df_param.loc[df_param["Value"].idxmax()]
+            rows.append({"Scenario": scenario, "Parameter": name, "Low Value": low["Value"],
+                         "High Value": high["Value"], "KPI at Low": low[kpi], "KPI at High": high[kpi],
+                         "Base KPI": base, "Swing": abs(high[kpi] - low[kpi])})
+    df_tornado = pd.DataFrame(rows, columns=["Scenario", "Parameter", "Low Value", "High Value", "KPI at Low",
+                                             "KPI at High", "Base KPI", "Swing"])
+    return df_tornado.sort_values(["Scenario", "Swing"], ascending=[True, False], kind="stable").reset_index(drop=True)
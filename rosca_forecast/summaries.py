@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from .diagnostics import diagnostics
+from .engine import FORECAST_MONTHS
+
+MONTHLY_SUMMARY_COLUMNS = [
+    "Month", "Users Joining This Month", "Pools Formed",
+    "Cash In (Installments This Month)", "Actual Cash Out This Month", "Net Cash Flow This Month",
+    "NII This Month (Sum of Avg from New Cohorts)",
+    "Total NII (Lifetime)",
+    "Payout Recipient Users",
+    "Total Fee Collected (Lifetime)", "Total Default Loss (Lifetime)",
+    "Gross Profit This Month (Accrued from New Cohorts)", "External Capital For Loss (Lifetime)"
+]
+
+
+# Monthly columns summed straight from the cohort forecast: by the month cohorts
+# join, by the month their payout falls due (payouts after the horizon drop out),
+# and the lifetime values accrued to the joining month.
+JOIN_MONTH_MEASURES = {
+    "Cash In (Installments This Month)": "Cash In (Installments This Month)",
+    "NII This Month (Sum of Avg from New Cohorts)": "NII Earned This Month (Avg)",
+    "Pools Formed": "Pools Formed",
+    "Users Joining This Month": "Users",
+}
+PAYOUT_MONTH_MEASURES = {
+    "Actual Cash Out This Month": "Payout Amount Scheduled",
+    "Payout Recipient Users": "Users",
+}
+LIFETIME_MEASURES = ["Total Fee Collected (Lifetime)", "Total NII (Lifetime)", "Total Default Loss (Lifetime)",
+                     "Expected Lifetime Profit", "External Capital For Loss (Lifetime)"]
+COUNT_COLUMNS = ("Users Joining This Month", "Payout Recipient Users")
+# Yearly columns (sums of the monthly ones) and their yearly names.
+YEARLY_MEASURES = {
+    "Users Joining This Month": "Users Joining This Month",
+    "Pools Formed": "Pools Formed",
+    "Cash In (Installments This Month)": "Cash In (Installments This Month)",
+    "Actual Cash Out This Month": "Actual Cash Out This Month",
+    "Net Cash Flow This Month": "Net Cash Flow This Month",
+    "NII This Month (Sum of Avg from New Cohorts)": "Annual NII (Sum of Avg from New Cohorts)",
+    "Total NII (Lifetime)": "Annual Total NII (Lifetime from New Cohorts)",
+    "Payout Recipient Users": "Payout Recipient Users",
+    "Total Fee Collected (Lifetime)": "Total Fee Collected (Lifetime)",
+    "Total Default Loss (Lifetime)": "Total Default Loss (Lifetime)",
+    "Gross Profit This Month (Accrued from New Cohorts)": "Annual Gross Profit (Accrued from New Cohorts)",
+    "External Capital For Loss (Lifetime)": "External Capital For Loss (Lifetime)",
+}
+
+
+def _accumulate(index, values, n):
+    return np.bincount(index, weights=values, minlength=n)[:n]
+
+
+# === SUMMARIES ===
+# Monthly, yearly and profit-share tables built from the cohort forecast. Every
+# measure is accumulated straight into a month-indexed array (np.bincount on the
+# month index), and years are accumulated from the months the same way, so each
+# table is one pass over its source with no groupby or merge. Months with no
+# cohorts or payouts are zero. User counts are int64. An empty forecast gives empty
+# frames keyed on Month/Year, as the app has always shown.
+@diagnostics.timed("summaries")
+def build_summaries(df_forecast, party_a_pct, months=FORECAST_MONTHS):
+    if df_forecast.empty:
+        return pd.DataFrame(columns=["Month"]), pd.DataFrame(columns=["Year"]), pd.DataFrame(columns=["Year"])
+    party_b_pct = 1 - party_a_pct
+
+    join_idx = df_forecast["Month Joined"].to_numpy(dtype=np.int64) - 1
+    payout_idx = df_forecast["Payout Due Month"].to_numpy(dtype=np.int64) - 1
+    in_horizon = payout_idx < months
+    payout_idx = payout_idx[in_horizon]
+
+    month = np.arange(1, months + 1)
+    monthly = {"Month": month}
+    for name, column in JOIN_MONTH_MEASURES.items():
+        monthly[name] = _accumulate(join_idx, df_forecast[column].to_numpy(), months)
+    for name, column in PAYOUT_MONTH_MEASURES.items():
+        monthly[name] = _accumulate(payout_idx, df_forecast[column].to_numpy()[in_horizon], months)
+    for name in LIFETIME_MEASURES:
+        monthly[name] = _accumulate(join_idx, df_forecast[name].to_numpy(), months)
+    for name in COUNT_COLUMNS:
+        monthly[name] = np.rint(monthly[name]).astype(np.int64)
+    monthly["Net Cash Flow This Month"] = monthly["Cash In (Installments This Month)"] - monthly["Actual Cash Out This Month"]
+    monthly["Gross Profit This Month (Accrued from New Cohorts)"] = monthly["Total Fee Collected (Lifetime)"] + \
+                                                                    monthly["Total NII (Lifetime)"] - \
+                                                                    monthly["Total Default Loss (Lifetime)"]
+    monthly["Year"] = (month - 1) // 12 + 1
+    df_monthly_summary = pd.DataFrame(monthly)
+
+    year_idx = monthly["Year"] - 1
+    n_years = int(year_idx[-1]) + 1
+    yearly = {"Year": np.arange(1, n_years + 1)}
+    for name, yearly_name in YEARLY_MEASURES.items():
+        yearly[yearly_name] = _accumulate(year_idx, monthly[name], n_years)
+    for name in COUNT_COLUMNS:
+        yearly[name] = np.rint(yearly[name]).astype(np.int64)
+    df_yearly_summary = pd.DataFrame(yearly)
+
+    gross_profit = yearly["Annual Gross Profit (Accrued from New Cohorts)"]
+    external = yearly["External Capital For Loss (Lifetime)"]
+    loss = yearly["Total Default Loss (Lifetime)"]
+    loss_covered = np.zeros(n_years)
+    np.divide(external, loss, out=loss_covered, where=loss > 0)
+    loss_covered *= 100
+    df_profit_share = pd.DataFrame({
+        "Year": yearly["Year"],
+        "External Capital Needed (Annual Accrual)": external,
+        "Annual Cash In (Installments)": yearly["Cash In (Installments This Month)"],
+        "Annual NII (Accrued Lifetime)": yearly["Annual Total NII (Lifetime from New Cohorts)"],
+        "Annual Default Loss (Accrued)": loss,
+        "Annual Fee Collected (Accrued)": yearly["Total Fee Collected (Lifetime)"],
+        "Annual Gross Profit (Accrued)": gross_profit,
+        "Part-A Profit Share": gross_profit * party_a_pct,
+        "Part-B Profit Share": gross_profit * party_b_pct,
+        "% Loss Covered by External Capital": loss_covered,
+    })
+
+    return df_monthly_summary, df_yearly_summary, df_profit_share
@@ -0,0 +1,109 @@
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields, replace
+
+import numpy as np
+import pandas as pd
+
+from .cache import cached_run_forecast
+from .config import ForecastConfig, ScenarioConfig
+
+GLOBAL_PARAMS = {f.name for f in fields(ForecastConfig)} - {
+    "scenarios", "yearly_duration_share", "slab_map", "slot_fees", "slot_distribution"}
+SCENARIO_PARAMS = {f.name for f in fields(ScenarioConfig)} - {"name"}
+# Sets the fee % of every slot of every duration.
+SLOT_FEE_PARAM = "slot_fee_pct"
+
+KPI_COLUMNS = ["Users", "New Users", "Total Fee Collected", "Total NII", "Total Default Loss",
+               "Total Profit", "Total External Capital", "Peak Annual External Capital"]
+
+
+# Copy of `config` with sweep parameters applied: ForecastConfig fields (kibor,
+# spread, default_rate, ...), ScenarioConfig fields (applied to every scenario) or
+# slot_fee_pct.
+def apply_overrides(config, overrides):
+    global_values = {k: v for k, v in overrides.items() if k in GLOBAL_PARAMS}
+    scenario_values = {k: v for k, v in overrides.items() if k in SCENARIO_PARAMS}
+    unknown = set(overrides) - set(global_values) - set(scenario_values) - {SLOT_FEE_PARAM}
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    config = replace(config, **global_values,
+                     scenarios=[replace(s, **scenario_values) for s in config.scenarios])
+    if SLOT_FEE_PARAM in overrides:
+        slot_fees = copy.deepcopy(config.slot_fees)
+        for slots in slot_fees.values():
+            for meta in slots.values():
+                meta["fee"] = overrides[SLOT_FEE_PARAM]
+        config = replace(config, slot_fees=slot_fees)
+    return config
+
+
+# Cartesian product of the parameter ranges. The last parameter varies fastest, so
+# listing pricing inputs (fees, KIBOR, spread, penalty) last keeps points that share
+# an allocation next to each other and in the same chunk.
+def expand_grid(ranges):
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(ranges[n]) for n in names))]
+
+
+def forecast_kpis(df_forecast, df_lifecycle):
+    if df_forecast.empty:
+        return dict.fromkeys(KPI_COLUMNS, 0)
+    external = df_forecast["External Capital For Loss (Lifetime)"].to_numpy()
+    annual_external = np.bincount(df_forecast["Year Joined"].to_numpy(), weights=external)
+    return {
+        "Users": int(df_forecast["Users"].sum()),
+        "New Users": int(df_lifecycle["New Users Acquired for Cohort"].sum()),
+        "Total Fee Collected": float(df_forecast["Total Fee Collected (Lifetime)"].sum()),
+        "Total NII": float(df_forecast["Total NII (Lifetime)"].sum()),
+        "Total Default Loss": float(df_forecast["Total Default Loss (Lifetime)"].sum()),
+        "Total Profit": float(df_forecast["Expected Lifetime Profit"].sum()),
+        "Total External Capital": float(external.sum()),
+        "Peak Annual External Capital": float(annual_external.max()),
+    }
+
+
+# Worker entry point: evaluate a chunk of (point index, overrides) pairs. The stage
+# cache lives for the whole worker process, so later chunks reuse allocations too.
+def _run_chunk(base_config, chunk):
+    rows = []
+    for point_idx, overrides in chunk:
+        config = apply_overrides(base_config, overrides)
+        for scenario in config.scenarios:
+            forecast, _, _, lifecycle = cached_run_forecast(*config.forecast_args(scenario))
+            rows.append({"Point": point_idx, **overrides, "Scenario": scenario.name,
+                         **forecast_kpis(forecast, lifecycle)})
+    return rows
+
+
+# === PARAMETER SWEEP ===
+# Runs every combination of `ranges` ({param: values}) for all scenarios of
+# `base_config` and returns one KPI row per (point, scenario). Points are sent to a
+# ProcessPoolExecutor in chunks of `chunk_size`; `progress(done, total)` is called
+# as chunks finish. max_workers=1 runs in-process.
+def run_sweep(base_config, ranges, max_workers=None, chunk_size=None, progress=None):
+    points = list(enumerate(expand_grid(ranges)))
+    for _, overrides in points[:1]:
+        apply_overrides(base_config, overrides)  # fail fast on bad parameter names
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(64, len(points) // (max_workers * 4) or 1))
+    chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+
+    rows = []
+    if max_workers == 1:
+        for chunk in chunks:
+            rows.extend(_run_chunk(base_config, chunk))
+            if progress: progress(len(rows) // max(len(base_config.scenarios), 1), len(points))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_run_chunk, base_config, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+                if progress: progress(len(rows) // max(len(base_config.scenarios), 1), len(points))
+
+    columns = ["Point", *ranges, "Scenario", *KPI_COLUMNS]
+    df = pd.DataFrame(rows, columns=columns)
+    return df.sort_values("Point", kind="stable").reset_index(drop=True)
@@ -46,8 +46,11 @@ for d in durations:
             slot_fees[d][s] = col1.number_input(f"Fee % (Slot {s})", 0.0, 100.0, 2.0, key=f"fee_{d}_{s}")
             slot_blocks[d][s] = col2.checkbox(f"Block Slot {s}", False, key=f"block_{d}_{s}")
 
+# All inputs are passed explicitly so st.cache_data keys on them instead of
+# serving a result computed from stale sidebar values.
 @st.cache_data
-def simulate_forecast():
+def simulate_forecast(total_market, tam_percent, start_percent, growth_rate, kibor, spread,
+                      default_rate, default_penalty, durations, slab_allocations, slot_fees, slot_blocks):
     start_users = int(total_market * tam_percent / 100 * start_percent / 100)
     monthly_growth = growth_rate / 100
     forecast = []
@@ -89,7 +92,8 @@ def simulate_forecast():
         users = int(users * (1 + monthly_growth))
     return pd.DataFrame(forecast)
 
-df = simulate_forecast()
+df = simulate_forecast(total_market, tam_percent, start_percent, growth_rate, kibor, spread,
+                       default_rate, default_penalty, durations, slab_allocations, slot_fees, slot_blocks)
 st.subheader("📊 Forecast Table")
 st.dataframe(df)
 
@@ -4,204 +4,265 @@ st.set_page_config(layout="wide", page_title="ROSCA Forecast App", page_icon="
 import pandas as pd
 import numpy as np
 import io
-import matplotlib.pyplot as plt
-import math # For ceil
-from datetime import date, timedelta
-
-# --- Modern Chart Styling Setup ---
-TEXT_COLOR = '#333333'
-GRID_COLOR = '#D8D8D8'
-PLOT_BG_COLOR = '#FFFFFF'
-FIG_BG_COLOR = '#F8F9FA'
-COLOR_PRIMARY_BAR = '#3B75AF'
-COLOR_SECONDARY_LINE = '#4CAF50'
-COLOR_ACCENT_BAR = '#FFC107'
-COLOR_ACCENT_LINE = '#9C27B0'
-COLOR_HIGHLIGHT_BAR = '#E91E63'
-
-plt.rcParams.update({
-    'font.family': 'sans-serif',
-    'font.sans-serif': ['Arial', 'Helvetica Neue', 'DejaVu Sans', 'Liberation Sans', 'sans-serif'],
-    'axes.labelcolor': TEXT_COLOR, 'xtick.color': TEXT_COLOR, 'ytick.color': TEXT_COLOR,
-    'axes.titlecolor': TEXT_COLOR, 'figure.facecolor': FIG_BG_COLOR, 'axes.facecolor': PLOT_BG_COLOR,
-    'axes.edgecolor': GRID_COLOR, 'axes.grid': True, 'grid.color': GRID_COLOR,
-    'grid.linestyle': '--', 'grid.linewidth': 0.7, 'legend.frameon': False,
-    'legend.fontsize': 9, 'legend.title_fontsize': 10, 'figure.dpi': 100,
-    'axes.spines.top': False, 'axes.spines.right': False, 'axes.spines.left': True,
-    'axes.spines.bottom': True, 'axes.titlesize': 13, 'axes.labelsize': 11,
-    'xtick.labelsize': 9, 'ytick.labelsize': 9, 'lines.linewidth': 2,
-    'lines.markersize': 5, 'patch.edgecolor': 'none'
-})
-# --- END: Modern Chart Styling Setup ---
-
-# Helper function to calculate days between two dates specified by month index and day of month
-def days_between_specific_dates(start_month_idx, start_day_of_month, end_month_idx, end_day_of_month, base_year=2024):
-    if start_month_idx > end_month_idx or (start_month_idx == end_month_idx and start_day_of_month >= end_day_of_month):
-        return 0
-    start_actual_month = (start_month_idx % 12) + 1
-    start_actual_year = base_year + (start_month_idx // 12)
-    end_actual_month = (end_month_idx % 12) + 1
-    end_actual_year = base_year + (end_month_idx // 12)
-    try:
-        date_start = date(start_actual_year, start_actual_month, start_day_of_month)
-        date_end = date(end_actual_year, end_actual_month, end_day_of_month)
-        return (date_end - date_start).days
-    except ValueError:
-        return max(0, (end_month_idx - start_month_idx) * 30 + (end_day_of_month - start_day_of_month))
+import tempfile
+from dataclasses import replace
+
+from rosca_forecast import (MONTHLY_SUMMARY_COLUMNS, Diagnostics, ForecastConfig, ScenarioConfig, build_daily_ledger,
+                            cached_export, forecast_cache, kpi_table, run_all, solve_breakeven_fees)
+from rosca_forecast.charts import CHARTS, cached_chart_png, cached_heatmap_png, cached_tornado_png
+from rosca_forecast.config import CONFIG_FORMATS, DURATION_OPTIONS, SLAB_OPTIONS, config_format, dumps_config, loads_config
+from rosca_forecast.members import compare_yearly, run_member_simulation
+from rosca_forecast.pools import pool_summary
+from rosca_forecast.sensitivity import BATCHED_PARAMS, SENSITIVITY_SPANS, grid_pivot, run_grid, sensitivity_table, tornado_table
+from rosca_forecast.sweep import KPI_COLUMNS
+
 
 # === SCENARIO & UI SETUP ===
 st.title("📊 BACHAT-KOMMITTEE Business Case/Pricing")
+SCENARIO_WIDGETS_MAIN = {"name": "name", "total_market": "market", "tam_pct": "tam_pct", "start_pct": "start_pct",
+                         "monthly_growth": "growth", "annual_growth": "annual", "cap_tam": "cap_toggle"}
+GLOBAL_WIDGETS_MAIN = {"collection_day": int, "payout_day": int, "profit_split": int, "kibor": float, "spread": float,
+                       "rest_period": int, "default_rate": float, "default_pre_pct": int, "penalty_pct": float,
+                       "base_year": int, "monte_carlo_paths": int, "monte_carlo_seed": int,
+                       "monte_carlo_rejoin_pct": float, "pool_carry_over": bool}
+
+
+# === CONFIG FILES ===
+# Widget values (by widget key) for a loaded ForecastConfig, plus what the widgets
+# cannot hold. Written into session state before the widgets are created, so the
+# whole setup lands in one rerun.
+def config_widget_state(config):
+    state, problems = {"scenario_count": len(config.scenarios)}, []
+    for i, scenario in enumerate(config.scenarios):
+        for field_name, key_prefix in SCENARIO_WIDGETS_MAIN.items():
+            value = getattr(scenario, field_name)
+            state[f"{key_prefix}_{i}"] = value if field_name in ("name", "cap_tam") else (int(value) if field_name == "total_market" else float(value))
+    for key, cast in GLOBAL_WIDGETS_MAIN.items():
+        state[key] = cast(getattr(config, key))
+    state["forecast_years"] = max(1, -(-config.forecast_months // 12))
+    if config.forecast_months % 12:
+        problems.append(f"Horizon of {config.forecast_months} months rounded up to {state['forecast_years']} years.")
+
+    config_durations = sorted(set(config.slab_map) | set(config.slot_fees) | set(config.slot_distribution)
+                              | {d for shares in config.yearly_duration_share.values() for d in shares})
+    state["durations"] = [d for d in config_durations if d in DURATION_OPTIONS]
+    problems += [f"Duration {d}M is not one of {DURATION_OPTIONS}; skipped." for d in config_durations if d not in DURATION_OPTIONS]
+    state["share_years"] = min(max(config.yearly_duration_share, default=1), state["forecast_years"])
+    for y, shares in config.yearly_duration_share.items():
+        for d in state["durations"]:
+            state[f"yds_{y}_{d}"] = int(round(shares.get(d, 0)))
+    for d in state["durations"]:
+        slabs = config.slab_map.get(d, {})
+        problems += [f"Slab {slab} of {d}M is not one of the slab options; skipped." for slab in slabs if slab not in SLAB_OPTIONS]
+        for slab in SLAB_OPTIONS:
+            state[f"slab_{d}_{slab}"] = int(round(slabs.get(slab, 0)))
+        for s in range(1, d + 1):
+            meta = config.slot_fees.get(d, {}).get(s, {})
+            state[f"fee_{d}_{s}"] = float(meta.get("fee", 0.0))
+            state[f"block_{d}_{s}"] = bool(meta.get("blocked", False))
+            state[f"slot_pct_d{d}_s{s}"] = int(round(config.slot_distribution.get(d, {}).get(s, 0)))
+    return state, problems
+
+
+# A new upload is applied once: its values go into the widgets' session state.
+config_file_main = st.sidebar.file_uploader("📂 Load Config (JSON/YAML)", type=["json", "yaml", "yml"], help="A saved config: scenarios, global inputs, duration shares, slabs, slot fees and distribution.")
+if config_file_main is not None and st.session_state.get("config_file_id") != config_file_main.file_id:
+    try:
+        loaded_config_main = loads_config(config_file_main.getvalue().decode("utf-8"), config_format(config_file_main.name))
+        config_state_main, config_problems_main = config_widget_state(loaded_config_main)
+    except (ValueError, ImportError, UnicodeDecodeError) as e:  # bad values and shapes are ValueErrors
+        st.sidebar.error(f"Could not load {config_file_main.name}: {e}")
+    else:
+        st.session_state["config_problems"] = config_problems_main
+        st.session_state.update(config_state_main)
+        st.session_state["config_file_id"] = config_file_main.file_id
+        st.rerun()
+for problem_main in st.session_state.get("config_problems", []):
+    st.sidebar.warning(problem_main)
+
+# Inputs are collected in forms: edits only rerun the forecast when applied.
 scenarios = []
-scenario_count = st.sidebar.number_input("Number of Scenarios", min_value=1, max_value=3, value=1)
-
-for i in range(scenario_count):
-    with st.sidebar.expander(f"Scenario {i+1} Settings"):
-        name = st.text_input(f"Scenario Name {i+1}", value=f"Scenario {i+1}", key=f"name_{i}")
-        total_market = st.number_input("Total Market Size", value=20000000, min_value=0, key=f"market_{i}")
-        tam_pct = st.number_input("TAM % of Market", min_value=0.0, max_value=100.0, value=10.0, step=0.01, key=f"tam_pct_{i}")
-        start_pct = st.number_input("Starting TAM % (Month 1 New Users)", min_value=0.0, max_value=100.0, value=10.0, step=0.01, key=f"start_pct_{i}", help="Initial new users as % of initial TAM for Month 1.")
-        monthly_growth = st.number_input("Monthly Acquisition Rate (on Cum. Acquired Base) (%)",min_value=0.0, value=2.0, step=0.01, key=f"growth_{i}", help="New users next month = Cum. Acquired Base * Rate")
-        annual_growth = st.number_input("Annual TAM Growth (%)",min_value=0.0, value=5.0, step=0.01, key=f"annual_{i}")
-        cap_tam = st.checkbox("Cap TAM Growth?", value=False, key=f"cap_toggle_{i}")
-        scenarios.append({
-            "name": name, "total_market": total_market, "tam_pct": tam_pct,
-            "start_pct": start_pct, "monthly_growth": monthly_growth, 
-            "annual_growth": annual_growth, "cap_tam": cap_tam
-        })
-
-# === GLOBAL INPUTS ===
-global_collection_day = st.sidebar.number_input("Collection Day of Month", min_value=1, max_value=28, value=1)
-global_payout_day = st.sidebar.number_input("Payout Day of Month", min_value=1, max_value=28, value=20)
-profit_split = st.sidebar.number_input("Profit Share for Party A (%)", min_value=0, max_value=100, value=50)
-party_a_pct = profit_split / 100
-party_b_pct = 1 - party_a_pct
-kibor = st.sidebar.number_input("KIBOR (%)", value=11.0, step=0.1)
-spread = st.sidebar.number_input("Spread (%)", value=5.0, step=0.1)
-rest_period = st.sidebar.number_input("Rest Period (months)", value=1, min_value=0)
-default_rate = st.sidebar.number_input("Default Rate (%)", value=1.0, min_value=0.0, max_value=100.0, step=0.1)
-default_pre_pct = st.sidebar.number_input("Pre-Payout Default %", min_value=0, max_value=100, value=50)
-default_post_pct = 100 - default_pre_pct
-penalty_pct = st.sidebar.number_input("Pre-Payout Refund (%)", value=10.0, min_value=0.0, max_value=100.0, step=0.1)
+with st.sidebar.form("inputs_form"):
+    scenario_count = st.number_input("Number of Scenarios", min_value=1, max_value=100, value=1, key="scenario_count")
+
+    for i in range(scenario_count):
+        with st.expander(f"Scenario {i+1} Settings"):
+            name = st.text_input(f"Scenario Name {i+1}", value=f"Scenario {i+1}", key=f"name_{i}")
+            total_market = st.number_input("Total Market Size", value=20000000, min_value=0, key=f"market_{i}")
+            tam_pct = st.number_input("TAM % of Market", min_value=0.0, max_value=100.0, value=10.0, step=0.01, key=f"tam_pct_{i}")
+            start_pct = st.number_input("Starting TAM % (Month 1 New Users)", min_value=0.0, max_value=100.0, value=10.0, step=0.01, key=f"start_pct_{i}", help="Initial new users as % of initial TAM for Month 1.")
+            monthly_growth = st.number_input("Monthly Acquisition Rate (on Cum. Acquired Base) (%)",min_value=0.0, value=2.0, step=0.01, key=f"growth_{i}", help="New users next month = Cum. Acquired Base * Rate")
+            annual_growth = st.number_input("Annual TAM Growth (%)",min_value=0.0, value=5.0, step=0.01, key=f"annual_{i}")
+            cap_tam = st.checkbox("Cap TAM Growth?", value=False, key=f"cap_toggle_{i}")
+            scenarios.append({
+                "name": name, "total_market": total_market, "tam_pct": tam_pct,
+                "start_pct": start_pct, "monthly_growth": monthly_growth, 
+                "annual_growth": annual_growth, "cap_tam": cap_tam
+            })
+
+    # === GLOBAL INPUTS ===
+    global_collection_day = st.number_input("Collection Day of Month", min_value=1, max_value=28, value=1, key="collection_day")
+    global_payout_day = st.number_input("Payout Day of Month", min_value=1, max_value=28, value=20, key="payout_day")
+    profit_split = st.number_input("Profit Share for Party A (%)", min_value=0, max_value=100, value=50, key="profit_split")
+    party_a_pct = profit_split / 100
+    party_b_pct = 1 - party_a_pct
+    kibor = st.number_input("KIBOR (%)", value=11.0, step=0.1, key="kibor")
+    spread = st.number_input("Spread (%)", value=5.0, step=0.1, key="spread")
+    rest_period = st.number_input("Rest Period (months)", value=1, min_value=0, key="rest_period")
+    default_rate = st.number_input("Default Rate (%)", value=1.0, min_value=0.0, max_value=100.0, step=0.1, key="default_rate")
+    default_pre_pct = st.number_input("Pre-Payout Default %", min_value=0, max_value=100, value=50, key="default_pre_pct")
+    default_post_pct = 100 - default_pre_pct
+    penalty_pct = st.number_input("Pre-Payout Refund (%)", value=10.0, min_value=0.0, max_value=100.0, step=0.1, key="penalty_pct")
+    forecast_years = st.number_input("Forecast Horizon (Years)", min_value=1, max_value=20, value=5, help="Projection length; up to 20 years (240 months).", key="forecast_years")
+    base_year = st.number_input("Base Year (Month 1)", min_value=2000, max_value=2100, value=2024, help="Calendar year of Month 1, used for the day counts.", key="base_year")
+    with st.expander("Monte Carlo (Stochastic Defaults)"):
+        monte_carlo_paths = st.number_input("Paths (0 = off)", min_value=0, max_value=100000, value=0, step=100, help="Number of simulated paths with binomial defaults per cohort.", key="monte_carlo_paths")
+        monte_carlo_seed = st.number_input("Random Seed", min_value=0, value=42, step=1, key="monte_carlo_seed")
+        monte_carlo_rejoin_pct = st.number_input("Rejoin Probability (%)", min_value=0.0, max_value=100.0, value=100.0, step=1.0, help="Chance that a non-defaulting member rejoins after the rest period.", key="monte_carlo_rejoin_pct")
+    pool_carry_over = st.checkbox("Carry Unmatched Users to Next Month's Pools", value=True, help="Users left over when pools are packed (one member per unblocked slot) wait for the next month instead of dropping out.", key="pool_carry_over")
+    st.form_submit_button("Apply Inputs", type="primary")
+with st.sidebar.expander("📈 Sensitivity Analysis"):
+    show_sensitivity = st.toggle("Run sensitivity analysis", value=False, help="Tornado of each global input moved on its own, and a 2-D grid heatmap.")
+    sensitivity_kpi = st.selectbox("KPI", KPI_COLUMNS, index=KPI_COLUMNS.index("Total Profit"))
+    GRID_PARAMS = list(BATCHED_PARAMS) + [p for p in SENSITIVITY_SPANS if p not in BATCHED_PARAMS]
+    grid_axes = []
+    for axis_label, default_param, default_range in (("X", "slot_fee_pct", (0.5, 5.0)), ("Y", "default_rate", (0.0, 5.0))):
+        grid_param = st.selectbox(f"Grid {axis_label} Input", GRID_PARAMS, index=GRID_PARAMS.index(default_param), key=f"grid_param_{axis_label}")
+        grid_min, grid_max = st.slider(f"Grid {axis_label} Range", 0.0, 100.0, default_range, step=0.1, key=f"grid_range_{axis_label}")
+        grid_steps = st.number_input(f"Grid {axis_label} Steps", min_value=2, max_value=100, value=20, key=f"grid_steps_{axis_label}")
+        grid_values = np.linspace(grid_min, grid_max, int(grid_steps))
+        grid_axes.append((grid_param, np.unique(grid_values.round()).tolist() if grid_param == "rest_period" else grid_values.tolist()))
+with st.sidebar.expander("👥 Member-Level Simulation"):
+    show_members = st.toggle("Simulate every member", value=False, help="Join month, duration, slab, slot, default and rejoin per member, with whole pools; compared with the cohort engine.")
+    members_random = st.checkbox("Random defaults and rejoins", value=False, help="Off: the cohort engine's rounding. On: each member defaults with the default rate and rejoins with the Monte Carlo rejoin probability.")
+    members_seed = st.number_input("Member Seed", min_value=0, value=42, step=1, disabled=not members_random)
+show_daily_ledger = st.sidebar.checkbox("🏦 Daily Cash Ledger", value=False, help="Day-by-day inflows, outflows, balance and interest for all scenarios, stored as memory-mapped arrays.")
+diagnostics_panel = st.sidebar.expander("🩺 Diagnostics")
+show_diagnostics = diagnostics_panel.checkbox("Collect stage timings", value=False, help="Times allocation, day counts, frame construction, summaries, tables, charts and export on each rerun.")
+diagnostics_trace_memory = diagnostics_panel.checkbox("Trace memory peaks (slower)", value=False, disabled=not show_diagnostics)
 
 # === DURATION/SLAB/SLOT CONFIGURATION ===
 validation_messages = []
-durations_input = st.multiselect("Select Durations (months)", [3, 4, 5, 6, 8, 10], default=[3, 4, 6])
-durations = sorted([int(d) for d in durations_input])
-
-yearly_duration_share = {}
-slab_map = {}
-slot_fees = {}
-slot_distribution = {}
-first_year_defaults_duration_share = {} 
-
-for y_config in range(1, 6):
-    with st.expander(f"Year {y_config} Duration Share"):
-        yearly_duration_share[y_config] = yearly_duration_share.get(y_config, {})
+with st.form("config_form"):
+    durations_input = st.multiselect("Select Durations (months)", DURATION_OPTIONS, default=[3, 4, 6], key="durations")
+    durations = sorted([int(d) for d in durations_input])
+
+    yearly_duration_share = {}
+    slab_map = {}
+    slot_fees = {}
+    slot_distribution = {}
+    first_year_defaults_duration_share = {} 
+
+    share_years = st.number_input("Years with Own Duration Share", min_value=1, max_value=int(forecast_years), value=min(5, int(forecast_years)), help="Years after the last configured one reuse its duration shares.", key="share_years")
+    for y_config in range(1, share_years + 1):
+        with st.expander(f"Year {y_config} Duration Share"):
+            yearly_duration_share[y_config] = yearly_duration_share.get(y_config, {})
         
-        if not durations:
-            st.caption(f"No durations selected. Please select durations to configure shares for Year {y_config}.")
-            yearly_duration_share[y_config] = {}
-            continue
-
-        num_selected_durations = len(durations)
-        default_share_val = 100 // num_selected_durations if num_selected_durations > 0 else 0
-        temp_year_shares = {}
-        current_year_total_share = 0
-
-        for idx, d_config in enumerate(durations):
-            key_config = f"yds_{y_config}_{d_config}"
+            if not durations:
+                st.caption(f"No durations selected. Please select durations to configure shares for Year {y_config}.")
+                yearly_duration_share[y_config] = {}
+                continue
+
+            num_selected_durations = len(durations)
+            default_share_val = 100 // num_selected_durations if num_selected_durations > 0 else 0
+            temp_year_shares = {}
+            current_year_total_share = 0
+
+            for idx, d_config in enumerate(durations):
+                key_config = f"yds_{y_config}_{d_config}"
             
-            if y_config == 1:
-                current_input_default = default_share_val
-                if idx == num_selected_durations - 1 and num_selected_durations > 0:
-                    current_input_default = 100 - (default_share_val * (num_selected_durations - 1))
-                if num_selected_durations == 1: current_input_default = 100
-            else:
-                current_input_default = first_year_defaults_duration_share.get(d_config, 0) 
-
-            val_config = st.number_input(
-                f"{d_config}M – Year {y_config} (%)", 
-                min_value=0, max_value=100, 
-                value=int(current_input_default), 
-                step=1, key=key_config
-            )
-            temp_year_shares[d_config] = val_config
-            current_year_total_share += val_config
-            if y_config == 1:
-                first_year_defaults_duration_share[d_config] = val_config
+                if y_config == 1:
+                    current_input_default = default_share_val
+                    if idx == num_selected_durations - 1 and num_selected_durations > 0:
+                        current_input_default = 100 - (default_share_val * (num_selected_durations - 1))
+                    if num_selected_durations == 1: current_input_default = 100
+                else:
+                    current_input_default = first_year_defaults_duration_share.get(d_config, 0) 
+
+                val_config = st.number_input(
+                    f"{d_config}M – Year {y_config} (%)", 
+                    min_value=0, max_value=100, 
+                    value=int(current_input_default), 
+                    step=1, key=key_config
+                )
+                temp_year_shares[d_config] = val_config
+                current_year_total_share += val_config
+                if y_config == 1:
+                    first_year_defaults_duration_share[d_config] = val_config
         
-        yearly_duration_share[y_config] = temp_year_shares
-        if current_year_total_share > 0 and abs(current_year_total_share - 100) > 0.1:
-             validation_messages.append(f"⚠️ Year {y_config} duration share total is {current_year_total_share}%. It should be 100%.")
-
-slab_options = [1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000]
-num_slab_options = len(slab_options)
-default_slab_dist_val = 100 // num_slab_options if num_slab_options > 0 else 0
-
-for d_config in durations:
-    with st.expander(f"{d_config}M Slab Distribution"):
-        slab_map[d_config] = slab_map.get(d_config, {})
-        temp_slab_shares = {}
-        current_slab_total_share = 0
-        for idx, slab_amount_config in enumerate(slab_options):
-            key_config = f"slab_{d_config}_{slab_amount_config}"
-            current_slab_default = default_slab_dist_val
-            if idx == num_slab_options - 1 and num_slab_options > 0:
-                current_slab_default = 100 - (default_slab_dist_val * (num_slab_options - 1))
-            if num_slab_options == 1: current_slab_default = 100
+            yearly_duration_share[y_config] = temp_year_shares
+            if current_year_total_share > 0 and abs(current_year_total_share - 100) > 0.1:
+                 validation_messages.append(f"⚠️ Year {y_config} duration share total is {current_year_total_share}%. It should be 100%.")
+
+    slab_options = SLAB_OPTIONS
+    num_slab_options = len(slab_options)
+    default_slab_dist_val = 100 // num_slab_options if num_slab_options > 0 else 0
+
+    for d_config in durations:
+        with st.expander(f"{d_config}M Slab Distribution"):
+            slab_map[d_config] = slab_map.get(d_config, {})
+            temp_slab_shares = {}
+            current_slab_total_share = 0
+            for idx, slab_amount_config in enumerate(slab_options):
+                key_config = f"slab_{d_config}_{slab_amount_config}"
+                current_slab_default = default_slab_dist_val
+                if idx == num_slab_options - 1 and num_slab_options > 0:
+                    current_slab_default = 100 - (default_slab_dist_val * (num_slab_options - 1))
+                if num_slab_options == 1: current_slab_default = 100
             
-            val_config = st.number_input(f"Slab {slab_amount_config} – {d_config}M (%)", min_value=0, max_value=100, value=int(current_slab_default), step=1, key=key_config)
-            temp_slab_shares[slab_amount_config] = val_config
-            current_slab_total_share += val_config
+                val_config = st.number_input(f"Slab {slab_amount_config} – {d_config}M (%)", min_value=0, max_value=100, value=int(current_slab_default), step=1, key=key_config)
+                temp_slab_shares[slab_amount_config] = val_config
+                current_slab_total_share += val_config
         
-        slab_map[d_config] = temp_slab_shares
-        if current_slab_total_share > 0 and abs(current_slab_total_share - 100) > 0.1:
-            validation_messages.append(f"⚠️ Slab distribution for {d_config}M totals {current_slab_total_share}%. It should be 100%.")
+            slab_map[d_config] = temp_slab_shares
+            if current_slab_total_share > 0 and abs(current_slab_total_share - 100) > 0.1:
+                validation_messages.append(f"⚠️ Slab distribution for {d_config}M totals {current_slab_total_share}%. It should be 100%.")
 
-    with st.expander(f"{d_config}M Slot Fees & Blocking"):
-        slot_fees[d_config] = slot_fees.get(d_config, {})
-        slot_distribution[d_config] = slot_distribution.get(d_config, {})
+        with st.expander(f"{d_config}M Slot Fees & Blocking"):
+            slot_fees[d_config] = slot_fees.get(d_config, {})
+            slot_distribution[d_config] = slot_distribution.get(d_config, {})
         
-        num_slots_for_duration = d_config
-        default_slot_share_val = 100 // num_slots_for_duration if num_slots_for_duration > 0 else 0
-        temp_slot_dist = {}
+            num_slots_for_duration = d_config
+            default_slot_share_val = 100 // num_slots_for_duration if num_slots_for_duration > 0 else 0
+            temp_slot_dist = {}
         
-        for s_config in range(1, num_slots_for_duration + 1):
-            example_slab_sugg = 1000 
-            total_commit_sugg = d_config * example_slab_sugg
-            avg_holding_periods_months = sum(range(1, d_config + 1)) / d_config if d_config > 0 else 0
-            avg_nii_sugg = total_commit_sugg * ((kibor + spread) / 100 / 12) * avg_holding_periods_months
-            pre_def_loss_sugg = total_commit_sugg * (default_rate/100) * (default_pre_pct / 100) * (1 - penalty_pct / 100)
-            post_def_loss_sugg = total_commit_sugg * (default_rate/100) * (default_post_pct / 100)
-            avg_loss_sugg = (pre_def_loss_sugg + post_def_loss_sugg)
-            suggested_fee_pct_val = 0
-            if total_commit_sugg > 0:
-                 suggested_fee_pct_val = ((avg_nii_sugg + avg_loss_sugg) / total_commit_sugg) * 100
+            for s_config in range(1, num_slots_for_duration + 1):
+                example_slab_sugg = 1000 
+                total_commit_sugg = d_config * example_slab_sugg
+                avg_holding_periods_months = sum(range(1, d_config + 1)) / d_config if d_config > 0 else 0
+                avg_nii_sugg = total_commit_sugg * ((kibor + spread) / 100 / 12) * avg_holding_periods_months
+                pre_def_loss_sugg = total_commit_sugg * (default_rate/100) * (default_pre_pct / 100) * (1 - penalty_pct / 100)
+                post_def_loss_sugg = total_commit_sugg * (default_rate/100) * (default_post_pct / 100)
+                avg_loss_sugg = (pre_def_loss_sugg + post_def_loss_sugg)
+                suggested_fee_pct_val = 0
+                if total_commit_sugg > 0:
+                     suggested_fee_pct_val = ((avg_nii_sugg + avg_loss_sugg) / total_commit_sugg) * 100
             
-            key_fee_config = f"fee_{d_config}_{s_config}"
-            key_block_config = f"block_{d_config}_{s_config}"
-            key_pct_config = f"slot_pct_d{d_config}_s{s_config}"
+                key_fee_config = f"fee_{d_config}_{s_config}"
+                key_block_config = f"block_{d_config}_{s_config}"
+                key_pct_config = f"slot_pct_d{d_config}_s{s_config}"
             
-            fee_input_val = st.number_input(f"Slot {s_config} Fee % (on total commitment)", 0.0, 100.0, max(0.1, round(suggested_fee_pct_val,1)), step=0.1, key=key_fee_config, help=f"Suggested to cover avg NII & Loss ≥ {suggested_fee_pct_val:.2f}%")
-            blocked_input_val = st.checkbox(f"Block Slot {s_config}", key=key_block_config)
+                fee_input_val = st.number_input(f"Slot {s_config} Fee % (on total commitment)", 0.0, 100.0, max(0.1, round(suggested_fee_pct_val,1)), step=0.1, key=key_fee_config, help=f"Suggested to cover avg NII & Loss ≥ {suggested_fee_pct_val:.2f}% (rough; see 🎯 Break-even Fees below the results for the exact value)")
+                blocked_input_val = st.checkbox(f"Block Slot {s_config}", key=key_block_config)
             
-            current_slot_dist_default = default_slot_share_val
-            if s_config == num_slots_for_duration and num_slots_for_duration > 0:
-                current_slot_dist_default = 100 - (default_slot_share_val * (num_slots_for_duration - 1))
-            if num_slots_for_duration == 1: current_slot_dist_default = 100
+                current_slot_dist_default = default_slot_share_val
+                if s_config == num_slots_for_duration and num_slots_for_duration > 0:
+                    current_slot_dist_default = 100 - (default_slot_share_val * (num_slots_for_duration - 1))
+                if num_slots_for_duration == 1: current_slot_dist_default = 100
 
-            slot_pct_input_val = st.number_input(label=f"Slot {s_config} % of Users (Duration {d_config}M)", min_value=0, max_value=100, value=int(current_slot_dist_default), step=1, key=key_pct_config)
+                slot_pct_input_val = st.number_input(label=f"Slot {s_config} % of Users (Duration {d_config}M)", min_value=0, max_value=100, value=int(current_slot_dist_default), step=1, key=key_pct_config)
             
-            slot_fees[d_config][s_config] = {"fee": fee_input_val, "blocked": blocked_input_val}
-            temp_slot_dist[s_config] = slot_pct_input_val
+                slot_fees[d_config][s_config] = {"fee": fee_input_val, "blocked": blocked_input_val}
+                temp_slot_dist[s_config] = slot_pct_input_val
         
-        slot_distribution[d_config] = temp_slot_dist
-        total_slot_dist_pct_unblocked = sum(v for k,v in temp_slot_dist.items() if not slot_fees[d_config].get(k, {}).get('blocked', False) ) # Safer get
+            slot_distribution[d_config] = temp_slot_dist
+            total_slot_dist_pct_unblocked = sum(v for k,v in temp_slot_dist.items() if not slot_fees[d_config].get(k, {}).get('blocked', False) ) # Safer get
         
-        if sum(temp_slot_dist.values()) > 0 and abs(total_slot_dist_pct_unblocked - 100) > 0.1: # Check if any unblocked slots have distribution
-            any_unblocked_has_share = any(v > 0 for k,v in temp_slot_dist.items() if not slot_fees[d_config].get(k, {}).get('blocked', False))
-            if any_unblocked_has_share: # Only validate if there are unblocked slots with shares
-                validation_messages.append(f"⚠️ Slot distribution for unblocked slots in {d_config}M totals {total_slot_dist_pct_unblocked}%. It should be 100%.")
+            if sum(temp_slot_dist.values()) > 0 and abs(total_slot_dist_pct_unblocked - 100) > 0.1: # Check if any unblocked slots have distribution
+                any_unblocked_has_share = any(v > 0 for k,v in temp_slot_dist.items() if not slot_fees[d_config].get(k, {}).get('blocked', False))
+                if any_unblocked_has_share: # Only validate if there are unblocked slots with shares
+                    validation_messages.append(f"⚠️ Slot distribution for unblocked slots in {d_config}M totals {total_slot_dist_pct_unblocked}%. It should be 100%.")
+    st.form_submit_button("Apply Configuration", type="primary")
 
 if validation_messages:
     for msg_val in validation_messages: 
@@ -209,437 +270,165 @@ if validation_messages:
     if any("must not exceed 100%" in msg or "should be 100%" in msg for msg in validation_messages): # Critical validation
         st.stop()
 
+# Every session has its own collector, so one user's panel neither switches
+# collection for another user's run nor clears their timings.
+session_diagnostics_main = st.session_state.setdefault("diagnostics", Diagnostics())
+session_diagnostics_main.activate()
+if show_diagnostics:
+    session_diagnostics_main.enable(trace_memory=diagnostics_trace_memory)
+    session_diagnostics_main.reset()
+else:
+    session_diagnostics_main.disable()
 
-# === FORECASTING LOGIC ===
-def run_forecast(config_param_fc):
-    months_fc = 60
-    
-    potential_initial_tam_float = config_param_fc['total_market'] * (config_param_fc['tam_pct'] / 100)
-    initial_tam_fc = math.ceil(potential_initial_tam_float)
-    if initial_tam_fc < 0: initial_tam_fc = 0 
-    
-    acquisition_rate_fc = config_param_fc['monthly_growth'] / 100
-    
-    potential_float_m1_users = initial_tam_fc * (config_param_fc['start_pct'] / 100) 
-    initial_new_users_m1_fc = math.ceil(potential_float_m1_users)
-    if initial_new_users_m1_fc < 0: initial_new_users_m1_fc = 0
-    
-    cumulative_acquired_base_fc = 0 
-    rejoin_tracker_fc = {}
-    forecast_data_fc, deposit_log_data_fc, default_log_data_fc, lifecycle_data_fc = [], [], [], []
-    
-    TAM_current_year_fc = initial_tam_fc 
-    TAM_used_cumulative_vs_cap_fc = 0 
-    enforce_cap_growth_fc = config_param_fc.get("cap_tam", False)
-
-    current_kibor_rate_fc = config_param_fc['kibor'] / 100
-    current_spread_rate_fc = config_param_fc['spread'] / 100
-    daily_interest_rate_fc = (current_kibor_rate_fc + current_spread_rate_fc) / 365
-    current_rest_period_months_fc = config_param_fc['rest_period']
-    current_default_frac_fc = config_param_fc['default_rate'] / 100
-    current_penalty_frac_fc = config_param_fc['penalty_pct'] / 100
-    global_default_pre_frac_fc = default_pre_pct / 100
-    global_default_post_frac_fc = default_post_pct / 100
-
-    for m_idx_fc in range(months_fc): 
-        current_month_num_fc = m_idx_fc + 1 
-        current_year_num_fc = m_idx_fc // 12 + 1
-        
-        if m_idx_fc > 0 and m_idx_fc % 12 == 0: 
-            TAM_current_year_fc_float = TAM_current_year_fc * (1 + config_param_fc['annual_growth'] / 100)
-            TAM_current_year_fc = math.ceil(TAM_current_year_fc_float) 
-
-        potential_new_acquisitions_this_month_fc = 0 
-        if m_idx_fc == 0: 
-            potential_new_acquisitions_this_month_fc = initial_new_users_m1_fc 
-        else: 
-            if cumulative_acquired_base_fc > 0 and acquisition_rate_fc > 0:
-                potential_float_users = cumulative_acquired_base_fc * acquisition_rate_fc
-                potential_new_acquisitions_this_month_fc = math.ceil(potential_float_users)
-        if potential_new_acquisitions_this_month_fc < 0 : potential_new_acquisitions_this_month_fc = 0
-
-        actual_new_acquisitions_this_month_fc = potential_new_acquisitions_this_month_fc
-        if enforce_cap_growth_fc:
-            current_tam_for_cap = max(0, TAM_current_year_fc)
-            if (TAM_used_cumulative_vs_cap_fc + actual_new_acquisitions_this_month_fc) > current_tam_for_cap:
-                actual_new_acquisitions_this_month_fc = max(0, current_tam_for_cap - TAM_used_cumulative_vs_cap_fc)
-            actual_new_acquisitions_this_month_fc = int(actual_new_acquisitions_this_month_fc) 
-        
-        cumulative_acquired_base_fc += actual_new_acquisitions_this_month_fc
-        TAM_used_cumulative_vs_cap_fc += actual_new_acquisitions_this_month_fc
-        newly_acquired_this_month_fc_val = actual_new_acquisitions_this_month_fc
-
-        rejoining_users_this_month_fc_val = rejoin_tracker_fc.get(m_idx_fc, 0) 
-        total_onboarding_this_month_fc = newly_acquired_this_month_fc_val + rejoining_users_this_month_fc_val
-        temp_rejoining_users_for_allocation = rejoining_users_this_month_fc_val
-        
-        # Get the duration shares for the current year, default to empty dict if not found
-        durations_for_this_year_fc = yearly_duration_share.get(current_year_num_fc, {})
-
-        if total_onboarding_this_month_fc == 0 or not durations_for_this_year_fc:
-            lifecycle_data_fc.append({"Month": current_month_num_fc, "New Users Acquired for Cohort": 0, "Rejoining Users for Cohort": 0, "Total Onboarding to Cohort": 0})
-            deposit_log_data_fc.append({"Month": current_month_num_fc, "Users Joining": 0, "Installments Collected": 0, "NII This Month (Avg)": 0})
-            default_log_data_fc.append({"Month": current_month_num_fc, "Year": current_year_num_fc, "Pre-Payout Defaulters (Cohort)": 0, "Post-Payout Defaulters (Cohort)": 0, "Default Loss (Cohort Lifetime)": 0})
-            continue
-
-        # --- User distribution logic with rounding error management ---
-        # This ensures that the sum of users distributed across cohorts equals total_onboarding_this_month_fc
-        remaining_users_to_distribute = total_onboarding_this_month_fc
-        num_dur_configs = len(durations_for_this_year_fc)
-        
-        # Create a list of (duration, share_pct) to sort/process if needed, or iterate directly
-        sorted_dur_shares = sorted(durations_for_this_year_fc.items(), key=lambda item: item[1], reverse=True) # Example: process larger shares first
-
-        for idx_dur, (dur_val_fc, dur_share_pct_fc) in enumerate(sorted_dur_shares):
-            if dur_share_pct_fc == 0 or remaining_users_to_distribute == 0: continue
-            
-            # Allocate users for this duration
-            if idx_dur == num_dur_configs - 1: # Last duration config
-                users_for_this_duration_fc = remaining_users_to_distribute
-            else:
-                users_for_this_duration_fc = math.ceil(total_onboarding_this_month_fc * (dur_share_pct_fc / 100.0))
-                users_for_this_duration_fc = min(users_for_this_duration_fc, remaining_users_to_distribute)
-            
-            if users_for_this_duration_fc == 0: continue
-            current_duration_distributed_users = users_for_this_duration_fc # Keep track for this duration's slabs
-            
-            # Slabs for this duration
-            slabs_for_this_duration = slab_map.get(dur_val_fc, {})
-            if not slabs_for_this_duration: continue
-            
-            num_slab_configs = len(slabs_for_this_duration)
-            sorted_slab_shares = sorted(slabs_for_this_duration.items(), key=lambda item: item[1], reverse=True)
-
-            for idx_slab, (installment_val_fc, slab_share_pct_fc) in enumerate(sorted_slab_shares):
-                if slab_share_pct_fc == 0 or current_duration_distributed_users == 0: continue
 
-                if idx_slab == num_slab_configs -1:
-                    users_for_this_slab_fc = current_duration_distributed_users
-                else:
-                    users_for_this_slab_fc = math.ceil(users_for_this_duration_fc * (slab_share_pct_fc / 100.0))
-                    users_for_this_slab_fc = min(users_for_this_slab_fc, current_duration_distributed_users)
-
-                if users_for_this_slab_fc == 0: continue
-                current_slab_distributed_users = users_for_this_slab_fc
-
-                # Slots for this slab/duration
-                slots_for_this_config = slot_distribution.get(dur_val_fc, {})
-                if not slots_for_this_config : continue
-                
-                num_slot_configs = sum(1 for s_cfg in slot_fees.get(dur_val_fc, {}).values() if not s_cfg.get('blocked', False)) # Count unblocked
-                
-                # Filter and sort unblocked slots
-                unblocked_slot_items = {k: v for k, v in slots_for_this_config.items() if not slot_fees.get(dur_val_fc, {}).get(k, {}).get('blocked', False)}
-                if not unblocked_slot_items: continue
-                
-                sorted_slot_shares = sorted(unblocked_slot_items.items(), key=lambda item: item[1], reverse=True)
-                num_unblocked_slot_configs = len(sorted_slot_shares)
-
-
-                for idx_slot, (slot_num_fc, slot_user_share_pct) in enumerate(sorted_slot_shares):
-                    slot_config_meta_fc = slot_fees.get(dur_val_fc, {}).get(slot_num_fc, {})
-                    if slot_user_share_pct == 0 or current_slab_distributed_users == 0: continue
-                    
-                    if idx_slot == num_unblocked_slot_configs - 1:
-                        users_in_this_specific_cohort_fc = current_slab_distributed_users
-                    else:
-                        users_in_this_specific_cohort_fc = math.ceil(users_for_this_slab_fc * (slot_user_share_pct / 100.0))
-                        users_in_this_specific_cohort_fc = min(users_in_this_specific_cohort_fc, current_slab_distributed_users)
-                    
-                    if users_in_this_specific_cohort_fc == 0: continue
-                    
-                    from_rejoin_pool_fc = min(users_in_this_specific_cohort_fc, temp_rejoining_users_for_allocation)
-                    from_newly_acquired_fc = users_in_this_specific_cohort_fc - from_rejoin_pool_fc
-                    temp_rejoining_users_for_allocation -= from_rejoin_pool_fc 
-                    if temp_rejoining_users_for_allocation < 0: temp_rejoining_users_for_allocation = 0
-
-                    fee_on_commitment_frac_fc = slot_config_meta_fc.get('fee', 0) / 100.0 # Safer get
-                    total_commitment_per_user_fc = installment_val_fc * dur_val_fc
-                    fee_amount_per_user_fc = total_commitment_per_user_fc * fee_on_commitment_frac_fc
-                    total_nii_for_cohort_lifetime_per_user = 0
-                    payout_due_month_idx_for_cohort_fc = m_idx_fc + slot_num_fc - 1
-
-                    for j_installment_num in range(dur_val_fc): 
-                        collection_month_of_this_installment_idx = m_idx_fc + j_installment_num
-                        days_this_installment_held = days_between_specific_dates(collection_month_of_this_installment_idx, global_collection_day, payout_due_month_idx_for_cohort_fc, global_payout_day)
-                        nii_from_this_installment = installment_val_fc * daily_interest_rate_fc * days_this_installment_held
-                        total_nii_for_cohort_lifetime_per_user += nii_from_this_installment
-                    
-                    total_nii_for_cohort_duration_fc = total_nii_for_cohort_lifetime_per_user * users_in_this_specific_cohort_fc
-                    avg_monthly_nii_for_cohort = total_nii_for_cohort_duration_fc / dur_val_fc if dur_val_fc > 0 else 0
-                    nii_to_log_for_joining_month = avg_monthly_nii_for_cohort 
-
-                    num_defaulters_total_fc = math.ceil(users_in_this_specific_cohort_fc * current_default_frac_fc) 
-                    num_pre_payout_defaulters_fc = math.ceil(num_defaulters_total_fc * global_default_pre_frac_fc) 
-                    num_post_payout_defaulters_fc = num_defaulters_total_fc - num_pre_payout_defaulters_fc
-                    if num_post_payout_defaulters_fc < 0: num_post_payout_defaulters_fc = 0
-
-                    loss_per_pre_defaulter_fc = total_commitment_per_user_fc * (1 - current_penalty_frac_fc)
-                    total_pre_payout_loss_fc = num_pre_payout_defaulters_fc * loss_per_pre_defaulter_fc
-                    loss_per_post_defaulter_fc = total_commitment_per_user_fc
-                    total_post_payout_loss_fc = num_post_payout_defaulters_fc * loss_per_post_defaulter_fc
-                    total_loss_for_cohort_fc = total_pre_payout_loss_fc + total_post_payout_loss_fc
-                    total_fees_for_cohort_fc = fee_amount_per_user_fc * users_in_this_specific_cohort_fc
-                    expected_lifetime_profit_for_cohort_fc = (total_fees_for_cohort_fc + total_nii_for_cohort_duration_fc) - total_loss_for_cohort_fc
-                    cash_in_installments_this_month_cohort_fc = users_in_this_specific_cohort_fc * installment_val_fc
-                    payout_due_calendar_month_for_cohort_fc = payout_due_month_idx_for_cohort_fc + 1 
-                    payout_amount_scheduled_for_cohort_fc = users_in_this_specific_cohort_fc * total_commitment_per_user_fc
-                    pools_formed_by_this_cohort_fc = users_in_this_specific_cohort_fc / dur_val_fc if dur_val_fc > 0 else 0
-                    external_capital_needed_for_cohort_lifetime_fc = max(0, total_loss_for_cohort_fc - (total_fees_for_cohort_fc + total_nii_for_cohort_duration_fc))
-
-                    forecast_data_fc.append({
-                        "Month Joined": current_month_num_fc, "Year Joined": current_year_num_fc,
-                        "Duration": dur_val_fc, "Slab Installment": installment_val_fc, "Assigned Slot": slot_num_fc,
-                        "Users": users_in_this_specific_cohort_fc, "Pools Formed": pools_formed_by_this_cohort_fc,
-                        "Total Commitment/User": total_commitment_per_user_fc,
-                        "Fee % (on Total Commitment)": fee_on_commitment_frac_fc * 100,
-                        "Total Fee Collected (Lifetime)": total_fees_for_cohort_fc,
-                        "NII Earned This Month (Avg)": nii_to_log_for_joining_month,
-                        "Total NII (Lifetime)": total_nii_for_cohort_duration_fc,
-                        "Expected Lifetime Profit": expected_lifetime_profit_for_cohort_fc,
-                        "Cash In (Installments This Month)": cash_in_installments_this_month_cohort_fc,
-                        "Payout Due Month": payout_due_calendar_month_for_cohort_fc,
-                        "Payout Amount Scheduled": payout_amount_scheduled_for_cohort_fc,
-                        "Total Default Loss (Lifetime)": total_loss_for_cohort_fc,
-                        "External Capital For Loss (Lifetime)": external_capital_needed_for_cohort_lifetime_fc
-                    })
-                    deposit_log_data_fc.append({"Month": current_month_num_fc, "Users Joining": users_in_this_specific_cohort_fc, "Installments Collected": cash_in_installments_this_month_cohort_fc, "NII This Month (Avg)": nii_to_log_for_joining_month})
-                    default_log_data_fc.append({"Month": current_month_num_fc, "Year": current_year_num_fc, "Pre-Payout Defaulters (Cohort)": num_pre_payout_defaulters_fc,"Post-Payout Defaulters (Cohort)": num_post_payout_defaulters_fc,"Default Loss (Cohort Lifetime)": total_loss_for_cohort_fc})
-                    lifecycle_data_fc.append({"Month": current_month_num_fc, "New Users Acquired for Cohort": from_newly_acquired_fc, "Rejoining Users for Cohort": from_rejoin_pool_fc, "Total Onboarding to Cohort": users_in_this_specific_cohort_fc}) 
-                    
-                    rejoin_at_month_idx_fc = m_idx_fc + dur_val_fc + int(current_rest_period_months_fc)
-                    non_defaulters_in_cohort = users_in_this_specific_cohort_fc - num_defaulters_total_fc
-                    if non_defaulters_in_cohort < 0: non_defaulters_in_cohort = 0 
-                    if rejoin_at_month_idx_fc < months_fc and non_defaulters_in_cohort > 0 :
-                        rejoin_tracker_fc[rejoin_at_month_idx_fc] = rejoin_tracker_fc.get(rejoin_at_month_idx_fc, 0) + non_defaulters_in_cohort
-                    
-                    current_slab_distributed_users -= users_in_this_specific_cohort_fc # Decrement for next slot
-                current_duration_distributed_users -= users_for_this_slab_fc # Decrement for next slab
-            remaining_users_to_distribute -= users_for_this_duration_fc # Decrement for next duration
-        
-    df_forecast_fc = pd.DataFrame(forecast_data_fc).fillna(0)
-    df_deposit_log_fc = pd.DataFrame(deposit_log_data_fc).fillna(0)
-    df_default_log_fc = pd.DataFrame(default_log_data_fc).fillna(0)
-    df_lifecycle_fc = pd.DataFrame(lifecycle_data_fc).fillna(0)
-    return df_forecast_fc, df_deposit_log_fc, df_default_log_fc, df_lifecycle_fc
+# === FORECASTING LOGIC ===
+forecast_config_main = ForecastConfig(
+    scenarios=[ScenarioConfig(**scenario_data) for scenario_data in scenarios],
+    collection_day=global_collection_day, payout_day=global_payout_day, profit_split=profit_split,
+    kibor=kibor, spread=spread, rest_period=rest_period, default_rate=default_rate,
+    default_pre_pct=default_pre_pct, penalty_pct=penalty_pct, forecast_months=int(forecast_years) * 12,
+    monte_carlo_paths=monte_carlo_paths, monte_carlo_seed=monte_carlo_seed, monte_carlo_rejoin_pct=monte_carlo_rejoin_pct,
+    base_year=base_year, pool_carry_over=pool_carry_over, yearly_duration_share=yearly_duration_share, slab_map=slab_map,
+    slot_fees=slot_fees, slot_distribution=slot_distribution
+)
+# The applied inputs as a config file, loadable above or by the CLI.
+config_save_format_main = st.sidebar.radio("Config File Format", CONFIG_FORMATS, horizontal=True, format_func=str.upper)
+st.sidebar.download_button("💾 Save Config", data=dumps_config(forecast_config_main, config_save_format_main), file_name=f"rosca_config.{config_save_format_main}", mime="application/json" if config_save_format_main == "json" else "application/x-yaml")
 
 # === EXPORT AND DISPLAY ===
-output_excel_main = io.BytesIO()
-
-with pd.ExcelWriter(output_excel_main, engine="xlsxwriter") as excel_writer_main:
-    for scenario_idx_main, scenario_data_main in enumerate(scenarios):
-        current_config_main = scenario_data_main.copy()
-        current_config_main.update({
-            "kibor": kibor, "spread": spread, "rest_period": rest_period,
-            "default_rate": default_rate, "penalty_pct": penalty_pct
-        })
-        
-        df_forecast_main, df_deposit_log_main, df_default_log_main, df_lifecycle_main = run_forecast(current_config_main)
-
-        st.header(f"Scenario: {scenario_data_main['name']}")
-        st.subheader(f"📘 Raw Forecast Data (Cohorts by Joining Month)")
-        if not df_forecast_main.empty:
+EXPORT_FORMATS_MAIN = {"Excel (.xlsx)": None, "Parquet (.zip)": "parquet", "CSV (.zip)": "csv"}
+export_format_main = EXPORT_FORMATS_MAIN[st.sidebar.selectbox("Export Format", list(EXPORT_FORMATS_MAIN), help="Parquet and CSV downloads are zips with one file per table and a manifest.json holding the config.")]
+# Scenarios missing from the cache run in parallel worker processes. The page shows
+# one KPI row per scenario and renders the details of the selected one only, so it
+# stays the same size however many scenarios there are.
+with st.spinner(f"Running {len(forecast_config_main.scenarios)} scenario(s)..."):
+    results_main = run_all(forecast_config_main, max_workers=None)
+st.header("📋 Scenario Comparison")
+st.dataframe(kpi_table(results_main).style.format(precision=0, thousands=","), hide_index=True)
+scenario_idx_main = st.selectbox("Scenario Details", range(len(results_main)), format_func=lambda i: results_main[i].name, key="detail_scenario")
+scenario_config_main = forecast_config_main.scenarios[scenario_idx_main]
+result_main = results_main[scenario_idx_main]
+scenario_data_main = scenarios[scenario_idx_main]
+df_forecast_main = result_main.forecast
+df_monthly_summary_main, df_yearly_summary_main, df_profit_share_main = result_main.monthly, result_main.yearly, result_main.profit_share
+
+st.header(f"Scenario: {scenario_data_main['name']}")
+st.subheader(f"📘 Raw Forecast Data (Cohorts by Joining Month)")
+with session_diagnostics_main.stage("tables"):
+    if not df_forecast_main.empty:
+        if df_forecast_main.size <= pd.get_option("styler.render.max_elements"):
             st.dataframe(df_forecast_main.style.format(precision=0, thousands=","))
-
-            df_monthly_direct_main = df_forecast_main.groupby("Month Joined")[
-                ["Cash In (Installments This Month)", "NII Earned This Month (Avg)", "Pools Formed", "Users"] 
-            ].sum().reset_index().rename(columns={"Month Joined": "Month", 
-                                                  "Users": "Users Joining This Month", 
-                                                  "NII Earned This Month (Avg)": "NII This Month (Sum of Avg from New Cohorts)"}) 
-
-            df_payouts_actual_main = df_forecast_main.groupby("Payout Due Month")[
-                ["Payout Amount Scheduled", "Users"]
-            ].sum().reset_index().rename(columns={
-                "Payout Due Month": "Month", 
-                "Payout Amount Scheduled": "Actual Cash Out This Month",
-                "Users": "Payout Recipient Users"
-            })
-            
-            df_lifetime_values_main = df_forecast_main.groupby("Month Joined")[
-                ["Total Fee Collected (Lifetime)", "Total NII (Lifetime)", 
-                 "Total Default Loss (Lifetime)", "Expected Lifetime Profit",
-                 "External Capital For Loss (Lifetime)"]
-            ].sum().reset_index().rename(columns={"Month Joined": "Month"})
-
-            df_monthly_summary_main = pd.DataFrame({"Month": range(1, 61)})
-            df_monthly_summary_main = df_monthly_summary_main.merge(df_monthly_direct_main, on="Month", how="left")
-            df_monthly_summary_main = df_monthly_summary_main.merge(df_payouts_actual_main, on="Month", how="left")
-            df_monthly_summary_main = df_monthly_summary_main.merge(df_lifetime_values_main, on="Month", how="left")
-            df_monthly_summary_main = df_monthly_summary_main.fillna(0)
-
-            df_monthly_summary_main["Net Cash Flow This Month"] = df_monthly_summary_main["Cash In (Installments This Month)"] - df_monthly_summary_main["Actual Cash Out This Month"]
-            df_monthly_summary_main["Gross Profit This Month (Accrued from New Cohorts)"] = df_monthly_summary_main["Total Fee Collected (Lifetime)"] + \
-                                                                    df_monthly_summary_main["Total NII (Lifetime)"] - \
-                                                                    df_monthly_summary_main["Total Default Loss (Lifetime)"]
-            
-            st.subheader(f"📊 Monthly Summary for {scenario_data_main['name']}")
-            cols_to_display_monthly_main = [
-                "Month", "Users Joining This Month", "Pools Formed", 
-                "Cash In (Installments This Month)", "Actual Cash Out This Month", "Net Cash Flow This Month",
-                "NII This Month (Sum of Avg from New Cohorts)", 
-                "Total NII (Lifetime)", 
-                "Payout Recipient Users",
-                "Total Fee Collected (Lifetime)", "Total Default Loss (Lifetime)",
-                "Gross Profit This Month (Accrued from New Cohorts)", "External Capital For Loss (Lifetime)"
-            ]
-            st.dataframe(df_monthly_summary_main[cols_to_display_monthly_main].style.format(precision=0, thousands=","))
-
-            df_monthly_summary_main["Year"] = ((df_monthly_summary_main["Month"] - 1) // 12) + 1
-            df_yearly_summary_main = df_monthly_summary_main.groupby("Year")[
-                ["Users Joining This Month", "Pools Formed", "Cash In (Installments This Month)", 
-                 "Actual Cash Out This Month", "Net Cash Flow This Month", 
-                 "NII This Month (Sum of Avg from New Cohorts)", "Total NII (Lifetime)",
-                 "Payout Recipient Users", "Total Fee Collected (Lifetime)", 
-                 "Total Default Loss (Lifetime)", "Gross Profit This Month (Accrued from New Cohorts)", 
-                 "External Capital For Loss (Lifetime)"]
-            ].sum().reset_index()
-            df_yearly_summary_main.rename(columns={
-                "Gross Profit This Month (Accrued from New Cohorts)": "Annual Gross Profit (Accrued from New Cohorts)",
-                "NII This Month (Sum of Avg from New Cohorts)": "Annual NII (Sum of Avg from New Cohorts)",
-                "Total NII (Lifetime)": "Annual Total NII (Lifetime from New Cohorts)"
-                }, inplace=True)
-
-            df_profit_share_main = pd.DataFrame({
-                "Year": df_yearly_summary_main["Year"],
-                "External Capital Needed (Annual Accrual)": df_yearly_summary_main["External Capital For Loss (Lifetime)"],
-                "Annual Cash In (Installments)": df_yearly_summary_main["Cash In (Installments This Month)"],
-                "Annual NII (Accrued Lifetime)": df_yearly_summary_main["Annual Total NII (Lifetime from New Cohorts)"], 
-                "Annual Default Loss (Accrued)": df_yearly_summary_main["Total Default Loss (Lifetime)"],
-                "Annual Fee Collected (Accrued)": df_yearly_summary_main["Total Fee Collected (Lifetime)"],
-                "Annual Gross Profit (Accrued)": df_yearly_summary_main["Annual Gross Profit (Accrued from New Cohorts)"],
-                "Part-A Profit Share": df_yearly_summary_main["Annual Gross Profit (Accrued from New Cohorts)"] * party_a_pct,
-                "Part-B Profit Share": df_yearly_summary_main["Annual Gross Profit (Accrued from New Cohorts)"] * party_b_pct
-            })
-            df_profit_share_main["% Loss Covered by External Capital"] = 0
-            mask_main = df_yearly_summary_main["Total Default Loss (Lifetime)"] > 0
-            if mask_main.any(): 
-                df_profit_share_main.loc[mask_main, "% Loss Covered by External Capital"] = \
-                    (df_yearly_summary_main.loc[mask_main, "External Capital For Loss (Lifetime)"] / df_yearly_summary_main.loc[mask_main, "Total Default Loss (Lifetime)"]) * 100
-            df_profit_share_main.fillna(0, inplace=True)
-
-            st.subheader(f"💰 Profit Share Summary for {scenario_data_main['name']}")
-            st.dataframe(df_profit_share_main.style.format(precision=0, thousands=","))
-            st.subheader(f"📆 Yearly Summary for {scenario_data_main['name']}")
-            st.dataframe(df_yearly_summary_main.style.format(precision=0, thousands=","))
-        else: 
-            st.warning(f"No forecast data generated for {scenario_data_main['name']}. Summary tables will be empty.")
-            df_monthly_summary_main = pd.DataFrame(columns=["Month"]) 
-            df_yearly_summary_main = pd.DataFrame(columns=["Year"])
-            df_profit_share_main = pd.DataFrame(columns=["Year"])
-
-        st.subheader(f"Visual Charts for {scenario_data_main['name']}")
-        df_monthly_chart_data_main = df_monthly_summary_main.copy()
-        df_yearly_chart_data_main = df_yearly_summary_main.copy()
-        if "Year" in df_yearly_chart_data_main.columns and not df_yearly_chart_data_main.empty:
-            df_yearly_chart_data_main["Year"] = df_yearly_chart_data_main["Year"].astype(str)
-        df_profit_share_chart_data_main = df_profit_share_main.copy()
-        if "Year" in df_profit_share_chart_data_main.columns and not df_profit_share_chart_data_main.empty:
-            df_profit_share_chart_data_main["Year"] = df_profit_share_chart_data_main["Year"].astype(str)
-
-        FIG_SIZE_MAIN = (10, 4.5)
-        # Check if dataframes for charts are not empty and contain necessary columns and non-zero/non-null data
-        can_plot_m1 = not df_monthly_chart_data_main.empty and \
-                      all(col in df_monthly_chart_data_main.columns for col in ["Month", "Pools Formed", "Cash In (Installments This Month)"]) and \
-                      not df_monthly_chart_data_main[["Pools Formed", "Cash In (Installments This Month)"]].fillna(0).eq(0).all().all()
-        
-        can_plot_m2 = not df_monthly_chart_data_main.empty and \
-                      all(col in df_monthly_chart_data_main.columns for col in ["Month", "Users Joining This Month", "Gross Profit This Month (Accrued from New Cohorts)"]) and \
-                      not df_monthly_chart_data_main[["Users Joining This Month", "Gross Profit This Month (Accrued from New Cohorts)"]].fillna(0).eq(0).all().all()
-
-        can_plot_y1 = not df_yearly_chart_data_main.empty and \
-                      all(col in df_yearly_chart_data_main.columns for col in ["Year", "Pools Formed", "Cash In (Installments This Month)"]) and \
-                      not df_yearly_chart_data_main[["Pools Formed", "Cash In (Installments This Month)"]].fillna(0).eq(0).all().all()
-
-        can_plot_y2 = not df_yearly_chart_data_main.empty and \
-                      all(col in df_yearly_chart_data_main.columns for col in ["Year", "Users Joining This Month", "Annual Gross Profit (Accrued from New Cohorts)"]) and \
-                      not df_yearly_chart_data_main[["Users Joining This Month", "Annual Gross Profit (Accrued from New Cohorts)"]].fillna(0).eq(0).all().all()
-        
-        can_plot_y3 = not df_profit_share_chart_data_main.empty and \
-                      all(col in df_profit_share_chart_data_main.columns for col in ["Year", "External Capital Needed (Annual Accrual)", "Annual Fee Collected (Accrued)", "Annual Gross Profit (Accrued)"]) and \
-                      not df_profit_share_chart_data_main[["External Capital Needed (Annual Accrual)", "Annual Fee Collected (Accrued)", "Annual Gross Profit (Accrued)"]].fillna(0).eq(0).all().all()
-
-
-        st.markdown("##### Chart 1: Monthly Pools Formed vs. Cash In (Installments)")
-        if can_plot_m1:
-            fig1_main, ax1_main = plt.subplots(figsize=FIG_SIZE_MAIN)
-            ax2_main = ax1_main.twinx()
-            bars1_main = ax1_main.bar(df_monthly_chart_data_main["Month"], df_monthly_chart_data_main["Pools Formed"], color=COLOR_PRIMARY_BAR, label="Pools Formed This Month", width=0.7)
-            line1_main, = ax2_main.plot(df_monthly_chart_data_main["Month"], df_monthly_chart_data_main["Cash In (Installments This Month)"], color=COLOR_SECONDARY_LINE, label="Cash In (Installments)", marker='o', linewidth=2, markersize=4)
-            ax1_main.set_xlabel("Month"); ax1_main.set_ylabel("Pools Formed", color=COLOR_PRIMARY_BAR); ax2_main.set_ylabel("Cash In (Installments)", color=COLOR_SECONDARY_LINE)
-            ax1_main.tick_params(axis='y', labelcolor=COLOR_PRIMARY_BAR); ax2_main.tick_params(axis='y', labelcolor=COLOR_SECONDARY_LINE)
-            ax2_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}")); ax1_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
-            handles_main = [bars1_main, line1_main]; labels_main = [h.get_label() for h in handles_main]
-            fig1_main.legend(handles_main, labels_main, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=2); fig1_main.tight_layout(rect=[0, 0.05, 1, 1]); st.pyplot(fig1_main)
-        else: st.caption("Not enough data or all values are zero for Chart 1.")
-
-        st.markdown("##### Chart 2: Monthly Users Joining vs. Accrued Gross Profit (from New Cohorts)")
-        if can_plot_m2:
-            fig2_main, ax3_main = plt.subplots(figsize=FIG_SIZE_MAIN)
-            ax4_main = ax3_main.twinx()
-            bars2_main = ax3_main.bar(df_monthly_chart_data_main["Month"], df_monthly_chart_data_main["Users Joining This Month"], color=COLOR_ACCENT_BAR, label="Users Joining This Month", width=0.7)
-            line2_main, = ax4_main.plot(df_monthly_chart_data_main["Month"], df_monthly_chart_data_main["Gross Profit This Month (Accrued from New Cohorts)"], color=COLOR_ACCENT_LINE, label="Accrued Gross Profit (New Cohorts)", marker='o', linewidth=2, markersize=4)
-            ax3_main.set_xlabel("Month"); ax3_main.set_ylabel("Users Joining", color=COLOR_ACCENT_BAR); ax4_main.set_ylabel("Accrued Gross Profit", color=COLOR_ACCENT_LINE)
-            ax3_main.tick_params(axis='y', labelcolor=COLOR_ACCENT_BAR); ax4_main.tick_params(axis='y', labelcolor=COLOR_ACCENT_LINE)
-            ax3_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}")); ax4_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
-            handles_main = [bars2_main, line2_main]; labels_main = [h.get_label() for h in handles_main]
-            fig2_main.legend(handles_main, labels_main, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=2); fig2_main.tight_layout(rect=[0, 0.05, 1, 1]); st.pyplot(fig2_main)
-        else: st.caption("Not enough data or all values are zero for Chart 2.")
-
-        st.markdown("##### Chart 3: Annual Pools Formed vs. Annual Cash In (Installments)")
-        if can_plot_y1:
-            fig3_main, ax5_main = plt.subplots(figsize=FIG_SIZE_MAIN)
-            ax6_main = ax5_main.twinx()
-            bars3_main = ax5_main.bar(df_yearly_chart_data_main["Year"], df_yearly_chart_data_main["Pools Formed"], color=COLOR_PRIMARY_BAR, label="Annual Pools Formed", width=0.6) 
-            line3_main, = ax6_main.plot(df_yearly_chart_data_main["Year"], df_yearly_chart_data_main["Cash In (Installments This Month)"], color=COLOR_SECONDARY_LINE, label="Annual Cash In (Installments)", marker='o', linewidth=2, markersize=4)
-            ax5_main.set_xlabel("Year"); ax5_main.set_ylabel("Annual Pools Formed", color=COLOR_PRIMARY_BAR); ax6_main.set_ylabel("Annual Cash In", color=COLOR_SECONDARY_LINE)
-            ax5_main.tick_params(axis='y', labelcolor=COLOR_PRIMARY_BAR); ax6_main.tick_params(axis='y', labelcolor=COLOR_SECONDARY_LINE)
-            ax5_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}")); ax6_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
-            handles_main = [bars3_main, line3_main]; labels_main = [h.get_label() for h in handles_main]
-            fig3_main.legend(handles_main, labels_main, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=2); fig3_main.tight_layout(rect=[0, 0.05, 1, 1]); st.pyplot(fig3_main)
-        else: st.caption("Not enough data or all values are zero for Chart 3.")
-            
-        st.markdown("##### Chart 4: Annual Users Joining vs. Annual Accrued Gross Profit (from New Cohorts)")
-        if can_plot_y2:
-            fig4_main, ax7_main = plt.subplots(figsize=FIG_SIZE_MAIN)
-            ax8_main = ax7_main.twinx()
-            bars4_main = ax7_main.bar(df_yearly_chart_data_main["Year"], df_yearly_chart_data_main["Users Joining This Month"], color=COLOR_ACCENT_BAR, label="Annual Users Joining", width=0.6)
-            line4_main, = ax8_main.plot(df_yearly_chart_data_main["Year"], df_yearly_chart_data_main["Annual Gross Profit (Accrued from New Cohorts)"], color=COLOR_ACCENT_LINE, label="Annual Accrued Gross Profit (New Cohorts)", marker='o', linewidth=2, markersize=4)
-            ax7_main.set_xlabel("Year"); ax7_main.set_ylabel("Annual Users Joining", color=COLOR_ACCENT_BAR); ax8_main.set_ylabel("Annual Accrued Profit", color=COLOR_ACCENT_LINE)
-            ax7_main.tick_params(axis='y', labelcolor=COLOR_ACCENT_BAR); ax8_main.tick_params(axis='y', labelcolor=COLOR_ACCENT_LINE)
-            ax7_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}")); ax8_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
-            handles_main = [bars4_main, line4_main]; labels_main = [h.get_label() for h in handles_main]
-            fig4_main.legend(handles_main, labels_main, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=2); fig4_main.tight_layout(rect=[0, 0.05, 1, 1]); st.pyplot(fig4_main)
-        else: st.caption("Not enough data or all values are zero for Chart 4.")
-
-        st.markdown("##### Chart 5: Annual External Capital vs. Fee & Accrued Profit")
-        if can_plot_y3:
-            fig5_main, ax9_main = plt.subplots(figsize=FIG_SIZE_MAIN)
-            ax10_main = ax9_main.twinx()
-            bars5_main = ax9_main.bar(df_profit_share_chart_data_main["Year"], df_profit_share_chart_data_main["External Capital Needed (Annual Accrual)"], color=COLOR_HIGHLIGHT_BAR, label="External Capital (Accrual)", width=0.6)
-            line5_fee_main, = ax10_main.plot(df_profit_share_chart_data_main["Year"], df_profit_share_chart_data_main["Annual Fee Collected (Accrued)"], color=COLOR_PRIMARY_BAR, marker='o', label="Annual Fee (Accrual)", linewidth=2, markersize=4)
-            line5_profit_main, = ax10_main.plot(df_profit_share_chart_data_main["Year"], df_profit_share_chart_data_main["Annual Gross Profit (Accrued)"], color=COLOR_SECONDARY_LINE, marker='s', label="Annual Gross Profit (Accrual)", linestyle='--', linewidth=2, markersize=4)
-            ax9_main.set_xlabel("Year"); ax9_main.set_ylabel("External Capital", color=COLOR_HIGHLIGHT_BAR); ax10_main.set_ylabel("Fee & Profit (Accrued)", color=TEXT_COLOR)
-            ax9_main.tick_params(axis='y', labelcolor=COLOR_HIGHLIGHT_BAR); ax10_main.tick_params(axis='y', labelcolor=TEXT_COLOR)
-            ax9_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}")); ax10_main.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, p: f"{int(x):,}"))
-            handles_main = [bars5_main, line5_fee_main, line5_profit_main]; labels_main = [h.get_label() for h in handles_main]
-            fig5_main.legend(handles_main, labels_main, loc="lower center", bbox_to_anchor=(0.5, -0.15), ncol=3); fig5_main.tight_layout(rect=[0, 0.05, 1, 1]); st.pyplot(fig5_main)
-        else: st.caption("Not enough data or all values are zero for Chart 5.")
-
-        sheet_name_prefix_main = scenario_data_main['name'][:25].replace(" ", "_").replace("/", "_")
-        if not df_forecast_main.empty:
-            df_forecast_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_ForecastCohorts")
-        if not df_monthly_summary_main.empty and "Month" in df_monthly_summary_main: 
-             df_monthly_summary_main[cols_to_display_monthly_main].to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_MonthlySummary")
-        if not df_yearly_summary_main.empty and "Year" in df_yearly_summary_main:
-            df_yearly_summary_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_YearlySummary")
-        if not df_profit_share_main.empty and "Year" in df_profit_share_main:
-            df_profit_share_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_ProfitShare")
-        if not df_deposit_log_main.empty:
-            df_deposit_log_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_DepositLog")
-        if not df_default_log_main.empty:
-            df_default_log_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_DefaultLog")
-        if not df_lifecycle_main.empty:
-            df_lifecycle_main.to_excel(excel_writer_main, index=False, sheet_name=f"{sheet_name_prefix_main}_LifecycleLog")
-
-output_excel_main.seek(0)
-st.sidebar.download_button("📥 Download All Scenarios Excel", data=output_excel_main, file_name="all_scenarios_rosca_forecast.xlsx")
+        else:  # long horizons exceed the Styler cell limit; show the raw values
+            st.dataframe(df_forecast_main)
+
+        st.subheader(f"📊 Monthly Summary for {scenario_data_main['name']}")
+        st.dataframe(df_monthly_summary_main[MONTHLY_SUMMARY_COLUMNS].style.format(precision=0, thousands=","))
+
+        st.subheader(f"💰 Profit Share Summary for {scenario_data_main['name']}")
+        st.dataframe(df_profit_share_main.style.format(precision=0, thousands=","))
+        if result_main.monte_carlo is not None:
+            st.subheader(f"🎲 Monte Carlo Loss Distribution for {scenario_data_main['name']} ({monte_carlo_paths:,} paths)")
+            st.dataframe(result_main.monte_carlo.style.format(precision=0, thousands=","))
+        st.subheader(f"📆 Yearly Summary for {scenario_data_main['name']}")
+        st.dataframe(df_yearly_summary_main.style.format(precision=0, thousands=","))
+        st.subheader(f"🏦 Float Ledger for {scenario_data_main['name']}")
+        st.caption("Scheduled installments and payouts of all live cohorts each month; the outstanding balance is the member money held at month end.")
+        st.dataframe(result_main.float_ledger.style.format(precision=0, thousands=","), hide_index=True)
+        st.subheader(f"🧩 Pool Formation for {scenario_data_main['name']}")
+        st.caption("Whole committees packed each month per duration and slab: one member per unblocked slot. Unfilled slots are the members still missing to seat everyone waiting.")
+        st.dataframe(pool_summary(result_main.pools).style.format(precision=0, thousands=","), hide_index=True)
+        with st.expander("Pool formation by duration and slab"):
+            st.dataframe(result_main.pools, hide_index=True)
+    else: 
+        st.warning(f"No forecast data generated for {scenario_data_main['name']}. Summary tables will be empty.")
+
+# Exact minimum fee per slot on the cached allocation of this run.
+with st.expander(f"🎯 Break-even Fees for {scenario_data_main['name']}"):
+    BREAKEVEN_LABELS_MAIN = {"Lifetime profit reaches target": "profit", "External capital falls to target": "external_capital"}
+    breakeven_target_main = BREAKEVEN_LABELS_MAIN[st.radio("Solve for", list(BREAKEVEN_LABELS_MAIN), horizontal=True, key=f"breakeven_target_{scenario_idx_main}")]
+    breakeven_value_main = st.number_input("Target per slot (PKR, lifetime)", min_value=0.0, value=0.0, step=100000.0, key=f"breakeven_value_{scenario_idx_main}")
+    df_breakeven_main = solve_breakeven_fees(*forecast_config_main.forecast_args(scenario_config_main), target=breakeven_target_main, target_value=breakeven_value_main)
+    st.dataframe(df_breakeven_main.style.format({"Current Fee %": "{:.2f}", "Break-even Fee %": "{:.3f}", "Profit at Current Fee": "{:,.0f}", "External Capital at Current Fee": "{:,.0f}"}, na_rep="—"), hide_index=True)
+    st.caption("— : blocked or empty slot, or no fee up to 100% meets the target.")
+
+st.subheader(f"Visual Charts for {scenario_data_main['name']}")
+# Charts are only rendered once shown; the PNGs are cached on the summary data.
+if st.toggle("Show charts", value=False, key=f"show_charts_{scenario_idx_main}"):
+    chart_sources_main = {"monthly": df_monthly_summary_main, "yearly": df_yearly_summary_main, "profit_share": df_profit_share_main, "float_ledger": result_main.float_ledger}
+    for chart_idx_main, chart_main in enumerate(CHARTS, start=1):
+        with st.expander(chart_main["title"], expanded=True):
+            chart_png_main = cached_chart_png(chart_main, chart_sources_main[chart_main["source"]])
+            if chart_png_main is not None: st.image(chart_png_main)
+            else: st.caption(f"Not enough data or all values are zero for Chart {chart_idx_main}.")
+
+# Members, sensitivity and charts are computed for the selected scenario only.
+if show_members:
+    st.header(f"👥 Member-Level Simulation for {scenario_config_main.name}")
+    with st.spinner(f"Simulating members of {scenario_config_main.name}..."):
+        try:
+            members_main, _, _, df_member_yearly_main, _ = run_member_simulation(
+                *forecast_config_main.forecast_args(scenario_config_main), party_a_pct=party_a_pct,
+                seed=members_seed if members_random else None, rejoin_pct=monte_carlo_rejoin_pct)
+        except ValueError as e:
+            st.warning(f"{scenario_config_main.name}: {e}")
+            members_main = None
+    if members_main is not None:
+        st.subheader(f"Cohorts vs. Members ({len(members_main):,} enrolments, {members_main.nbytes / 1024 / 1024:.0f} MB)")
+        st.dataframe(compare_yearly(result_main.yearly, df_member_yearly_main).style.format(precision=0, thousands=","), hide_index=True)
+
+# The arrays live in a per-session temp directory and are sliced by the date range.
+if show_daily_ledger:
+    st.header("🏦 Daily Cash Ledger")
+    if "daily_ledger_dir" not in st.session_state:
+        st.session_state["daily_ledger_dir"] = tempfile.TemporaryDirectory(prefix="rosca_daily_")
+    daily_ledger_main = build_daily_ledger(forecast_config_main, results_main, st.session_state["daily_ledger_dir"].name)
+    daily_scenario_main = st.selectbox("Scenario", daily_ledger_main.scenarios, key="daily_scenario")
+    daily_range_main = st.date_input("Date Range", value=(daily_ledger_main.start, min(daily_ledger_main.end, daily_ledger_main.start.replace(month=3, day=31))),
+                                     min_value=daily_ledger_main.start, max_value=daily_ledger_main.end, key="daily_range")
+    if len(daily_range_main) == 2:
+        df_daily_main = daily_ledger_main.frame(daily_scenario_main, *daily_range_main)
+        st.dataframe(df_daily_main.style.format({c: "{:,.0f}" for c in df_daily_main.columns if c != "Date"}), hide_index=True)
+        st.download_button("📥 Download Range (CSV)", data=df_daily_main.to_csv(index=False), file_name=f"daily_ledger_{daily_scenario_main}.csv", mime="text/csv")
+
+# Batched on the cached allocations; only inputs that change allocation (default
+# rate, rest period, growth) need a new one per value.
+if show_sensitivity:
+    st.header(f"📈 Sensitivity Analysis for {scenario_config_main.name}")
+    if grid_axes[0][0] == grid_axes[1][0]:
+        st.warning("Pick two different grid inputs.")
+    else:
+        sensitivity_config_main = replace(forecast_config_main, scenarios=[scenario_config_main])
+        with st.spinner("Evaluating sensitivity grid..."):
+            df_tornado_main = tornado_table(sensitivity_table(sensitivity_config_main), sensitivity_kpi)
+            df_grid_main = run_grid(sensitivity_config_main, dict(grid_axes))
+        st.subheader(sensitivity_kpi)
+        tornado_png_main = cached_tornado_png(df_tornado_main, sensitivity_kpi)
+        if tornado_png_main is not None: st.image(tornado_png_main)
+        st.dataframe(df_tornado_main.style.format(precision=2, thousands=","), hide_index=True)
+        pivot_main = grid_pivot(df_grid_main, grid_axes[0][0], grid_axes[1][0], sensitivity_kpi, scenario_config_main.name)
+        heatmap_png_main = cached_heatmap_png(pivot_main, sensitivity_kpi)
+        if heatmap_png_main is not None: st.image(heatmap_png_main)
+
+cache_stats_main = forecast_cache.stats()
+st.sidebar.caption(f"Forecast cache: {cache_stats_main['hits']} hits / {cache_stats_main['misses']} misses, "
+                   f"{cache_stats_main['entries']} entries ({cache_stats_main['bytes'] / 1024 / 1024:.1f} MB)")
+if "disk" in cache_stats_main:  # ROSCA_FORECAST_DISK_CACHE is set
+    st.sidebar.caption(f"Disk cache: {cache_stats_main['disk']['hits']} hits / {cache_stats_main['disk']['misses']} misses, "
+                       f"{cache_stats_main['disk']['entries']} entries ({cache_stats_main['disk']['bytes'] / 1024 / 1024:.1f} MB)")
+if show_diagnostics:
+    # Stages served from the forecast cache do not run and are not listed. Stages run in
+    # run_all's worker processes are included (summed over the workers).
+    diagnostics_main = session_diagnostics_main.snapshot()
+    session_diagnostics_main.disable()  # tracemalloc slows every session; trace this run only
+    with diagnostics_panel:
+        st.dataframe(pd.DataFrame([{"Stage": stage, "Calls": entry["calls"], "Seconds": entry["seconds"], "Peak MB": entry["peak_mb"]}
+                                   for stage, entry in diagnostics_main["stages"].items()]), hide_index=True)
+        st.dataframe(pd.DataFrame([{"Counter": name, "Value": value} for name, value in diagnostics_main["counters"].items()]), hide_index=True)
+# Writing every scenario's sheets takes a while with many scenarios, so the file is
+# only built once asked for (it is cached on the config afterwards).
+if st.sidebar.toggle("Prepare download", value=len(results_main) <= 3, help="Build the export file for all scenarios."):
+    output_excel_main = io.BytesIO(cached_export(forecast_config_main, results_main, export_format_main))
+    if export_format_main is None:
+        st.sidebar.download_button("📥 Download All Scenarios Excel", data=output_excel_main, file_name="all_scenarios_rosca_forecast.xlsx")
+    else:
+        st.sidebar.download_button(f"📥 Download All Scenarios {export_format_main.title()} (zip)", data=output_excel_main, file_name=f"all_scenarios_rosca_forecast_{export_format_main}.zip", mime="application/zip")
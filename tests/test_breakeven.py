@@ -0,0 +1,61 @@
+import copy
+
+import pytest
+
+from rosca_forecast import ForecastCache, default_config, run_forecast_reference, solve_breakeven_fees
+
+
+@pytest.fixture
+def config():
+    config = default_config(durations=(3, 4))
+    config.forecast_months = 24
+    config.default_rate = 4.0
+    config.penalty_pct = 5.0
+    config.slot_fees[4][2]["blocked"] = True
+    config.slot_distribution[4] = {1: 40, 2: 0, 3: 30, 4: 30}
+    return config
+
+
+# Per-slot lifetime profit and external capital from a full reference run with one
+# slot's fee changed.
+def brute_force(config, duration, slot, fee):
+    slot_fees = copy.deepcopy(config.slot_fees)
+    slot_fees[duration][slot]["fee"] = fee
+    args = list(config.forecast_args(config.scenarios[0])[:8])
+    args[3] = slot_fees
+    forecast = run_forecast_reference(*args)[0]
+    cohorts = forecast[(forecast["Duration"] == duration) & (forecast["Assigned Slot"] == slot)]
+    return (cohorts["Expected Lifetime Profit"].sum(), cohorts["External Capital For Loss (Lifetime)"].sum())
+
+
+@pytest.mark.parametrize("target, target_value", [("profit", 0.0), ("profit", 5e6), ("external_capital", 0.0),
+                                                  ("external_capital", 1e5)])
+def test_breakeven_fee_meets_target_by_brute_force(config, target, target_value):
+    args = config.forecast_args(config.scenarios[0])
+    df = solve_breakeven_fees(*args, target=target, target_value=target_value, cache=ForecastCache(1 << 30))
+    assert df.loc[df["Blocked"], "Break-even Fee %"].isna().all()
+    solved = df[df["Break-even Fee %"].notna()]
+    assert len(solved) == len(df) - df["Blocked"].sum()
+    assert (solved["Break-even Fee %"] > 0).all()
+    metric = 0 if target == "profit" else 1
+    for _, row in solved.iterrows():
+        fee = row["Break-even Fee %"]
+        at_fee = brute_force(config, row["Duration"], row["Slot"], fee)[metric]
+        below = brute_force(config, row["Duration"], row["Slot"], max(fee - 0.01, 0))[metric]
+        scale = max(abs(target_value), 1.0)
+        if target == "profit":
+            assert at_fee == pytest.approx(target_value, rel=1e-6, abs=1e-6 * scale)
+            assert below < target_value
+        else:
+            assert at_fee <= target_value + 1e-6 * scale
+            assert below > target_value
+
+
+def test_current_fee_columns_match_brute_force(config):
+    args = config.forecast_args(config.scenarios[0])
+    df = solve_breakeven_fees(*args, cache=ForecastCache(1 << 30))
+    for _, row in df[~df["Blocked"]].iterrows():
+        duration, slot = row["Duration"], row["Slot"]
+        profit, external = brute_force(config, duration, slot, config.slot_fees[duration][slot]["fee"])
+        assert row["Profit at Current Fee"] == pytest.approx(profit)
+        assert row["External Capital at Current Fee"] == pytest.approx(external, abs=1e-6)
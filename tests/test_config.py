@@ -0,0 +1,54 @@
+import pytest
+
+from rosca_forecast import ForecastConfig, ScenarioConfig, default_config, dumps_config, loads_config
+
+
+@pytest.fixture
+def config():
+    config = default_config(durations=(3, 6))
+    config.scenarios = [ScenarioConfig(name="Base"), ScenarioConfig(name="Capped", cap_tam=True, tam_pct=5.5)]
+    config.slot_fees[6][2] = {"fee": 2.5, "blocked": True}
+    config.forecast_months = 84
+    return config
+
+
+@pytest.mark.parametrize("fmt", ["json", "yaml"])
+def test_round_trip(config, fmt):
+    if fmt == "yaml":
+        pytest.importorskip("yaml")
+    loaded = loads_config(dumps_config(config, fmt), fmt)
+    assert loaded == config
+    assert list(loaded.slot_fees[6]) == list(config.slot_fees[6])
+
+
+@pytest.mark.parametrize("fmt", ["json", "yaml"])
+def test_unknown_key_is_rejected(config, fmt):
+    if fmt == "yaml":
+        pytest.importorskip("yaml")
+    text = dumps_config(config, fmt).replace("kibor", "kibr", 1)
+    with pytest.raises(ValueError, match="Unknown config key"):
+        loads_config(text, fmt)
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"slab_map": []}, "slab_map: expected a mapping"),
+    ({"slab_map": {"3": {"1000": "half"}}}, r"slab_map\.3\.1000: expected a number"),
+    ({"slab_map": {"three": {}}}, "slab_map: expected whole-number keys"),
+    ({"scenarios": [1]}, r"scenarios\[0\]: expected a mapping"),
+    ({"scenarios": {"name": "x"}}, "scenarios: expected a list"),
+    ({"scenarios": [{"tam_pct": "10"}]}, r"scenarios\[0\]\.tam_pct: expected a number"),
+    ({"scenarios": [{"colour": "red"}]}, r"Unknown scenarios\[0\] key"),
+    ({"kibor": "abc"}, "kibor: expected a number"),
+    ({"collection_day": 1.5}, "collection_day: expected a whole number"),
+    ({"pool_carry_over": "yes"}, "pool_carry_over: expected true or false"),
+    ({"slot_fees": {"3": {"1": {"fee": 1.0, "blocked": "no"}}}}, r"slot_fees\.3\.1\.blocked: expected true or false"),
+    ({"slot_fees": {"3": {"1": 1.0}}}, r"slot_fees\.3\.1: expected a mapping"),
+])
+def test_malformed_values_raise_value_error(data, message):
+    with pytest.raises(ValueError, match=message):
+        ForecastConfig.from_dict(data)
+
+
+def test_non_mapping_document_is_rejected():
+    with pytest.raises(ValueError, match="mapping"):
+        loads_config("[1, 2]")
@@ -0,0 +1,37 @@
+from dataclasses import replace
+from datetime import date
+
+import pytest
+
+from rosca_forecast import ForecastCache, build_daily_ledger, default_config, run_all
+
+
+@pytest.fixture(scope="module")
+def ledger(tmp_path_factory):
+    config = replace(default_config(), forecast_months=12)
+    results = run_all(config, cache=ForecastCache(64 * 1024 * 1024))
+    return build_daily_ledger(config, results, str(tmp_path_factory.mktemp("daily")))
+
+
+def test_frame_clips_end_after_horizon(ledger):
+    scenario = ledger.scenarios[0]
+    df = ledger.frame(scenario, date(ledger.end.year, 12, 1), date(ledger.end.year + 1, 1, 31))
+    assert len(df) == 31
+    assert df["Date"].iloc[0].date() == date(ledger.end.year, 12, 1)
+    assert df["Date"].iloc[-1].date() == ledger.end
+
+
+def test_frame_start_after_horizon_is_empty(ledger):
+    df = ledger.frame(ledger.scenarios[0], date(ledger.end.year + 1, 2, 1), date(ledger.end.year + 1, 3, 1))
+    assert df.empty
+    assert list(df.columns) == ["Date", "Inflow", "Outflow", "Balance", "Interest Accrued"]
+
+
+def test_frame_clips_start_before_horizon(ledger):
+    df = ledger.frame(ledger.scenarios[0], date(ledger.start.year - 1, 12, 1), date(ledger.start.year, 1, 10))
+    assert len(df) == 10
+    assert df["Date"].iloc[0].date() == ledger.start
+
+
+def test_frame_without_bounds_covers_horizon(ledger):
+    assert len(ledger.frame(ledger.scenarios[0])) == ledger.n_days
@@ -0,0 +1,38 @@
+import threading
+import tracemalloc
+
+from rosca_forecast import Diagnostics, diagnostics
+
+
+def _run(collector, barrier, enabled):
+    collector.activate()
+    if enabled:
+        collector.enable()
+    barrier.wait()
+    with diagnostics.stage("work"):
+        diagnostics.count("items", 3)
+
+
+def test_active_collector_is_per_thread():
+    on, off = Diagnostics(), Diagnostics()
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=_run, args=(on, barrier, True)),
+               threading.Thread(target=_run, args=(off, barrier, False))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert on.snapshot()["stages"]["work"]["calls"] == 1
+    assert on.snapshot()["counters"] == {"items": 3}
+    assert off.snapshot() == {"stages": {}, "counters": {}}
+    assert diagnostics.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_memory_tracing_stops_with_last_collector():
+    first, second = Diagnostics(), Diagnostics()
+    first.enable(trace_memory=True)
+    second.enable(trace_memory=True)
+    first.disable()
+    assert tracemalloc.is_tracing()
+    second.disable()
+    assert not tracemalloc.is_tracing()
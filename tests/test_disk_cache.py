@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rosca_forecast import DiskCache, ForecastCache, cached_run_forecast, default_config
+from rosca_forecast.disk_cache import BLOB_DIR
+
+VALUES = {
+    "frame": pd.DataFrame({"Month": np.arange(1, 4, dtype=np.int32), "Users": [1.5, 2.0, np.nan]},
+                          index=pd.Index([10, 11, 12], name="row")),
+    "frames": (pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"b": ["x", "y"]})),
+    "arrays": {"users": np.array([3, 4], dtype=np.int64), "slot": np.array([1, 2], dtype=np.int16), "months": 24},
+    "bytes": b"\x89PNG rendered chart",
+}
+
+
+def _assert_equal(got, want):
+    if isinstance(want, pd.DataFrame):
+        pd.testing.assert_frame_equal(got, want)
+    elif isinstance(want, tuple):
+        assert len(got) == len(want)
+        for g, w in zip(got, want):
+            pd.testing.assert_frame_equal(g, w)
+    elif isinstance(want, dict):
+        assert got.keys() == want.keys()
+        for name, w in want.items():
+            np.testing.assert_array_equal(got[name], w)
+            assert np.asarray(got[name]).dtype == np.asarray(w).dtype
+        assert got["months"] == 24 and isinstance(got["months"], int)
+    else:
+        assert got == want
+
+
+def _blobs(directory):
+    return [os.path.join(directory, BLOB_DIR, name) for name in os.listdir(os.path.join(directory, BLOB_DIR))]
+
+
+@pytest.mark.parametrize("kind", list(VALUES))
+def test_round_trip_survives_reopen(tmp_path, kind):
+    DiskCache(str(tmp_path)).put(f"{kind}:abc", VALUES[kind])
+    cache = DiskCache(str(tmp_path))
+    _assert_equal(cache.get(f"{kind}:abc"), VALUES[kind])
+    assert cache.stats()["hits"] == 1
+
+
+def test_other_key_or_engine_version_misses(tmp_path):
+    DiskCache(str(tmp_path), engine_version="1").put("frame:abc", VALUES["frame"])
+    cache = DiskCache(str(tmp_path), engine_version="1")
+    assert cache.get("frame:abd") is None
+    bumped = DiskCache(str(tmp_path), engine_version="2")
+    assert bumped.get("frame:abc") is None
+    assert bumped.stats()["entries"] == 0 and _blobs(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize("damage", ["missing", "truncated", "garbage"])
+def test_damaged_blob_is_dropped_as_a_miss(tmp_path, damage):
+    cache = DiskCache(str(tmp_path))
+    cache.put("frame:abc", VALUES["frame"])
+    (blob,) = _blobs(str(tmp_path))
+    if damage == "missing":
+        os.remove(blob)
+    else:
+        with open(blob, "r+b") as fh:
+            data = fh.read()
+            fh.seek(0)
+            fh.write(b"x" * len(data))
+            if damage == "truncated":
+                fh.truncate(len(data) // 2)
+    assert cache.get("frame:abc") is None
+    assert "frame:abc" not in cache and _blobs(str(tmp_path)) == []
+    cache.put("frame:abc", VALUES["frame"])
+    _assert_equal(cache.get("frame:abc"), VALUES["frame"])
+
+
+def test_forecast_recomputed_after_corruption(tmp_path):
+    config = default_config()
+    config.forecast_months = 24
+    args = config.forecast_args(config.scenarios[0])
+    expected = cached_run_forecast(*args, cache=ForecastCache(1 << 30, DiskCache(str(tmp_path))))
+    for blob in _blobs(str(tmp_path)):
+        with open(blob, "wb") as fh:
+            fh.write(b"corrupt")
+    frames = cached_run_forecast(*args, cache=ForecastCache(1 << 30, DiskCache(str(tmp_path))))
+    for got, want in zip(frames, expected):
+        pd.testing.assert_frame_equal(got, want)
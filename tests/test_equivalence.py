@@ -0,0 +1,26 @@
+from dataclasses import replace
+
+from rosca_forecast import default_config
+from rosca_forecast.equivalence import run_equivalence
+
+
+def _assert_all_match(df):
+    failures = df[df["Mismatches"] != ""]
+    assert failures.empty, failures[["Config", "Engine", "Mismatches"]].to_string()
+
+
+def test_random_configs_match_reference():
+    _assert_all_match(run_equivalence(n_configs=12, seed=0))
+
+
+def test_twenty_year_horizon_with_blocked_slots_matches_reference():
+    config = replace(default_config(), forecast_months=240, rest_period=2)
+    config.slot_fees[4][2]["blocked"] = True
+    config.slot_fees[6][1]["blocked"] = True
+    config.slot_distribution[4] = {1: 34, 2: 0, 3: 33, 4: 33}
+    config.slot_distribution[6] = {1: 0, 2: 20, 3: 20, 4: 20, 5: 20, 6: 20}
+    scenarios = [config.scenarios[0], replace(config.scenarios[0], name="Capped", cap_tam=True, total_market=50000)]
+    # The reference engine has no base_year argument.
+    df = run_equivalence(configs=[config.forecast_args(scenario)[:8] for scenario in scenarios])
+    assert len(df) == 2 and (df["Months"] == 240).all()
+    _assert_all_match(df)
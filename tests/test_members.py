@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from rosca_forecast import MEMBER_DTYPE, default_config, run_forecast_vectorized, simulate_members
+
+
+@pytest.fixture
+def args():
+    config = default_config(durations=(3, 4))
+    config.scenarios[0].total_market = 200000
+    config.forecast_months = 18
+    config.default_rate = 5.0
+    config.slot_fees[4][2]["blocked"] = True
+    config.slot_distribution[4] = {1: 50, 2: 0, 3: 25, 4: 25}
+    return config.forecast_args(config.scenarios[0])
+
+
+def test_record_layout():
+    assert MEMBER_DTYPE.itemsize == 18
+    assert [MEMBER_DTYPE[name] for name in MEMBER_DTYPE.names] == [
+        np.dtype(np.int32), np.dtype(np.int16), np.dtype(np.int8), np.dtype(np.int32),
+        np.dtype(np.int8), np.dtype(np.int32), np.dtype(np.int8), np.dtype(np.bool_)]
+
+
+def test_dtype_survives_simulation_and_npy(args, tmp_path):
+    members = simulate_members(*args[:6])
+    assert members.dtype == MEMBER_DTYPE and len(members) > 0
+    np.save(tmp_path / "members.npy", members)
+    loaded = np.load(tmp_path / "members.npy")
+    assert loaded.dtype == MEMBER_DTYPE
+    np.testing.assert_array_equal(loaded, members)
+
+
+def test_members_per_cohort_match_cohort_engine(args):
+    members = simulate_members(*args[:6])
+    forecast = run_forecast_vectorized(*args)[0]
+    keys = np.stack([members["join_month"] + 1, members["duration"], members["installment"], members["slot"]], axis=1)
+    cohorts, counts = np.unique(keys, axis=0, return_counts=True)
+    want = forecast.groupby(["Month Joined", "Duration", "Slab Installment", "Assigned Slot"])["Users"].sum()
+    want = want[want > 0]
+    assert dict(zip(map(tuple, cohorts.tolist()), counts.tolist())) == {k: int(v) for k, v in want.items()}
+    assert not np.isin(members["slot"][members["duration"] == 4], [2]).any()  # blocked slot
+
+
+def test_pools_take_one_member_per_slot(args):
+    members = simulate_members(*args[:6])
+    pool_ids = np.unique(members["pool"])
+    np.testing.assert_array_equal(pool_ids, np.arange(len(pool_ids)))
+    for pool_id in pool_ids:
+        pool = members[members["pool"] == pool_id]
+        assert len(np.unique(pool[["join_month", "duration", "installment"]])) == 1
+        assert len(np.unique(pool["slot"])) == len(pool) <= pool["duration"][0]
+    # A (month, duration, slab) opens as many pools as its fullest slot has members.
+    for group in np.unique(members[["join_month", "duration", "installment"]]):
+        in_group = members[members[["join_month", "duration", "installment"]] == group]
+        assert len(np.unique(in_group["pool"])) == np.unique(in_group["slot"], return_counts=True)[1].max()
+
+
+def test_rejoiners_come_back_after_rest_period(args):
+    members = simulate_members(*args[:6])
+    latest = {}
+    for record in members:
+        if record["member"] in latest:
+            previous = latest[record["member"]]
+            assert record["rejoined"] and previous["default"] == 0
+            assert record["join_month"] == previous["join_month"] + previous["duration"] + args[0]["rest_period"]
+        latest[record["member"]] = record
+    assert members["rejoined"].any()
+
+
+def test_member_limit_raises(args):
+    with pytest.raises(ValueError, match="exceeds 100 enrolments"):
+        simulate_members(*args[:6], max_members=100)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rosca_forecast import ForecastCache, default_config, form_pools, pool_formation
+from rosca_forecast.pools import POOL_DTYPES
+
+# slot_fees: duration 4 has slot 2 blocked.
+SLOT_FEES = {3: {s: {"fee": 1.0, "blocked": False} for s in (1, 2, 3)},
+             4: {s: {"fee": 1.0, "blocked": s == 2} for s in (1, 2, 3, 4)}}
+
+
+# (month index, duration, installment, slot, users) cohorts as an allocation.
+def allocation(cohorts, months=2):
+    m_idx, duration, installment, slot, users = (np.array(col, dtype=np.int64) for col in zip(*cohorts))
+    return {"m_idx": m_idx, "duration": duration, "installment": installment, "slot": slot, "users": users,
+            "months": months}
+
+
+COHORTS = [
+    (0, 3, 1000, 1, 5), (0, 3, 1000, 2, 3), (0, 3, 1000, 3, 4),
+    (1, 3, 1000, 2, 2),
+    (0, 4, 2000, 1, 2), (0, 4, 2000, 3, 2), (0, 4, 2000, 4, 3),
+]
+
+
+def _row(df, month, duration):
+    return df[(df["Month"] == month) & (df["Duration"] == duration)].iloc[0]
+
+
+def test_pools_are_packed_one_member_per_required_slot():
+    df = form_pools(allocation(COHORTS), SLOT_FEES)
+    assert {name: df[name].dtype for name in df.columns} == {name: np.dtype(t) for name, t in POOL_DTYPES.items()}
+
+    first = _row(df, 1, 3)  # 5 / 3 / 4 in slots 1-3: three pools, 2 + 0 + 1 wait
+    assert (first["Pools Formed"], first["Members Seated"], first["Waiting Users"], first["Unfilled Slots"]) == (3, 9, 3, 3)
+    second = _row(df, 2, 3)  # 2 / 2 / 1 available after two more arrive in slot 2
+    assert (second["Users Carried In"], second["Pools Formed"], second["Members Seated"], second["Waiting Users"]) == (3, 1, 3, 2)
+
+    blocked = _row(df, 1, 4)  # slot 2 held by the platform
+    assert (blocked["Pools Formed"], blocked["Members Seated"], blocked["Blocked Slots Held"], blocked["Waiting Users"]) == (2, 6, 2, 1)
+
+
+def test_without_carry_over_waiting_users_drop_out():
+    df = form_pools(allocation(COHORTS), SLOT_FEES, carry_over=False)
+    second = _row(df, 2, 3)
+    assert (second["Users Carried In"], second["Pools Formed"], second["Waiting Users"]) == (0, 0, 2)
+
+
+def test_users_are_conserved_on_a_forecast():
+    config = default_config(durations=(3, 4, 6))
+    config.forecast_months = 36
+    config.slot_fees[6][5]["blocked"] = True
+    config.slot_distribution[6] = {1: 20, 2: 20, 3: 20, 4: 20, 5: 0, 6: 20}
+    df = pool_formation(*config.forecast_args(config.scenarios[0])[:5], cache=ForecastCache(1 << 30))
+    assert (df["Users Arrived"] + df["Users Carried In"] == df["Members Seated"] + df["Waiting Users"]).all()
+    assert (df["Members Seated"] == df["Pools Formed"] * (df["Duration"] - (df["Duration"] == 6))).all()
+    assert (df.loc[df["Duration"] == 6, "Blocked Slots Held"] == df.loc[df["Duration"] == 6, "Pools Formed"]).all()
+    # Users waiting at the end of a month are carried into the next one.
+    for _, group in df.groupby(["Duration", "Slab Installment"]):
+        group = group.set_index("Month")
+        carried = group["Users Carried In"].iloc[1:]
+        pd.testing.assert_series_equal(carried, group["Waiting Users"].reindex(carried.index - 1, fill_value=0)
+                                       .set_axis(carried.index), check_names=False)
@@ -0,0 +1,53 @@
+import contextvars
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+
+from rosca_forecast import Diagnostics, ForecastCache, ScenarioConfig, default_config, run_all
+from rosca_forecast.runner import _pending_stages
+
+CACHE_BYTES = 256 * 1024 * 1024
+
+
+@pytest.fixture
+def config():
+    scenarios = [ScenarioConfig(name=f"S{i}", monthly_growth=1.0 + i) for i in range(3)]
+    return replace(default_config(), scenarios=scenarios, forecast_months=24, monte_carlo_paths=20)
+
+
+def _assert_same(results, expected):
+    for result, want in zip(results, expected):
+        assert result.name == want.name
+        for field in ("forecast", "monthly", "yearly", "monte_carlo", "float_ledger", "pools"):
+            pd.testing.assert_frame_equal(getattr(result, field), getattr(want, field), check_dtype=False)
+
+
+def test_parallel_run_matches_serial_and_reports_worker_stages(config):
+    expected = run_all(config, cache=ForecastCache(CACHE_BYTES))
+    collector = Diagnostics()
+
+    def run():
+        collector.activate()
+        collector.enable()
+        try:
+            return run_all(config, cache=ForecastCache(CACHE_BYTES), max_workers=2)
+        finally:
+            collector.disable()
+    results = contextvars.copy_context().run(run)
+    _assert_same(results, expected)
+    stages = collector.snapshot()["stages"]
+    for stage in ("allocation", "pricing", "summaries", "pool_formation", "monte_carlo"):
+        assert stages[stage]["calls"] == len(config.scenarios)
+    assert collector.snapshot()["counters"]["cohorts_generated"] > 0
+
+
+def test_cached_forecasts_send_only_monte_carlo_to_workers(config):
+    cache = ForecastCache(CACHE_BYTES)
+    expected = run_all(replace(config, monte_carlo_paths=0), cache=cache)
+    assert [_pending_stages(config, s, cache) for s in config.scenarios] == [("montecarlo",)] * 3
+    results = run_all(config, cache=cache, max_workers=2)
+    assert all(_pending_stages(config, s, cache) == () for s in config.scenarios)
+    for result, want in zip(results, expected):
+        pd.testing.assert_frame_equal(result.forecast, want.forecast)
+        assert result.monte_carlo is not None and not result.monte_carlo.empty
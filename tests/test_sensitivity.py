@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from rosca_forecast import default_config, evaluate_points, run_forecast_reference, sensitivity_table, tornado_table
+from rosca_forecast.sweep import KPI_COLUMNS, SLOT_FEE_PARAM, apply_overrides, forecast_kpis
+
+
+@pytest.fixture
+def config():
+    config = default_config(durations=(3, 6))
+    config.forecast_months = 30
+    config.default_rate = 3.0
+    config.slot_fees[6][4]["blocked"] = True
+    config.slot_distribution[6] = {1: 20, 2: 20, 3: 20, 4: 0, 5: 20, 6: 20}
+    return config
+
+
+# KPIs of one point from a full reference run of the overridden config.
+def brute_force(config, overrides):
+    point_config = apply_overrides(config, overrides)
+    frames = run_forecast_reference(*point_config.forecast_args(point_config.scenarios[0])[:8])
+    return forecast_kpis(frames[0], frames[3])
+
+
+def _assert_kpis(got, want):
+    for kpi in KPI_COLUMNS:
+        assert got[kpi] == pytest.approx(want[kpi], rel=1e-9, abs=1e-6), kpi
+
+
+def test_batched_points_match_brute_force(config):
+    points = [{}, {"kibor": 14.5}, {"spread": 1.0, "penalty_pct": 25.0}, {"default_pre_pct": 80},
+              {SLOT_FEE_PARAM: 3.5, "kibor": 8.0}, {"default_rate": 6.0}, {"rest_period": 0},
+              {"monthly_growth": 4.0, SLOT_FEE_PARAM: 0.5}]
+    df = evaluate_points(config, points)
+    assert len(df) == len(points)
+    for (_, row), overrides in zip(df.iterrows(), points):
+        _assert_kpis(row, brute_force(config, overrides))
+
+
+def test_sensitivity_table_matches_brute_force(config):
+    df = sensitivity_table(config, spans={"kibor": 2.0, "default_rate": 1.0, "rest_period": 1}, steps=3)
+    assert df["Parameter"].tolist() == ["Base"] + ["kibor"] * 3 + ["default_rate"] * 3 + ["rest_period"] * 3
+    assert df.loc[df["Parameter"] == "rest_period", "Value"].tolist() == [0, 1, 2]
+    for _, row in df.iterrows():
+        overrides = {} if row["Parameter"] == "Base" else {row["Parameter"]: row["Value"]}
+        _assert_kpis(row, brute_force(config, overrides))
+
+    tornado = tornado_table(df)
+    swings = {p: abs(df.loc[df["Parameter"] == p, "Total Profit"].iloc[-1]
+                     - df.loc[df["Parameter"] == p, "Total Profit"].iloc[0]) for p in ("kibor", "default_rate", "rest_period")}
+    assert tornado["Parameter"].tolist() == sorted(swings, key=swings.get, reverse=True)
+    np.testing.assert_allclose(tornado["Swing"], sorted(swings.values(), reverse=True))
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rosca_forecast import build_summaries, default_config, run_forecast_vectorized
+from rosca_forecast.equivalence import random_forecast_args
+
+YEARLY_SUMS = ["Users Joining This Month", "Pools Formed", "Cash In (Installments This Month)",
+               "Actual Cash Out This Month", "Net Cash Flow This Month", "NII This Month (Sum of Avg from New Cohorts)",
+               "Total NII (Lifetime)", "Payout Recipient Users", "Total Fee Collected (Lifetime)",
+               "Total Default Loss (Lifetime)", "Gross Profit This Month (Accrued from New Cohorts)",
+               "External Capital For Loss (Lifetime)"]
+
+
+# The groupby / merge implementation build_summaries replaced.
+def groupby_summaries(df_forecast, party_a_pct, months):
+    direct = df_forecast.groupby("Month Joined")[
+        ["Cash In (Installments This Month)", "NII Earned This Month (Avg)", "Pools Formed", "Users"]
+    ].sum().reset_index().rename(columns={"Month Joined": "Month", "Users": "Users Joining This Month",
+                                          "NII Earned This Month (Avg)": "NII This Month (Sum of Avg from New Cohorts)"})
+    payouts = df_forecast.groupby("Payout Due Month")[["Payout Amount Scheduled", "Users"]].sum().reset_index().rename(
+        columns={"Payout Due Month": "Month", "Payout Amount Scheduled": "Actual Cash Out This Month",
+                 "Users": "Payout Recipient Users"})
+    lifetime = df_forecast.groupby("Month Joined")[
+        ["Total Fee Collected (Lifetime)", "Total NII (Lifetime)", "Total Default Loss (Lifetime)",
+         "Expected Lifetime Profit", "External Capital For Loss (Lifetime)"]
+    ].sum().reset_index().rename(columns={"Month Joined": "Month"})
+    monthly = pd.DataFrame({"Month": range(1, months + 1)})
+    for df in (direct, payouts, lifetime):
+        monthly = monthly.merge(df, on="Month", how="left")
+    monthly = monthly.fillna(0)
+    monthly["Net Cash Flow This Month"] = monthly["Cash In (Installments This Month)"] - monthly["Actual Cash Out This Month"]
+    monthly["Gross Profit This Month (Accrued from New Cohorts)"] = (monthly["Total Fee Collected (Lifetime)"]
+                                                                     + monthly["Total NII (Lifetime)"]
+                                                                     - monthly["Total Default Loss (Lifetime)"])
+    monthly["Year"] = (monthly["Month"] - 1) // 12 + 1
+    yearly = monthly.groupby("Year")[YEARLY_SUMS].sum().reset_index().rename(columns={
+        "Gross Profit This Month (Accrued from New Cohorts)": "Annual Gross Profit (Accrued from New Cohorts)",
+        "NII This Month (Sum of Avg from New Cohorts)": "Annual NII (Sum of Avg from New Cohorts)",
+        "Total NII (Lifetime)": "Annual Total NII (Lifetime from New Cohorts)"})
+    profit = yearly["Annual Gross Profit (Accrued from New Cohorts)"]
+    loss = yearly["Total Default Loss (Lifetime)"]
+    external = yearly["External Capital For Loss (Lifetime)"]
+    profit_share = pd.DataFrame({
+        "Year": yearly["Year"],
+        "External Capital Needed (Annual Accrual)": external,
+        "Annual Cash In (Installments)": yearly["Cash In (Installments This Month)"],
+        "Annual NII (Accrued Lifetime)": yearly["Annual Total NII (Lifetime from New Cohorts)"],
+        "Annual Default Loss (Accrued)": loss,
+        "Annual Fee Collected (Accrued)": yearly["Total Fee Collected (Lifetime)"],
+        "Annual Gross Profit (Accrued)": profit,
+        "Part-A Profit Share": profit * party_a_pct,
+        "Part-B Profit Share": profit * (1 - party_a_pct),
+        "% Loss Covered by External Capital": np.where(loss > 0, external / loss.where(loss > 0, 1) * 100, 0.0),
+    })
+    return monthly, yearly, profit_share
+
+
+def _forecast_args():
+    config = default_config(durations=(3, 4, 6))
+    config.forecast_months = 30  # a partial last year
+    config.rest_period = 2
+    config.slot_fees[4][3]["blocked"] = True
+    config.slot_distribution[4] = {1: 40, 2: 30, 3: 0, 4: 30}
+    yield config.forecast_args(config.scenarios[0])
+    for seed in range(5):
+        args = random_forecast_args(random.Random(f"summaries:{seed}"))
+        # A market big enough for cohorts in several months, and slabs for every duration.
+        args[0].update(total_market=5e6, tam_pct=max(args[0]["tam_pct"], 5), start_pct=max(args[0]["start_pct"], 5))
+        for duration, slabs in args[2].items():
+            if not any(slabs.values()):
+                args[2][duration] = {2000: 100}
+        yield args
+
+
+@pytest.mark.parametrize("args", list(_forecast_args()))
+def test_matches_groupby_summaries(args):
+    months = args[0]["forecast_months"]
+    forecast = run_forecast_vectorized(*args)[0]
+    assert forecast["Month Joined"].nunique() > 1
+    for got, want in zip(build_summaries(forecast, 0.4, months), groupby_summaries(forecast, 0.4, months)):
+        assert list(got.columns) == list(want.columns)
+        pd.testing.assert_frame_equal(got, want, check_dtype=False, rtol=1e-9, atol=1e-6)